@@ -1,87 +1,255 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Blueprint, Response, current_app, g, render_template, request, session, jsonify, redirect, url_for, stream_with_context
+import click
 import sys
 import os
 import re
-from flask_sqlalchemy import SQLAlchemy
+import threading
 
 # Ensure proper import paths
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-from modules.data_fetcher import DataFetcher
-from modules.visualizer import Visualizer
-from models import db, Watchlist
-import pandas as pd
+# Only light modules are imported here; pandas, NumPy, Plotly and requests load with the first analysis
+from modules.chart_cache import ChartCache
+from modules.chart_bundle import build_chart_bundle, expand_chart_bundle
+from modules.market_feed import MarketFeed
+from modules.job_queue import JobQueue
+from modules.profiler import SamplingProfiler
+from modules.snapshot_refresher import SnapshotRefresher
+from modules import compression
+from modules import json_encoder
+from modules import services
+from modules import metrics
+from modules import watchlist_io
+from modules.symbol_directory import normalize_symbols
+from config import Config
+from models import db, engine_options, upgrade_schema, LEGACY_USER_ID, AnalysisJob, Fundamentals, IngestionCheckpoint, SnapshotLease, Watchlist, WatchlistSnapshot, WatchlistUser
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
 import json
 import time
 import traceback
+import secrets
+from datetime import datetime, timedelta
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///stocks.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# cli_group=None puts the blueprint's commands at the top level: flask ingest
+bp = Blueprint('main', __name__, cli_group=None)
 
-# Create database tables
-with app.app_context():
-    db.create_all()
+chart_cache = ChartCache()
+job_queue = JobQueue()
+profiler = SamplingProfiler()
 
-data_fetcher = DataFetcher()
-visualizer = Visualizer()
+# Tables are created on the first request that is not a health check, not at startup; each app tracks its own
+tables_lock = threading.Lock()
 
-@app.route('/')
+def create_app(config=None):
+    """Create the Flask application, with optional settings overriding the defaults"""
+    app = Flask(__name__)
+    app.json = json_encoder.AppJSONProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///stocks.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
+    app.config['SECRET_KEY'] = _secret_key()
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=Config.USER_SESSION_DAYS)
+    app.config.update(config or {})
+    db.init_app(app)
+    app.register_blueprint(bp)
+    # Job status requests may reach a different worker process than the one running the job
+    job_queue.store = JobStore(app)
+    
+    if Config.PROFILER_ENABLED:
+        profiler.start()
+    return app
+
+def _secret_key():
+    """SECRET_KEY from the environment, else a random key created once and saved for every worker and restart"""
+    # The session cookie decides whose watchlist a request may read and change, so the key must never be guessable
+    if Config.SECRET_KEY:
+        return Config.SECRET_KEY
+    path = Config.SECRET_KEY_PATH
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # link fails if another worker saved its key first; everyone then uses that one
+            os.link(temp_path, path)
+            print(f"Generated a new secret key in {path}")
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    with open(path) as f:
+        return f.read().strip()
+
+# Addresses /debug/profile answers; profiles show the code and hold a worker while they collect
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+# Chart types served by /analyze and /api/chart
+CHART_KINDS = ('summary', 'price', 'technical', 'volume', 'financial')
+
+@bp.before_app_request
+def create_tables():
+    """Create missing database tables once, before the first request that may need them"""
+    extensions = current_app.extensions
+    if extensions.get('tables_created') or request.endpoint in ('main.healthz', 'static'):
+        return
+    with tables_lock:
+        if not extensions.get('tables_created'):
+            _create_tables()
+            extensions['tables_created'] = True
+            # Ready before the first ticker lookup needs it, without holding up this request
+            services.symbol_directory().start()
+
+def _create_tables():
+    # Another worker process may create a table between the existence check and CREATE TABLE;
+    # each such collision means one more table exists, so the retries always make progress
+    for attempt in range(len(db.metadata.tables) + 1):
+        try:
+            db.create_all()
+            break
+        except OperationalError:
+            if attempt == len(db.metadata.tables):
+                raise
+    upgrade_schema()
+
+@bp.before_app_request
+def start_request_timer():
+    """Note when the request started, for the request duration histogram"""
+    g.request_started = time.perf_counter()
+
+@bp.after_app_request
+def record_request_metrics(response):
+    """Count the request and record how long it took by endpoint"""
+    endpoint = request.endpoint or 'unmatched'
+    metrics.inc('http_requests_total', endpoint=endpoint, status=response.status_code)
+    if 'request_started' in g:
+        metrics.observe('http_request_seconds', time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
+
+@bp.after_app_request
+def compress_response(response):
+    """Compress large JSON and page responses for clients that accept gzip or brotli"""
+    return compression.compress_response(response, request.accept_encodings)
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness check that touches neither the database nor the upstream API"""
+    return jsonify({'status': 'ok', 'services': services.loaded()})
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Counters and timing histograms in the Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@bp.route('/debug/profile')
+def debug_profile():
+    """Stacks sampled over the next ?seconds=N in collapsed flamegraph format; ?idle=true keeps blocked threads"""
+    if not Config.PROFILER_ENABLED or not profiler.running:
+        return jsonify({'error': 'Profiler is disabled, set PROFILER_ENABLED to use it'}), 404
+    if request.remote_addr not in LOCAL_ADDRESSES:
+        return jsonify({'error': 'Profiles are only served to requests from this machine'}), 403
+    
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), Config.PROFILER_MAX_SECONDS)
+    include_idle = request.args.get('idle', 'false').lower() == 'true'
+    stacks = profiler.collect(seconds, include_idle=include_idle)
+    
+    response = Response(''.join(f'{stack} {count}\n' for stack, count in stacks), mimetype='text/plain')
+    response.headers['X-Profiler-Overhead'] = f'{profiler.overhead():.4f}'
+    return response
+
+@bp.route('/')
 def home():
     return render_template('home.html')
 
-@app.route('/analyze')
+@bp.route('/analyze')
 def analyze_page():
     """Display the analysis page with a pre-filled ticker"""
     ticker = request.args.get('symbol', '')
     return render_template('home.html', ticker=ticker)
 
-@app.route('/watchlist')
+@bp.route('/watchlist')
 def watchlist():
     """Display the watchlist page"""
     return render_template('watchlist.html')
 
-@app.route('/screener')
+@bp.route('/screener')
 def screener():
     """Display the stock screener page"""
     return render_template('screener.html')
 
-@app.route('/market/gainers-losers')
+@bp.route('/market/gainers-losers')
 def gainers_losers():
     """Redirect to the stock screener page"""
-    return redirect(url_for('screener'))
+    return redirect(url_for('.screener'))
 
-@app.route('/api/watchlist', methods=['GET'])
+def current_user_id():
+    """Anonymous id for this browser, created on its first watchlist request and kept in the session cookie"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        user_id = session['user_id'] = secrets.token_hex(16)
+        session.permanent = True
+        _claim_legacy_watchlist(user_id)
+    # Recorded once a day, so the background refresh can skip watchlists nobody opens any more
+    today = datetime.utcnow().date().isoformat()
+    if session.get('active_on') != today:
+        db.session.execute(
+            sqlite_insert(WatchlistUser.__table__)
+            .values(user_id=user_id, last_seen=datetime.utcnow())
+            .on_conflict_do_update(index_elements=['user_id'], set_={'last_seen': datetime.utcnow()})
+        )
+        db.session.commit()
+        session['active_on'] = today
+    return user_id
+
+def _claim_legacy_watchlist(user_id):
+    """Hand the watchlist saved before per-browser ids to the first new session; later sessions find none left"""
+    claimed = Watchlist.query.filter_by(user_id=LEGACY_USER_ID).update({'user_id': user_id}, synchronize_session=False)
+    db.session.commit()
+    if claimed:
+        print(f"Moved {claimed} watchlist items from {LEGACY_USER_ID} to a new session")
+
+@bp.route('/api/watchlist', methods=['GET'])
 def get_watchlist():
     """Get all stocks in the watchlist"""
-    watchlist_items = Watchlist.query.filter_by(user_id='default_user').all()
+    watchlist_items = Watchlist.query.filter_by(user_id=current_user_id()).all()
     return jsonify([item.to_dict() for item in watchlist_items])
 
-@app.route('/api/watchlist/add', methods=['POST'])
+@bp.route('/api/watchlist/add', methods=['POST'])
 def add_to_watchlist():
     """Add a stock to the watchlist"""
     data = request.json
-    symbol = data.get('symbol', '').upper()
+    symbol = data.get('symbol', '').strip().upper()
     
-    # Check if already in watchlist
-    existing = Watchlist.query.filter_by(user_id='default_user', symbol=symbol).first()
-    if existing:
-        return jsonify({'status': 'exists', 'message': f'{symbol} is already in your watchlist'})
-        
-    # Add to watchlist
-    new_item = Watchlist(user_id='default_user', symbol=symbol)
+    symbols, invalid = normalize_symbols([symbol])
+    if invalid or not symbols:
+        return jsonify({'status': 'error', 'message': f'Invalid ticker symbol: {symbol}'}), 400
+    error = _unknown_symbol_error(symbol)
+    if error:
+        return jsonify({'status': 'error', **error}), 404
+    
+    # The unique (user_id, symbol) index rejects duplicates, including two adds racing each other
+    new_item = Watchlist(user_id=current_user_id(), symbol=symbol)
     db.session.add(new_item)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'status': 'exists', 'message': f'{symbol} is already in your watchlist'})
+    
+    # Compute the new symbol's snapshot row before the watchlist page asks for it
+    snapshot_refresher.touch(current_app._get_current_object())
+    snapshot_refresher.wake()
     
     return jsonify({'status': 'success', 'message': f'{symbol} added to watchlist', 'item': new_item.to_dict()})
 
-@app.route('/api/watchlist/remove/<int:item_id>', methods=['DELETE'])
+@bp.route('/api/watchlist/remove/<int:item_id>', methods=['DELETE'])
 def remove_from_watchlist(item_id):
     """Remove a stock from the watchlist"""
-    item = Watchlist.query.get(item_id)
+    item = Watchlist.query.filter_by(id=item_id, user_id=current_user_id()).first()
     if not item:
         return jsonify({'status': 'error', 'message': 'Item not found'}), 404
         
@@ -91,108 +259,382 @@ def remove_from_watchlist(item_id):
     
     return jsonify({'status': 'success', 'message': f'{symbol} removed from watchlist'})
 
-@app.route('/api/watchlist/clear', methods=['DELETE'])
+@bp.route('/api/watchlist/clear', methods=['DELETE'])
 def clear_watchlist():
     """Clear all stocks from the watchlist"""
     try:
-        # Delete all watchlist items for the default user
-        Watchlist.query.filter_by(user_id='default_user').delete()
+        # Delete all watchlist items for this user
+        Watchlist.query.filter_by(user_id=current_user_id()).delete()
         db.session.commit()
         return jsonify({'status': 'success', 'message': 'Watchlist cleared successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'status': 'error', 'message': f'Error clearing watchlist: {str(e)}'}), 500
 
-@app.route('/api/watchlist/data', methods=['GET'])
-def get_watchlist_data():
-    """Get detailed data for all stocks in the watchlist"""
-    watchlist_items = Watchlist.query.filter_by(user_id='default_user').all()
-    
-    # Gather data for all watchlist items
-    watchlist_data = []
-    for item in watchlist_items:
-        # Fetch company data
-        dataset, error = data_fetcher.compile_complete_dataset(item.symbol)
-        if error:
-            watchlist_data.append({
-                'id': item.id,
-                'symbol': item.symbol,
-                'error': error
-            })
-            continue
-            
-        # Extract key metrics
-        company_overview = dataset.get('company_overview', {})
-        supplementary_data = dataset.get('supplementary_data', {})
-        balance_sheet = dataset.get('balance_sheet', {})
+@bp.route('/api/watchlist/export', methods=['GET'])
+def export_watchlist():
+    """Download the watchlist as ?format=csv (default) or json"""
+    items = [item.to_dict() for item in Watchlist.query.filter_by(user_id=current_user_id()).order_by(Watchlist.id)]
+    for item in items:
+        item.pop('id')
+    
+    if request.args.get('format', 'csv').lower() == 'json':
+        response = Response(json_encoder.dumps(items), mimetype='application/json')
+        filename = 'watchlist.json'
+    else:
+        response = Response(watchlist_io.export_csv(items), mimetype='text/csv')
+        filename = 'watchlist.csv'
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+@bp.route('/api/watchlist/import', methods=['POST'])
+def import_watchlist():
+    """Add every symbol from an uploaded CSV or JSON watchlist in one transaction"""
+    # A file upload, or the file's contents as the request body
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig', errors='replace')
+        is_json = upload.filename.lower().endswith('.json') or upload.mimetype == 'application/json'
+    else:
+        text = request.get_data(as_text=True)
+        is_json = request.mimetype == 'application/json'
+    
+    entries, error = watchlist_io.parse_import(text, 'json' if is_json else 'csv')
+    if error:
+        return jsonify({'status': 'error', 'message': error}), 400
+    
+    symbols, invalid = normalize_symbols(symbol for symbol, _ in entries)
+    if len(symbols) > Config.WATCHLIST_IMPORT_MAX:
+        return jsonify({'status': 'error', 'message': f'At most {Config.WATCHLIST_IMPORT_MAX} symbols per import'}), 400
+    # Unlisted symbols are reported with the malformed ones instead of being added
+    unknown = set(_unknown_symbols(symbols))
+    if unknown:
+        invalid += [symbol for symbol in symbols if symbol in unknown]
+        symbols = [symbol for symbol in symbols if symbol not in unknown]
+    notes = {symbol.strip().upper(): note for symbol, note in entries if note}
+    
+    # One query finds the symbols already on the watchlist, one statement inserts the rest
+    user_id = current_user_id()
+    existing = {symbol for (symbol,) in db.session.query(Watchlist.symbol)
+                .filter(Watchlist.user_id == user_id, Watchlist.symbol.in_(symbols))}
+    new_symbols = [symbol for symbol in symbols if symbol not in existing]
+    added = 0
+    if new_symbols:
+        # OR IGNORE keeps the import whole if a concurrent add inserted one of these symbols meanwhile
+        result = db.session.execute(
+            sqlite_insert(Watchlist.__table__).on_conflict_do_nothing(),
+            [{'user_id': user_id, 'symbol': symbol, 'notes': notes.get(symbol)} for symbol in new_symbols]
+        )
+        db.session.commit()
+        added = result.rowcount
         
-        # Format market cap
-        market_cap = 'N/A'
-        if company_overview and 'MarketCapitalization' in company_overview:
-            market_cap_val = int(company_overview['MarketCapitalization'])
-            if market_cap_val >= 1_000_000_000:
-                market_cap = f"${market_cap_val / 1_000_000_000:.2f}B"
-            elif market_cap_val >= 1_000_000:
-                market_cap = f"${market_cap_val / 1_000_000:.2f}M"
+        snapshot_refresher.touch(current_app._get_current_object())
+        snapshot_refresher.wake()
+    
+    print(f"Watchlist import: {added} added, {len(existing)} already present, {len(invalid)} invalid")
+    return jsonify({
+        'status': 'success',
+        'message': f'{added} symbols added to watchlist',
+        'added': added,
+        'existing': sorted(existing),
+        'invalid': invalid
+    })
+
+@bp.route('/api/symbols/search', methods=['GET'])
+def search_symbols():
+    """Listed tickers and companies matching ?q=, for autocomplete"""
+    query = request.args.get('q', '')[:64]
+    limit = max(1, min(request.args.get('limit', 10, type=int), Config.SYMBOL_SEARCH_MAX_RESULTS))
+    directory = services.symbol_directory()
+    results = directory.search(query, limit)
+    return jsonify({'query': query, 'results': results, 'ready': directory.ready})
+
+def _unknown_symbols(symbols):
+    """Symbols the symbol directory knows are not listed, so no upstream call is made for them"""
+    directory = services.symbol_directory()
+    unknown = [symbol for symbol in symbols if directory.known(symbol) is False]
+    if unknown:
+        metrics.inc('unknown_symbols_total', len(unknown), endpoint=request.endpoint)
+    return unknown
+
+def _unknown_symbol_error(symbol):
+    """Error message and close matches for an unlisted symbol, or None if it is listed or cannot be checked"""
+    if not _unknown_symbols([symbol]):
+        return None
+    suggestions = [match['symbol'] for match in services.symbol_directory().similar(symbol, 5)]
+    message = f'Unknown ticker symbol: {symbol}'
+    if suggestions:
+        message += f". Did you mean {', '.join(suggestions)}?"
+    return {'message': message, 'suggestions': suggestions}
+
+@bp.route('/api/watchlist/data', methods=['GET'])
+def get_watchlist_data():
+    """Get detailed data for all stocks in the watchlist from the snapshot table"""
+    snapshot_refresher.touch(current_app._get_current_object())
+    
+    with metrics.span('stage_seconds', stage='watchlist_query'):
+        items = _watchlist_snapshots()
+    
+    now = datetime.utcnow()
+    watchlist_data = [_snapshot_row(item_id, symbol, snapshot, now) for item_id, symbol, snapshot in items]
+    # Rows nobody has computed yet, or that went stale, are refreshed now rather than at the next pass
+    if any(row.get('pending') or row.get('stale') for row in watchlist_data):
+        snapshot_refresher.wake()
+    
+    with metrics.span('stage_seconds', stage='serialize'):
+        response = jsonify(watchlist_data)
+    ages = [row['age_seconds'] for row in watchlist_data if 'age_seconds' in row]
+    response.headers['X-Snapshot-Age'] = str(max(ages) if ages else 0)
+    return response
+
+@bp.route('/api/watchlist/stream', methods=['GET'])
+def stream_watchlist_data():
+    """Stream watchlist rows as NDJSON: fresh snapshot rows at once, then missing or stale rows as they are computed"""
+    snapshot_refresher.touch(current_app._get_current_object())
+    items = _watchlist_snapshots()
+    now = datetime.utcnow()
+    
+    def generate():
+        due = []
+        for item_id, symbol, snapshot in items:
+            row = _snapshot_row(item_id, symbol, snapshot, now)
+            if row.get('pending') or row.get('stale'):
+                due.append((item_id, symbol))
             else:
-                market_cap = f"${market_cap_val / 1_000:.2f}K"
-        
-        # Compile stock data
-        stock_data = {
-            'id': item.id,
-            'symbol': item.symbol,
-            'name': company_overview.get('Name', 'N/A'),
-            'sector': company_overview.get('Sector', 'N/A'),
-            'price': dataset.get('global_quote', {}).get('05. price', 'N/A'),
-            'change_percent': dataset.get('global_quote', {}).get('10. change percent', 'N/A'),
-            'market_cap': market_cap,
-            'current_ratio': company_overview.get('CurrentRatio', 'N/A'),
-            'institutional_ownership': company_overview.get('PercentInstitutions', 'N/A'),
-            'insider_ownership': company_overview.get('PercentInsiders', 'N/A'),
-            'current_volume': supplementary_data.get('current_volume', 'N/A'),
-            'relative_volume': supplementary_data.get('relative_volume', 'N/A'),
-            'short_float': supplementary_data.get('short_float', 'N/A'),
-            'float': supplementary_data.get('float', 'N/A')
-        }
+                yield json_encoder.dumps(row) + '\n'
         
-        # Get intangible assets if available
-        if balance_sheet and 'annualReports' in balance_sheet and balance_sheet['annualReports']:
-            latest_report = balance_sheet['annualReports'][0]
-            if 'intangibleAssets' in latest_report:
-                intangible_assets = int(latest_report['intangibleAssets'])
-                if intangible_assets >= 1_000_000_000:
-                    stock_data['intangible_assets'] = f"${intangible_assets / 1_000_000_000:.2f}B"
-                elif intangible_assets >= 1_000_000:
-                    stock_data['intangible_assets'] = f"${intangible_assets / 1_000_000:.2f}M"
-                else:
-                    stock_data['intangible_assets'] = f"${intangible_assets / 1_000:.2f}K"
+        for item_id, symbol in due:
+            try:
+                row = _build_watchlist_row(item_id, symbol)
+                _store_snapshot(symbol, row)
+                row.update(refreshed_at=datetime.utcnow().isoformat(timespec='seconds'), age_seconds=0, stale=False)
+            except Exception as e:
+                # A bad row must not cut the stream short for the rest of the watchlist
+                print(f"Error building watchlist row for {symbol}: {str(e)}")
+                row = {'id': item_id, 'symbol': symbol, 'error': str(e)}
+            yield json_encoder.dumps(row) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Ask reverse proxies not to buffer the rows
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _watchlist_snapshots():
+    """The user's watchlist items with their snapshot rows, as (item id, symbol, snapshot or None) in one query"""
+    return (db.session.query(Watchlist.id, Watchlist.symbol, WatchlistSnapshot)
+            .outerjoin(WatchlistSnapshot, WatchlistSnapshot.symbol == Watchlist.symbol)
+            .filter(Watchlist.user_id == current_user_id())
+            .order_by(Watchlist.id)
+            .all())
+
+def _snapshot_due(snapshot, now):
+    """Whether a snapshot row should be recomputed; failed rows are retried after one refresh interval"""
+    max_age = Config.WATCHLIST_REFRESH_INTERVAL if snapshot.error else Config.WATCHLIST_SNAPSHOT_MAX_AGE
+    return (now - snapshot.refreshed_at).total_seconds() >= max_age
+
+def _snapshot_row(item_id, symbol, snapshot, now):
+    """Watchlist API row from a stored snapshot, with its age; a placeholder until the first snapshot exists"""
+    if snapshot is None:
+        return {'id': item_id, 'symbol': symbol, 'pending': True}
+    row = json.loads(snapshot.data)
+    row['id'] = item_id
+    row['refreshed_at'] = snapshot.refreshed_at.isoformat(timespec='seconds')
+    row['age_seconds'] = int((now - snapshot.refreshed_at).total_seconds())
+    row['stale'] = _snapshot_due(snapshot, now)
+    return row
+
+def _store_snapshot(symbol, row):
+    """Save a computed watchlist row as the symbol's snapshot"""
+    data = {key: value for key, value in row.items() if key != 'id'}
+    db.session.merge(WatchlistSnapshot(symbol=symbol, data=json_encoder.dumps(data), error=row.get('error'),
+                                       refreshed_at=datetime.utcnow()))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker process stored this symbol first; its row is just as fresh
+        db.session.rollback()
+
+def _refresh_watchlist_snapshots():
+    """Recompute missing and stale snapshot rows for the symbols on recently used watchlists, oldest first"""
+    active_since = datetime.utcnow() - timedelta(days=Config.WATCHLIST_ACTIVE_DAYS)
+    symbols = {symbol for (symbol,) in db.session.query(Watchlist.symbol)
+               .join(WatchlistUser, WatchlistUser.user_id == Watchlist.user_id)
+               .filter(WatchlistUser.last_seen >= active_since)
+               .distinct()}
+    snapshots = {snapshot.symbol: snapshot for snapshot in WatchlistSnapshot.query.all()}
+    
+    # Symbols no active watchlist holds are not worth keeping fresh; they are recomputed when next viewed
+    removed = [symbol for symbol in snapshots if symbol not in symbols]
+    if removed:
+        WatchlistSnapshot.query.filter(WatchlistSnapshot.symbol.in_(removed)).delete(synchronize_session=False)
+        db.session.commit()
+    
+    now = datetime.utcnow()
+    due = sorted((symbol for symbol in symbols if symbol not in snapshots or _snapshot_due(snapshots[symbol], now)),
+                 key=lambda symbol: snapshots[symbol].refreshed_at if symbol in snapshots else datetime.min)
+    # The call count includes every caller in this process, so the pass also yields to interactive traffic
+    fetcher = services.data_fetcher()
+    calls_before = fetcher.upstream_calls
+    refreshed = 0
+    for symbol in due:
+        if fetcher.upstream_calls - calls_before >= Config.WATCHLIST_REFRESH_MAX_CALLS:
+            print(f"Watchlist refresh call budget used, {len(due) - refreshed} rows left for the next pass")
+            break
+        # Every worker process runs a refresher; the lease keeps them from computing the same symbol
+        if not _claim_snapshot(symbol):
+            continue
+        try:
+            current = (db.session.query(WatchlistSnapshot.refreshed_at, WatchlistSnapshot.error)
+                       .filter(WatchlistSnapshot.symbol == symbol).first())
+            if current is not None and not _snapshot_due(current, datetime.utcnow()):
+                continue  # Another process refreshed it after this pass listed it
+            try:
+                row = _compute_watchlist_row(symbol)
+            except Exception as e:
+                print(f"Error building watchlist row for {symbol}: {str(e)}")
+                row = {'symbol': symbol, 'error': str(e)}
+            _store_snapshot(symbol, row)
+            refreshed += 1
+        finally:
+            SnapshotLease.query.filter_by(symbol=symbol).delete()
+            db.session.commit()
+    
+    if refreshed:
+        print(f"Refreshed {refreshed} watchlist snapshot rows")
+    return refreshed
+
+def _claim_snapshot(symbol):
+    """Lease a symbol's snapshot refresh to this process; False while another process holds it"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=Config.WATCHLIST_REFRESH_LEASE)
+    lease = SnapshotLease.__table__
+    # One statement, so two processes can never both see the lease as free
+    result = db.session.execute(
+        sqlite_insert(lease).values(symbol=symbol, expires_at=expires_at)
+        .on_conflict_do_update(index_elements=['symbol'], set_={'expires_at': expires_at},
+                               where=lease.c.expires_at <= now)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+snapshot_refresher = SnapshotRefresher(_refresh_watchlist_snapshots)
+
+def _build_watchlist_row(item_id, symbol):
+    """Fetch the dataset for one watchlist stock and extract its table row"""
+    return dict(id=item_id, **_compute_watchlist_row(symbol))
+
+def _compute_watchlist_row(symbol):
+    """Table row for one symbol, without the watchlist item id"""
+    # Fetch company data
+    dataset, error = services.data_fetcher().compile_complete_dataset(symbol)
+    if error:
+        return {
+            'symbol': symbol,
+            'error': error
+        }
+    _record_fundamentals(symbol, dataset)
+    
+    # Extract key metrics
+    company_overview = dataset.get('company_overview', {})
+    supplementary_data = dataset.get('supplementary_data', {})
+    balance_sheet = dataset.get('balance_sheet', {})
+    
+    # Format market cap
+    market_cap = 'N/A'
+    if company_overview and 'MarketCapitalization' in company_overview:
+        market_cap_val = int(company_overview['MarketCapitalization'])
+        if market_cap_val >= 1_000_000_000:
+            market_cap = f"${market_cap_val / 1_000_000_000:.2f}B"
+        elif market_cap_val >= 1_000_000:
+            market_cap = f"${market_cap_val / 1_000_000:.2f}M"
+        else:
+            market_cap = f"${market_cap_val / 1_000:.2f}K"
+    
+    # Compile stock data
+    stock_data = {
+        'symbol': symbol,
+        'name': company_overview.get('Name', 'N/A'),
+        'sector': company_overview.get('Sector', 'N/A'),
+        'price': dataset.get('global_quote', {}).get('05. price', 'N/A'),
+        'change_percent': dataset.get('global_quote', {}).get('10. change percent', 'N/A'),
+        'market_cap': market_cap,
+        'current_ratio': company_overview.get('CurrentRatio', 'N/A'),
+        'institutional_ownership': company_overview.get('PercentInstitutions', 'N/A'),
+        'insider_ownership': company_overview.get('PercentInsiders', 'N/A'),
+        'current_volume': supplementary_data.get('current_volume', 'N/A'),
+        'relative_volume': supplementary_data.get('relative_volume', 'N/A'),
+        'short_float': supplementary_data.get('short_float', 'N/A'),
+        'float': supplementary_data.get('float', 'N/A')
+    }
+    
+    # Get intangible assets if available
+    if balance_sheet and 'annualReports' in balance_sheet and balance_sheet['annualReports']:
+        latest_report = balance_sheet['annualReports'][0]
+        if 'intangibleAssets' in latest_report:
+            intangible_assets = int(latest_report['intangibleAssets'])
+            if intangible_assets >= 1_000_000_000:
+                stock_data['intangible_assets'] = f"${intangible_assets / 1_000_000_000:.2f}B"
+            elif intangible_assets >= 1_000_000:
+                stock_data['intangible_assets'] = f"${intangible_assets / 1_000_000:.2f}M"
             else:
-                stock_data['intangible_assets'] = 'N/A'
+                stock_data['intangible_assets'] = f"${intangible_assets / 1_000:.2f}K"
         else:
             stock_data['intangible_assets'] = 'N/A'
-            
-        watchlist_data.append(stock_data)
+    else:
+        stock_data['intangible_assets'] = 'N/A'
         
-    return jsonify(watchlist_data)
+    return stock_data
 
-@app.route('/api/gainers-losers', methods=['GET'])
+@bp.route('/api/gainers-losers', methods=['GET'])
 def get_gainers_losers_data():
-    """Fetch top gainers and losers data from Alpha Vantage"""
+    """Return the latest top gainers and losers snapshot from the shared market feed"""
+    snapshot = market_feed.latest(timeout=Config.API_TIMEOUT)
+    if snapshot is None:
+        return jsonify({"error": "Market data is not available yet, please try again shortly"}), 503
+    
+    response = compression.encoded_response(snapshot['body'], snapshot['encoded'], request.accept_encodings)
+    if snapshot['error']:
+        response.status_code = 400
+    return response
+
+@bp.route('/api/gainers-losers/stream', methods=['GET'])
+def stream_gainers_losers_data():
+    """Push every market movers snapshot to the browser as Server-Sent Events"""
+    def generate():
+        # Tell EventSource how long to wait before reconnecting after a dropped connection
+        yield f"retry: {Config.MARKET_FEED_HEARTBEAT * 1000}\n\n"
+        
+        for snapshot in market_feed.subscribe():
+            if snapshot is None:
+                # Comment line keeps idle connections from being closed by proxies
+                yield ": keep-alive\n\n"
+                continue
+            
+            yield f"data: {snapshot['body'].decode('utf-8')}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _fetch_market_movers():
+    """Fetch top gainers and losers data from Alpha Vantage, returning (processed_data, error)"""
     try:
         # Initialize parameters for API call
         params = {
             "function": "TOP_GAINERS_LOSERS",
-            "apikey": data_fetcher.api_key
+            "apikey": services.data_fetcher().api_key
         }
         
         # Make the API request
-        data, error = data_fetcher._make_request(params)
+        data, error = services.data_fetcher()._make_request(params)
         
         if error:
-            return jsonify({"error": error}), 400
+            return None, error
             
         if not data or not all(key in data for key in ['top_gainers', 'top_losers', 'most_actively_traded']):
-            return jsonify({"error": "Invalid data format received from API"}), 400
+            return None, "Invalid data format received from API"
         
         # Process the data to include additional fields
         processed_data = {
@@ -216,13 +658,16 @@ def get_gainers_losers_data():
             processed_item = _process_market_movers_item(item)
             processed_data['most_active'].append(processed_item)
         
-        return jsonify(processed_data)
+        return processed_data, None
         
     except Exception as e:
         print(f"Error fetching gainers/losers data: {str(e)}")
         import traceback
         traceback.print_exc()
-        return jsonify({"error": f"Server error: {str(e)}"}), 500
+        return None, f"Server error: {str(e)}"
+
+# A single poller shares each upstream TOP_GAINERS_LOSERS call between all clients
+market_feed = MarketFeed(_fetch_market_movers)
 
 def _process_market_movers_item(item):
     """Process a market mover item to add formatted fields"""
@@ -261,6 +706,145 @@ def _process_market_movers_item(item):
     
     return processed
 
+@bp.route('/api/screener', methods=['GET'])
+def screen_universe():
+    """Filter, sort and page every symbol in the fundamentals table, e.g. ?min_market_cap=1e10&sector=TECHNOLOGY&sort=pe_ratio"""
+    from modules.screener import parse_query
+    
+    query, error = parse_query(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    screener = services.screener()
+    screener.refresh(_fundamentals_version, _load_fundamentals)
+    started = time.perf_counter()
+    result = screener.screen(query)
+    elapsed = time.perf_counter() - started
+    metrics.observe('stage_seconds', elapsed, stage='screen')
+    result['elapsed_ms'] = round(elapsed * 1000, 3)
+    return jsonify(result)
+
+def _fundamentals_version():
+    """Row count and latest update of the fundamentals table, which change whenever a row is written"""
+    count, updated_at = db.session.query(func.count(Fundamentals.symbol), func.max(Fundamentals.updated_at)).one()
+    return count, updated_at
+
+def _load_fundamentals():
+    """Every fundamentals row as a tuple in the screener's column order, sorted by symbol"""
+    from modules.screener import LOAD_COLUMNS
+    table = Fundamentals.__table__
+    return db.session.execute(select(*(table.c[name] for name in LOAD_COLUMNS)).order_by(table.c.symbol)).all()
+
+def _record_fundamentals(symbol, dataset):
+    """Save the screener fields of a freshly compiled dataset, once per compile"""
+    import pandas as pd
+    from modules.fundamentals import parse_overview, price_metrics
+    
+    # The dataset stays cached for CACHE_DURATION; its values do not change until it is compiled again
+    if dataset.get('fundamentals_recorded'):
+        return
+    row = {'symbol': symbol}
+    overview = dataset.get('company_overview')
+    if isinstance(overview, dict):
+        row.update(parse_overview(overview))
+    time_series = dataset.get('time_series')
+    if isinstance(time_series, pd.DataFrame) and not time_series.empty:
+        row.update(price_metrics(time_series))
+    try:
+        _store_fundamentals([row])
+        dataset['fundamentals_recorded'] = True
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving fundamentals for {symbol}: {str(e)}")
+
+def _store_fundamentals(rows):
+    """Upsert fundamentals rows; columns a row does not carry keep their stored values"""
+    table = Fundamentals.__table__
+    now = datetime.utcnow()
+    # Rows with the same columns go in one executemany statement
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(dict(row, updated_at=now))
+    for columns, group in groups.items():
+        statement = sqlite_insert(table)
+        update = {name: statement.excluded[name] for name in columns + ('updated_at',) if name != 'symbol'}
+        db.session.execute(statement.on_conflict_do_update(index_elements=['symbol'], set_=update), group)
+    db.session.commit()
+
+@bp.cli.command('ingest')
+@click.option('--symbols', help='Comma separated symbols to ingest instead of every listed stock')
+@click.option('--limit', type=int, help='Only the first LIMIT symbols, in ticker order')
+@click.option('--workers', type=int, help='Parsing processes (0 parses in the fetching process)')
+@click.option('--retry-failed', is_flag=True, help=f'Also retry items that failed {Config.INGEST_MAX_ATTEMPTS} times')
+@click.option('--restart', is_flag=True, help='Forget every checkpoint and fetch everything again')
+def ingest_command(symbols, limit, workers, retry_failed, restart):
+    """Fill the fundamentals table for the listed stocks, resuming from the last checkpoint"""
+    from modules.ingestion import FUNCTIONS, Ingestion
+    _create_tables()
+    if restart:
+        IngestionCheckpoint.query.delete()
+        db.session.commit()
+
+    if symbols:
+        symbol_list, invalid = normalize_symbols(symbols.split(','))
+        if invalid:
+            raise click.BadParameter(f"Invalid symbols: {', '.join(invalid)}", param_hint='--symbols')
+    else:
+        services.symbol_directory().wait()
+        symbol_list = services.symbol_directory().symbols()
+        if not symbol_list:
+            raise click.ClickException('The symbol directory could not be loaded')
+    if limit:
+        symbol_list = symbol_list[:limit]
+
+    items = _pending_ingestion(symbol_list, FUNCTIONS, retry_failed)
+    total = len(symbol_list) * len(FUNCTIONS)
+    print(f"{len(items)} of {total} items to fetch, {total - len(items)} already checkpointed; "
+          f"about {len(items) / Config.REQUESTS_PER_MINUTE:.0f} min at {Config.REQUESTS_PER_MINUTE} requests/min")
+    if not items:
+        return
+    counts = Ingestion(services.data_fetcher().fetch_raw, _save_ingested, parse_workers=workers).run(items)
+    if counts['pending']:
+        print(f"Ingestion stopped: {counts['stored']} stored, {counts['failed']} failed, {counts['pending']} left for the next run")
+    else:
+        print(f"Ingestion finished: {counts['stored']} stored, {counts['failed']} failed")
+
+def _pending_ingestion(symbols, functions, retry_failed=False):
+    """(symbol, function) items with no checkpoint, a stale one, or a failure still worth retrying"""
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.INGEST_REFRESH_AFTER)
+    checkpoints = {(row.symbol, row.function): row for row in IngestionCheckpoint.query.all()}
+    items = []
+    for symbol in symbols:
+        for function in functions:
+            checkpoint = checkpoints.get((symbol, function))
+            if (checkpoint is None or checkpoint.updated_at < cutoff
+                    or (checkpoint.status == 'failed' and (retry_failed or checkpoint.attempts < Config.INGEST_MAX_ATTEMPTS))):
+                items.append((symbol, function))
+    return items
+
+def _save_ingested(results):
+    """Store a batch of parsed ingestion results together with their checkpoints"""
+    table = IngestionCheckpoint.__table__
+    now = datetime.utcnow()
+    checkpoints = [{
+        'symbol': symbol,
+        'function': function,
+        'status': 'failed' if error else 'done',
+        'attempts': 1 if error else 0,
+        'error': error,
+        'updated_at': now
+    } for symbol, function, columns, error in results]
+    statement = sqlite_insert(table)
+    excluded = statement.excluded
+    db.session.execute(statement.on_conflict_do_update(index_elements=['symbol', 'function'], set_={
+        'status': excluded.status,
+        'attempts': case((excluded.status == 'done', 0), else_=table.c.attempts + 1),
+        'error': excluded.error,
+        'updated_at': excluded.updated_at
+    }), checkpoints)
+    # _store_fundamentals commits, so the rows and their checkpoints land in one transaction
+    _store_fundamentals([dict(columns, symbol=symbol) for symbol, function, columns, error in results if not error])
+
 def extract_float_value(value_str):
     """Extract numerical value from formatted string"""
     if value_str == "N/A" or value_str == "None" or not value_str:
@@ -278,285 +862,434 @@ def extract_float_value(value_str):
     
     return 0
 
-@app.route('/analyze', methods=['POST'])
+def _build_analysis_data(dataset):
+    """Assemble the chart and metrics inputs from a compiled dataset"""
+    time_series_data = dataset.get('time_series')
+    
+    # Extract supplementary data
+    company_overview = dataset.get('company_overview', {})
+    supplementary_data = dataset.get('supplementary_data', {})
+    balance_sheet = dataset.get('balance_sheet', {})
+    income_statement = dataset.get('income_statement', {})
+    insider_transactions = dataset.get('insider_transactions', {})
+    global_quote = dataset.get('global_quote', {})
+    
+    # Initialize data dictionary with enhanced structure
+    data = {
+        'price_data': time_series_data,
+        'financial_data': {},
+        'market_data': {},
+        'insider_data': {'transactions': []},
+        'calculated_metrics': {},
+        'ownership_data': {}
+    }
+    
+    # Process company overview data
+    if company_overview and isinstance(company_overview, dict):
+        # Extract financial metrics with safe conversion
+        data['financial_data'] = {
+            'current_ratio': extract_float_value(company_overview.get('CurrentRatio', 0)),
+            'current_ratio_formatted': company_overview.get('CurrentRatioFormatted', 'N/A'),
+            'debt_to_equity': extract_float_value(company_overview.get('DebtToEquityRatio', 0)),
+            'profit_margin': extract_float_value(company_overview.get('ProfitMargin', 0)),
+            'roe': extract_float_value(company_overview.get('ReturnOnEquityTTM', 0)),
+            'eps': extract_float_value(company_overview.get('EPS', 0)),
+            'pe_ratio': extract_float_value(company_overview.get('PERatio', 0)),
+            'beta': extract_float_value(company_overview.get('Beta', 0)),
+            'dividend_yield': extract_float_value(company_overview.get('DividendYield', 0)),
+            'market_cap': extract_float_value(company_overview.get('MarketCapitalization', 0)),
+            'market_cap_formatted': company_overview.get('MarketCapFormatted', 'N/A')
+        }
+        
+        # Extract ownership data
+        data['ownership_data'] = {
+            'insider_ownership': company_overview.get('InsiderOwnership', 'N/A'),
+            'institutional_ownership': company_overview.get('InstitutionalOwnership', 'N/A'),
+            'float': company_overview.get('FloatFormatted', 'N/A'),
+            'shares_outstanding': company_overview.get('SharesOutstanding', 'N/A')
+        }
+        
+        # Add market cap formatted value
+        if 'MarketCapFormatted' in company_overview:
+            data['financial_data']['market_cap_formatted'] = company_overview['MarketCapFormatted']
+        
+        # Add ownership data
+        if 'InstitutionalOwnership' in company_overview:
+            data['financial_data']['institutional_ownership'] = company_overview['InstitutionalOwnership']
+            
+        if 'InsiderOwnership' in company_overview:
+            data['financial_data']['insider_ownership'] = company_overview['InsiderOwnership']
+        
+        # Add float data
+        if 'FloatFormatted' in company_overview:
+            data['financial_data']['float'] = company_overview['FloatFormatted']
+        
+        # Add current ratio
+        if 'CurrentRatioFormatted' in company_overview:
+            data['financial_data']['current_ratio_formatted'] = company_overview['CurrentRatioFormatted']
+        
+        # If company_overview contains pre-formatted values, use them directly
+        if 'ProfitMargin' in company_overview and isinstance(company_overview['ProfitMargin'], str) and '%' in company_overview['ProfitMargin']:
+            data['financial_data']['profit_margin_formatted'] = company_overview['ProfitMargin']
+            
+        if 'ReturnOnEquityTTM' in company_overview and isinstance(company_overview['ReturnOnEquityTTM'], str) and '%' in company_overview['ReturnOnEquityTTM']:
+            data['financial_data']['roe_formatted'] = company_overview['ReturnOnEquityTTM']
+            
+        if 'GrossMargin' in company_overview:
+            data['financial_data']['gross_margin'] = company_overview['GrossMargin']
+            
+        # Direct copy of 52-week range if available
+        if '52WeekRange' in company_overview:
+            data['market_data']['52_week_range'] = company_overview['52WeekRange']
+    
+    # Process financial metrics from calculated metrics
+    if 'calculated_metrics' in dataset and isinstance(dataset['calculated_metrics'], dict):
+        calculated = dataset['calculated_metrics']
+        data['financial_data'].update({
+            'profit_margin': calculated.get('profit_margin', 0),
+            'gross_margin': calculated.get('gross_margin', 0),
+            'return_on_assets': calculated.get('return_on_assets', 0),
+            'return_on_equity': calculated.get('return_on_equity', 0),
+            'debt_to_equity': calculated.get('debt_to_equity', 0),
+            'free_cash_flow': calculated.get('free_cash_flow', 0),
+            'cash_flow_to_revenue': calculated.get('cash_flow_to_revenue', 0)
+        })
+    
+    # Process supplementary data
+    if supplementary_data and isinstance(supplementary_data, dict):
+        # Add volume metrics
+        if 'current_volume' in supplementary_data:
+            data['market_data']['current_volume'] = supplementary_data['current_volume']
+            
+        if 'average_volume' in supplementary_data:
+            data['market_data']['average_volume'] = supplementary_data['average_volume']
+            
+        if 'relative_volume' in supplementary_data:
+            data['market_data']['relative_volume'] = supplementary_data['relative_volume']
+            
+        # Add 52-week high/low data
+        if '52_week_high' in supplementary_data:
+            data['market_data']['52_week_high'] = supplementary_data['52_week_high']
+            
+        if '52_week_low' in supplementary_data:
+            data['market_data']['52_week_low'] = supplementary_data['52_week_low']
+        
+        # Add ownership metrics
+        if 'short_float' in supplementary_data:
+            data['ownership_data']['short_float'] = supplementary_data['short_float']
+            data['financial_data']['short_float'] = supplementary_data['short_float']
+            
+        if 'float' in supplementary_data:
+            data['ownership_data']['float'] = supplementary_data['float']
+        
+        # Add other supplementary financial metrics
+        data['financial_data'].update({
+            'peg_ratio': supplementary_data.get('peg_ratio', 'N/A'),
+            'forward_pe': supplementary_data.get('forward_pe', 'N/A'),
+            'operating_margin': supplementary_data.get('operating_margin', 'N/A'),
+            'revenue_per_share': supplementary_data.get('revenue_per_share', 'N/A'),
+            'enterprise_value': supplementary_data.get('enterprise_value', 'N/A'),
+            'current_ratio': supplementary_data.get('current_ratio', data['financial_data'].get('current_ratio', 'N/A')),
+            'cash_flow_to_revenue': data['financial_data'].get('cash_flow_to_revenue', 'N/A')
+        })
+    
+    # Process balance sheet data for intangible assets and other balance sheet metrics
+    if balance_sheet and isinstance(balance_sheet, dict):
+        data['financial_data']['intangible_assets'] = balance_sheet.get('IntangibleAssetsFormatted', 'N/A')
+        
+        # Add additional balance sheet metrics if available
+        if 'annualReports' in balance_sheet and balance_sheet['annualReports']:
+            latest_report = balance_sheet['annualReports'][0]
+            # Format values for display
+            for key in ['totalAssets', 'totalLiabilities', 'totalShareholderEquity', 'longTermDebt']:
+                if key in latest_report:
+                    # Format key for display (e.g., totalAssets -> TotalAssets)
+                    formatted_key = key[0].upper() + key[1:]
+                    try:
+                        value = float(latest_report[key])
+                        data['financial_data'][formatted_key] = format_number_with_suffix(value)
+                    except (ValueError, TypeError):
+                        data['financial_data'][formatted_key] = 'N/A'
+    
+    # Process market data from global quote
+    if global_quote and isinstance(global_quote, dict):
+        data['market_data'] = {
+            'price': global_quote.get('05. price', 'N/A'),
+            'change': global_quote.get('09. change', 'N/A'),
+            'change_percent': global_quote.get('10. change percent', 'N/A'),
+            'volume': global_quote.get('06. volume', 'N/A'),
+            'previous_close': global_quote.get('08. previous close', 'N/A')
+        }
+    
+    # Process insider transactions
+    if insider_transactions and isinstance(insider_transactions, dict) and 'transactions' in insider_transactions:
+        transactions = insider_transactions['transactions']
+        if transactions:
+            # Sort by date (most recent first)
+            sorted_transactions = sorted(transactions, 
+                                       key=lambda x: x.get('transactionDate', ''), 
+                                       reverse=True)
+            
+            # Get last 10 transactions
+            recent_transactions = sorted_transactions[:10]
+            
+            # Count buys and sells
+            buys = sum(1 for t in recent_transactions if t.get('transactionType', '').lower() == 'buy')
+            sells = sum(1 for t in recent_transactions if t.get('transactionType', '').lower() == 'sell')
+            
+            data['insider_data'] = {
+                'transactions': recent_transactions,
+                'summary': {
+                    'recent_transactions': len(recent_transactions),
+                    'buys': buys,
+                    'sells': sells,
+                    'buy_sell_ratio': f"{buys/sells:.2f}" if sells > 0 else "∞"
+                }
+            }
+    
+    return data
+
+def _chart_options():
+    """Settings that change the serialized chart output, used in chart cache keys"""
+    return (
+        Config.CHART_DOWNSAMPLING,
+        Config.CHART_MAX_POINTS,
+        Config.CHART_FULL_RESOLUTION_BARS,
+        services.visualizer().binary_arrays,
+        Config.CHART_SHARED_COLUMNS
+    )
+
+def _create_chart(kind, data, chart_df):
+    """Build a single chart figure, returning None if it can't be created"""
+    charts = services.figure_builder() if Config.CHART_FAST_FIGURES else services.visualizer()
+    builders = {
+        'summary': lambda: charts.create_summary_chart(dict(data, price_data=chart_df)),
+        'price': lambda: charts.create_price_chart(chart_df),
+        'technical': lambda: charts.create_technical_chart(chart_df),
+        'volume': lambda: charts.create_volume_chart(chart_df),
+        'financial': lambda: charts.create_financial_chart(data['financial_data'])
+    }
+    try:
+        return builders[kind]()
+    except Exception as e:
+        print(f"Error creating {kind} chart: {str(e)}")
+        return None
+
+def _get_chart_entries(symbol, data, kinds):
+    """Return serialized chart cache entries by kind, building only the missing charts"""
+    time_series_data = data['price_data']
+    data_version = time_series_data.index[-1].strftime('%Y-%m-%d')
+    options = _chart_options()
+    
+    entries = {}
+    chart_df = None
+    for kind in kinds:
+        key = chart_cache.make_key(symbol, data_version, kind, options)
+        entry = chart_cache.get(key)
+        
+        if entry is None:
+            # Reduce long histories to the chart point budget, once per request
+            if chart_df is None:
+                chart_df = time_series_data
+                if Config.CHART_DOWNSAMPLING:
+                    chart_df = services.downsampler().downsample(time_series_data)
+                    print(f"Chart data downsampled from {len(time_series_data)} to {len(chart_df)} points")
+            
+            with metrics.span('stage_seconds', stage='chart_build'):
+                chart = _create_chart(kind, data, chart_df)
+            if not chart:
+                continue
+            
+            try:
+                with metrics.span('stage_seconds', stage='chart_serialize'):
+                    body = services.visualizer().figure_to_json(chart)
+                    if Config.CHART_SHARED_COLUMNS:
+                        # Traces repeat the date index and price columns, so each chart is stored as a bundle
+                        body = json_encoder.dumps(build_chart_bundle({kind: json.loads(body)}))
+                entry = chart_cache.put(key, body.encode('utf-8'))
+            except Exception as e:
+                print(f"Error converting chart {kind} to JSON: {str(e)}")
+                continue
+        
+        entries[kind] = entry
+    
+    return entries
+
+@bp.route('/analyze', methods=['POST'])
 def analyze():
     ticker = request.form.get('ticker', '').upper()
     # Always set use_mock to False, ignoring whatever was passed
     use_mock = False
     disable_charts = request.form.get('disable_charts', 'false').lower() == 'true'
+    # Charts are loaded lazily from /api/chart unless the client asks for them inline
+    include_charts = request.form.get('include_charts', 'false').lower() == 'true' and not disable_charts
+    # Queue the analysis and answer with a job id instead of holding the request open
+    async_job = request.form.get('async', 'false').lower() == 'true'
+    
+    print(f"Starting analysis for ticker: {ticker} (mock: {use_mock}, disable_charts: {disable_charts}, include_charts: {include_charts}, async: {async_job})")
+    
+    if not ticker:
+        return jsonify({'error': 'No ticker symbol provided'})
+    
+    error = _unknown_symbol_error(ticker)
+    if error:
+        return jsonify({'error': error['message'], 'suggestions': error['suggestions']}), 404
+    
+    # Built here because job workers run outside the request context
+    chart_urls = {}
+    if not disable_charts and not include_charts:
+        chart_urls = {kind: url_for('.get_chart', symbol=ticker, kind=kind) for kind in CHART_KINDS}
+    
+    if not async_job:
+        result = _run_analysis(ticker, disable_charts, include_charts, chart_urls)
+        with metrics.span('stage_seconds', stage='serialize'):
+            return jsonify(result)
+    
+    app = current_app._get_current_object()
+    
+    def run(progress):
+        # Workers run outside the request; the app context lets the analysis save the ticker's fundamentals
+        with app.app_context():
+            return _run_analysis(ticker, disable_charts, include_charts, chart_urls, progress)
+    
+    # Identical requests for a ticker already being analyzed share that job
+    job = job_queue.submit((ticker, disable_charts, include_charts), run)
+    if job is None:
+        return jsonify({'error': 'Too many analyses in progress, please try again shortly'}), 503
+    
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'status_url': url_for('.get_job', job_id=job['id'])
+    }), 202
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report an analysis job's progress, long-polling up to ?wait= seconds for it to finish"""
+    wait = min(request.args.get('wait', 0, type=float), Config.JOB_MAX_WAIT)
+    job = job_queue.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+class JobStore:
+    """Job state in the analysis_job table, shared by every worker process"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def save(self, job):
+        row = {
+            'id': job['id'],
+            'status': job['status'],
+            'stage': job['stage'],
+            'result': json_encoder.dumps(job['result']) if job['status'] == 'done' else None,
+            'error': job['error'],
+            'created_at': datetime.utcfromtimestamp(job['created']),
+            'finished_at': datetime.utcfromtimestamp(job['finished']) if job['finished'] else None
+        }
+        statement = sqlite_insert(AnalysisJob.__table__).values(row)
+        update = {name: statement.excluded[name] for name in row if name not in ('id', 'created_at')}
+        with self.app.app_context():
+            db.session.execute(statement.on_conflict_do_update(index_elements=['id'], set_=update))
+            db.session.commit()
+
+    def load(self, job_id):
+        """The job's public view, as JobQueue.get returns it, or None"""
+        with self.app.app_context():
+            job = db.session.get(AnalysisJob, job_id)
+            if job is None:
+                return None
+            snapshot = {'id': job.id, 'status': job.status, 'stage': job.stage}
+            if job.status == 'done':
+                snapshot['result'] = json.loads(job.result) if job.result else None
+            elif job.status == 'failed':
+                snapshot['error'] = job.error
+            return snapshot
+
+    def prune(self, cutoff):
+        with self.app.app_context():
+            AnalysisJob.query.filter(AnalysisJob.finished_at < datetime.utcfromtimestamp(cutoff)).delete()
+            db.session.commit()
+
+def _run_analysis(ticker, disable_charts, include_charts, chart_urls, progress=None):
+    """Analyze a ticker and return the response payload; runs in a request or on a job worker"""
+    import pandas as pd  # Deferred with the rest of the analysis stack, see services
     
     try:
-        print(f"Starting analysis for ticker: {ticker} (mock: {use_mock}, disable_charts: {disable_charts})")
-        
-        if not ticker:
-            return jsonify({'error': 'No ticker symbol provided'})
+        if progress:
+            progress('Fetching market data')
         
         # Use the comprehensive dataset compiler
-        dataset, error = data_fetcher.compile_complete_dataset(ticker)
+        dataset, error = services.data_fetcher().compile_complete_dataset(ticker)
         if error:
             print(f"Error compiling dataset: {error}")
-            return jsonify({
+            return {
                 'error': error,
                 'company_data': {
                     'name': ticker,
                     'description': f"Error retrieving data: {error}"
                 },
                 'charts': {}
-            })
+            }
         
         # Check if we have time series data, which is essential
         time_series_data = dataset.get('time_series')
         if not isinstance(time_series_data, pd.DataFrame) or time_series_data.empty:
             print("Empty time series data received")
-            return jsonify({
+            return {
                 'error': 'No time series data found',
                 'company_data': {
                     'name': ticker,
                     'description': "No price history data available for this ticker."
                 },
                 'charts': {}
-            })
+            }
+        
+        _record_fundamentals(ticker, dataset)
         
         # Extract supplementary data
         company_overview = dataset.get('company_overview', {})
         supplementary_data = dataset.get('supplementary_data', {})
         balance_sheet = dataset.get('balance_sheet', {})
-        income_statement = dataset.get('income_statement', {})
-        insider_transactions = dataset.get('insider_transactions', {})
-        global_quote = dataset.get('global_quote', {})
-        
-        # Initialize data dictionary with enhanced structure
-        data = {
-            'price_data': time_series_data,
-            'financial_data': {},
-            'market_data': {},
-            'insider_data': {'transactions': []},
-            'calculated_metrics': {},
-            'ownership_data': {}
-        }
-        
-        # Process company overview data
-        if company_overview and isinstance(company_overview, dict):
-            # Extract financial metrics with safe conversion
-            data['financial_data'] = {
-                'current_ratio': extract_float_value(company_overview.get('CurrentRatio', 0)),
-                'current_ratio_formatted': company_overview.get('CurrentRatioFormatted', 'N/A'),
-                'debt_to_equity': extract_float_value(company_overview.get('DebtToEquityRatio', 0)),
-                'profit_margin': extract_float_value(company_overview.get('ProfitMargin', 0)),
-                'roe': extract_float_value(company_overview.get('ReturnOnEquityTTM', 0)),
-                'eps': extract_float_value(company_overview.get('EPS', 0)),
-                'pe_ratio': extract_float_value(company_overview.get('PERatio', 0)),
-                'beta': extract_float_value(company_overview.get('Beta', 0)),
-                'dividend_yield': extract_float_value(company_overview.get('DividendYield', 0)),
-                'market_cap': extract_float_value(company_overview.get('MarketCapitalization', 0)),
-                'market_cap_formatted': company_overview.get('MarketCapFormatted', 'N/A')
-            }
-            
-            # Extract ownership data
-            data['ownership_data'] = {
-                'insider_ownership': company_overview.get('InsiderOwnership', 'N/A'),
-                'institutional_ownership': company_overview.get('InstitutionalOwnership', 'N/A'),
-                'float': company_overview.get('FloatFormatted', 'N/A'),
-                'shares_outstanding': company_overview.get('SharesOutstanding', 'N/A')
-            }
-            
-            # Add market cap formatted value
-            if 'MarketCapFormatted' in company_overview:
-                data['financial_data']['market_cap_formatted'] = company_overview['MarketCapFormatted']
-            
-            # Add ownership data
-            if 'InstitutionalOwnership' in company_overview:
-                data['financial_data']['institutional_ownership'] = company_overview['InstitutionalOwnership']
-                
-            if 'InsiderOwnership' in company_overview:
-                data['financial_data']['insider_ownership'] = company_overview['InsiderOwnership']
-            
-            # Add float data
-            if 'FloatFormatted' in company_overview:
-                data['financial_data']['float'] = company_overview['FloatFormatted']
-            
-            # Add current ratio
-            if 'CurrentRatioFormatted' in company_overview:
-                data['financial_data']['current_ratio_formatted'] = company_overview['CurrentRatioFormatted']
-            
-            # If company_overview contains pre-formatted values, use them directly
-            if 'ProfitMargin' in company_overview and isinstance(company_overview['ProfitMargin'], str) and '%' in company_overview['ProfitMargin']:
-                data['financial_data']['profit_margin_formatted'] = company_overview['ProfitMargin']
-                
-            if 'ReturnOnEquityTTM' in company_overview and isinstance(company_overview['ReturnOnEquityTTM'], str) and '%' in company_overview['ReturnOnEquityTTM']:
-                data['financial_data']['roe_formatted'] = company_overview['ReturnOnEquityTTM']
-                
-            if 'GrossMargin' in company_overview:
-                data['financial_data']['gross_margin'] = company_overview['GrossMargin']
-                
-            # Direct copy of 52-week range if available
-            if '52WeekRange' in company_overview:
-                data['market_data']['52_week_range'] = company_overview['52WeekRange']
-        
-        # Process financial metrics from calculated metrics
-        if 'calculated_metrics' in dataset and isinstance(dataset['calculated_metrics'], dict):
-            calculated = dataset['calculated_metrics']
-            data['financial_data'].update({
-                'profit_margin': calculated.get('profit_margin', 0),
-                'gross_margin': calculated.get('gross_margin', 0),
-                'return_on_assets': calculated.get('return_on_assets', 0),
-                'return_on_equity': calculated.get('return_on_equity', 0),
-                'debt_to_equity': calculated.get('debt_to_equity', 0),
-                'free_cash_flow': calculated.get('free_cash_flow', 0),
-                'cash_flow_to_revenue': calculated.get('cash_flow_to_revenue', 0)
-            })
         
-        # Process supplementary data
-        if supplementary_data and isinstance(supplementary_data, dict):
-            # Add volume metrics
-            if 'current_volume' in supplementary_data:
-                data['market_data']['current_volume'] = supplementary_data['current_volume']
-                
-            if 'average_volume' in supplementary_data:
-                data['market_data']['average_volume'] = supplementary_data['average_volume']
-                
-            if 'relative_volume' in supplementary_data:
-                data['market_data']['relative_volume'] = supplementary_data['relative_volume']
-                
-            # Add 52-week high/low data
-            if '52_week_high' in supplementary_data:
-                data['market_data']['52_week_high'] = supplementary_data['52_week_high']
-                
-            if '52_week_low' in supplementary_data:
-                data['market_data']['52_week_low'] = supplementary_data['52_week_low']
-            
-            # Add ownership metrics
-            if 'short_float' in supplementary_data:
-                data['ownership_data']['short_float'] = supplementary_data['short_float']
-                data['financial_data']['short_float'] = supplementary_data['short_float']
-                
-            if 'float' in supplementary_data:
-                data['ownership_data']['float'] = supplementary_data['float']
-            
-            # Add other supplementary financial metrics
-            data['financial_data'].update({
-                'peg_ratio': supplementary_data.get('peg_ratio', 'N/A'),
-                'forward_pe': supplementary_data.get('forward_pe', 'N/A'),
-                'operating_margin': supplementary_data.get('operating_margin', 'N/A'),
-                'revenue_per_share': supplementary_data.get('revenue_per_share', 'N/A'),
-                'enterprise_value': supplementary_data.get('enterprise_value', 'N/A'),
-                'current_ratio': supplementary_data.get('current_ratio', data['financial_data'].get('current_ratio', 'N/A')),
-                'cash_flow_to_revenue': data['financial_data'].get('cash_flow_to_revenue', 'N/A')
-            })
-        
-        # Process balance sheet data for intangible assets and other balance sheet metrics
-        if balance_sheet and isinstance(balance_sheet, dict):
-            data['financial_data']['intangible_assets'] = balance_sheet.get('IntangibleAssetsFormatted', 'N/A')
-            
-            # Add additional balance sheet metrics if available
-            if 'annualReports' in balance_sheet and balance_sheet['annualReports']:
-                latest_report = balance_sheet['annualReports'][0]
-                # Format values for display
-                for key in ['totalAssets', 'totalLiabilities', 'totalShareholderEquity', 'longTermDebt']:
-                    if key in latest_report:
-                        # Format key for display (e.g., totalAssets -> TotalAssets)
-                        formatted_key = key[0].upper() + key[1:]
-                        try:
-                            value = float(latest_report[key])
-                            data['financial_data'][formatted_key] = format_number_with_suffix(value)
-                        except (ValueError, TypeError):
-                            data['financial_data'][formatted_key] = 'N/A'
-        
-        # Process market data from global quote
-        if global_quote and isinstance(global_quote, dict):
-            data['market_data'] = {
-                'price': global_quote.get('05. price', 'N/A'),
-                'change': global_quote.get('09. change', 'N/A'),
-                'change_percent': global_quote.get('10. change percent', 'N/A'),
-                'volume': global_quote.get('06. volume', 'N/A'),
-                'previous_close': global_quote.get('08. previous close', 'N/A')
-            }
+        # Initialize data dictionary with chart and metrics inputs
+        with metrics.span('stage_seconds', stage='analysis_data'):
+            data = _build_analysis_data(dataset)
         
-        # Process insider transactions
-        if insider_transactions and isinstance(insider_transactions, dict) and 'transactions' in insider_transactions:
-            transactions = insider_transactions['transactions']
-            if transactions:
-                # Sort by date (most recent first)
-                sorted_transactions = sorted(transactions, 
-                                           key=lambda x: x.get('transactionDate', ''), 
-                                           reverse=True)
-                
-                # Get last 10 transactions
-                recent_transactions = sorted_transactions[:10]
-                
-                # Count buys and sells
-                buys = sum(1 for t in recent_transactions if t.get('transactionType', '').lower() == 'buy')
-                sells = sum(1 for t in recent_transactions if t.get('transactionType', '').lower() == 'sell')
-                
-                data['insider_data'] = {
-                    'transactions': recent_transactions,
-                    'summary': {
-                        'recent_transactions': len(recent_transactions),
-                        'buys': buys,
-                        'sells': sells,
-                        'buy_sell_ratio': f"{buys/sells:.2f}" if sells > 0 else "∞"
-                    }
-                }
-        
-        # Create visualizations with proper error handling
+        # Build or reuse the serialized charts when they are requested inline
         chart_json = {}
+        chart_bundle = None
+        if progress and include_charts:
+            progress('Building charts')
+        charts_started = time.perf_counter()
         try:
-            if not disable_charts:
-                # Prepare charts with more detailed error handling
-                charts = {}
-                
-                # Helper function to safely create chart
-                def safe_create_chart(create_func, data):
-                    try:
-                        return create_func(data)
-                    except Exception as e:
-                        print(f"Error creating chart with {create_func.__name__}: {str(e)}")
-                        return None
-                
-                # Create each chart with error handling
-                charts['summary'] = safe_create_chart(visualizer.create_summary_chart, data)
-                charts['price'] = safe_create_chart(visualizer.create_price_chart, time_series_data)
-                charts['technical'] = safe_create_chart(visualizer.create_technical_chart, time_series_data)
-                charts['volume'] = safe_create_chart(visualizer.create_volume_chart, time_series_data)
-                charts['financial'] = safe_create_chart(visualizer.create_financial_chart, data['financial_data'])
-                
-                # Convert charts to JSON with proper error handling for each chart
-                for key, chart in charts.items():
-                    if chart:
-                        try:
-                            # Convert to JSON string first for validation
-                            chart_json_str = chart.to_json()
-                            
-                            # Print debugging info
-                            print(f"Chart {key} JSON length: {len(chart_json_str)}")
-                            if len(chart_json_str) > 1000:
-                                print(f"Chart {key} JSON snippet: {chart_json_str[:100]}...")
-                            else:
-                                print(f"Chart {key} JSON: {chart_json_str}")
-                            
-                            # Verify it's valid JSON by parsing it
-                            chart_data = json.loads(chart_json_str)
-                            
-                            # Print the structure of the chart data for debugging
-                            print(f"Chart {key} data structure: {'data' in chart_data}, {'layout' in chart_data}")
-                            if 'data' in chart_data:
-                                print(f"Chart {key} data length: {len(chart_data['data'])}")
-                            if 'layout' in chart_data:
-                                print(f"Chart {key} layout keys: {', '.join(chart_data['layout'].keys() if isinstance(chart_data['layout'], dict) else 'Not a dict')}")
-                            
-                            # Store in the response dictionary
-                            chart_json[key] = chart_data
-                        except Exception as e:
-                            print(f"Error converting chart {key} to JSON: {str(e)}")
-                            # Continue with other charts instead of failing
+            if include_charts:
+                entries = _get_chart_entries(ticker, data, CHART_KINDS)
+                for key in CHART_KINDS:
+                    if key in entries:
+                        print(f"Chart {key} JSON length: {entries[key]['size']}")
+                        chart_json[key] = json.loads(entries[key]['body'])
                     else:
                         print(f"No chart data for {key} chart")
-            else:
+                
+                # Re-pack the per-chart bundles so columns shared across charts are sent once
+                if Config.CHART_SHARED_COLUMNS and chart_json:
+                    figures = {}
+                    for bundle in chart_json.values():
+                        figures.update(expand_chart_bundle(bundle))
+                    chart_bundle = build_chart_bundle(figures)
+                    chart_json = {}
+            elif disable_charts:
                 print("Charts disabled by user request")
         except Exception as e:
             print(f"Error creating visualizations: {str(e)}")
             print(traceback.format_exc())
         
+        if include_charts:
+            metrics.observe('stage_seconds', time.perf_counter() - charts_started, stage='charts')
+        
         # Prepare company data with enhanced information
         company_data = {
             'name': company_overview.get('Name', 'N/A') if company_overview and isinstance(company_overview, dict) else 'N/A',
@@ -686,54 +1419,112 @@ def analyze():
         # Prepare the final response
         response_data = {
             'charts': chart_json,
+            'chart_bundle': chart_bundle,
+            'chart_urls': chart_urls,
             'company_data': company_data
         }
         
-        # Helper function to make sure data is JSON serializable
-        def clean_for_json(obj):
-            if isinstance(obj, dict):
-                return {k: clean_for_json(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [clean_for_json(i) for i in obj]
-            elif isinstance(obj, (int, float)):
-                return obj
-            elif obj is None:
-                return None
-            else:
-                # Convert any other types to strings
-                return str(obj)
-        
-        # Make sure the response is JSON serializable
-        try:
-            # Clean up the data first
-            response_data['company_data'] = clean_for_json(response_data['company_data'])
-            
-            # Test serialization before returning
-            json.dumps(response_data)
-            return jsonify(response_data)
-        except Exception as e:
-            print(f"Error serializing response: {str(e)}")
-            # Return a simplified response that will definitely serialize
-            return jsonify({
-                'error': f'Error serializing response: {str(e)}',
-                'company_data': {
-                    'name': company_data.get('name', ticker),
-                    'description': company_data.get('description', 'Data retrieved but could not be displayed properly.')
-                },
-                'charts': {}
-            })
+        # NumPy, pandas and NaN values are handled by the app's JSON provider when this is serialized
+        return response_data
         
     except Exception as e:
         print(f"Unexpected error in analyze route: {str(e)}")
         print(traceback.format_exc())
-        return jsonify({
+        return {
             'error': f'Error processing request: {str(e)}',
             'company_data': {
                 'name': ticker,
                 'description': f"An unexpected error occurred: {str(e)}"
             },
             'charts': {}
-        })
+        }
+
+@bp.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Price metrics for many tickers in one columnar response, optionally as a queued job"""
+    payload = request.get_json(silent=True) or request.form
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    symbols = payload.get('symbols') or []
+    if isinstance(symbols, str):
+        symbols = symbols.split(',')
+    if not isinstance(symbols, list):
+        return jsonify({'error': 'symbols must be a list or a comma-separated string'}), 400
+    symbols, invalid = normalize_symbols(symbols)
+    include_overview = str(payload.get('include_overview', 'false')).lower() == 'true'
+    include_charts = str(payload.get('include_charts', 'false')).lower() == 'true'
+    async_job = str(payload.get('async', 'false')).lower() == 'true'
+    
+    if invalid:
+        return jsonify({'error': f"Invalid ticker symbols: {', '.join(invalid)}"}), 400
+    if not symbols:
+        return jsonify({'error': 'No ticker symbols provided'}), 400
+    if len(symbols) > Config.BATCH_MAX_SYMBOLS:
+        return jsonify({'error': f'At most {Config.BATCH_MAX_SYMBOLS} symbols per batch'}), 400
+    unknown = _unknown_symbols(symbols)
+    if unknown:
+        return jsonify({'error': f"Unknown ticker symbols: {', '.join(unknown)}"}), 404
+    
+    print(f"Starting batch analysis for {len(symbols)} symbols (overview: {include_overview}, charts: {include_charts})")
+    
+    # Charts are never built here; clients load the ones they want lazily from /api/chart
+    chart_urls = {}
+    if include_charts:
+        chart_urls = {symbol: {kind: url_for('.get_chart', symbol=symbol, kind=kind) for kind in CHART_KINDS}
+                      for symbol in symbols}
+    
+    def run(progress=None):
+        result = services.batch_analyzer().analyze(symbols, include_overview=include_overview, progress=progress)
+        if include_charts:
+            result['chart_urls'] = {symbol: chart_urls[symbol] for symbol in result['symbols']}
+        return result
+    
+    if not async_job:
+        return jsonify(run())
+    
+    job = job_queue.submit(('batch', tuple(symbols), include_overview, include_charts), run)
+    if job is None:
+        return jsonify({'error': 'Too many analyses in progress, please try again shortly'}), 503
+    
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'status_url': url_for('.get_job', job_id=job['id'])
+    }), 202
+
+@bp.route('/api/chart/<symbol>/<kind>', methods=['GET'])
+def get_chart(symbol, kind):
+    """Serve a single serialized chart, answering repeat requests with 304 Not Modified"""
+    import pandas as pd
+    
+    symbol = symbol.upper()
+    if kind not in CHART_KINDS:
+        return jsonify({'error': f'Unknown chart type: {kind}'}), 404
+    error = _unknown_symbol_error(symbol)
+    if error:
+        return jsonify({'error': error['message']}), 404
+    
+    # A revalidation of a recently built chart is answered from the cache, without compiling the dataset
+    entry = chart_cache.revalidate(symbol, kind, _chart_options(), request.if_none_match.as_set(include_weak=True))
+    if entry is None:
+        dataset, error = services.data_fetcher().compile_complete_dataset(symbol)
+        if error:
+            return jsonify({'error': error}), 502
+        
+        time_series_data = dataset.get('time_series')
+        if not isinstance(time_series_data, pd.DataFrame) or time_series_data.empty:
+            return jsonify({'error': 'No time series data found'}), 404
+        
+        entry = _get_chart_entries(symbol, _build_analysis_data(dataset), [kind]).get(kind)
+        if not entry:
+            return jsonify({'error': f'{kind} chart not available for {symbol}'}), 404
+    
+    response = compression.encoded_response(entry['body'], entry['encoded'], request.accept_encodings,
+                                            etag=entry['etag'])
+    # Browsers keep the chart but must revalidate it, which costs a lookup and a 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 def format_number_with_suffix(number):
     """Format large numbers with K, M, B suffixes"""
@@ -747,4 +1538,4 @@ def format_number_with_suffix(number):
         return f"${number:.2f}"
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app().run(debug=True) 
\ No newline at end of file
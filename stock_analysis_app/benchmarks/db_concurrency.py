@@ -0,0 +1,140 @@
+"""Check SQLite under several processes reading and writing the watchlist at once.
+
+Every worker process creates its own app on one shared database file, like
+separate gunicorn workers, and loops over watchlist reads and add/remove
+writes through the real endpoints. Runs with the configured engine settings
+(WAL and pragmas) and, for comparison, with SQLite's defaults.
+
+    python benchmarks/db_concurrency.py --processes 8 --duration 10
+    python benchmarks/db_concurrency.py --modes tuned --read-share 0.5
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from fixtures import APP_DIR, FixtureUpstream
+from load_test import latency_summary
+
+# Engine settings per mode; None leaves SQLite's default in place
+MODES = {
+    'tuned': {},
+    'default': {'SQLITE_JOURNAL_MODE': None, 'SQLITE_SYNCHRONOUS': None, 'SQLITE_BUSY_TIMEOUT': None, 'SQLITE_MMAP_SIZE': None}
+}
+
+def worker(index, db_path, settings, start_at, duration, read_share, queue):
+    """Run one process's share of the load and report its latencies and errors"""
+    sys.path.insert(0, APP_DIR)
+    try:
+        queue.put(_run_worker(index, db_path, settings, start_at, duration, read_share))
+    except Exception as e:
+        # Reported rather than raised so the parent never waits for a result that will not come
+        queue.put({'failed': f'{type(e).__name__}: {e}'})
+
+def _run_worker(index, db_path, settings, start_at, duration, read_share):
+    """Worker body, with the app's request logging silenced"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        from config import Config
+        for name, value in settings.items():
+            setattr(Config, name, value)
+        # Symbol checks on the writes are answered from the fixture listing
+        Config.SYMBOL_DIRECTORY_PATH = os.path.join(os.path.dirname(db_path), f'listing_status_{index}.csv')
+        FixtureUpstream(bars=300).install()
+        import app as app_module
+        from app import create_app
+        # Only the database is measured; computing snapshot rows after each add would compete for the CPU
+        app_module.snapshot_refresher.refresh = lambda: None
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path, 'PROPAGATE_EXCEPTIONS': True})
+        client = app.test_client()
+        client.get('/api/watchlist')
+        client.get('/api/symbols/search?q=W')
+
+        rng = random.Random(index)
+        reads, writes = [], []
+        errors = {'locked': 0, 'other': 0}
+        time.sleep(max(0, start_at - time.time()))
+        deadline = start_at + duration
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < read_share:
+                    ok = client.get('/api/watchlist').status_code == 200
+                    latencies = reads
+                else:
+                    # Removed again straight away, so the fixture listing's tickers can be reused
+                    added = client.post('/api/watchlist/add', json={'symbol': f'W{rng.randrange(1000):03d}'})
+                    ok = added.status_code == 200
+                    if ok:
+                        ok = client.delete(f"/api/watchlist/remove/{added.get_json()['item']['id']}").status_code == 200
+                    latencies = writes
+                if not ok:
+                    errors['other'] += 1
+            except Exception as e:
+                errors['locked' if 'database is locked' in str(e) else 'other'] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+    return {'reads': reads, 'writes': writes, 'errors': errors}
+
+def run_mode(mode, args):
+    """Start the worker processes on a fresh database and combine their results"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='stockapp-db-'), 'concurrency.db')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    # Far enough ahead for every process to import the app and open its connection
+    start_at = time.time() + 3 + args.processes * 0.5
+    processes = [context.Process(target=worker, args=(i, db_path, MODES[mode], start_at, args.duration, args.read_share, queue))
+                 for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    failures = [result['failed'] for result in results if 'failed' in result]
+    if failures:
+        raise RuntimeError(f'{len(failures)} worker(s) failed, first: {failures[0]}')
+
+    reads = [value for result in results for value in result['reads']]
+    writes = [value for result in results for value in result['writes']]
+    return {
+        'mode': mode,
+        'processes': args.processes,
+        'reads_per_second': round(len(reads) / args.duration, 1),
+        'writes_per_second': round(len(writes) / args.duration, 1),
+        'locked_errors': sum(result['errors']['locked'] for result in results),
+        'other_errors': sum(result['errors']['other'] for result in results),
+        'reads': latency_summary(reads),
+        'writes': latency_summary(writes)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8, help='Worker processes sharing the database')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per mode')
+    parser.add_argument('--read-share', type=float, default=0.8, help='Share of operations that are reads')
+    parser.add_argument('--modes', default='tuned,default', help=f'Comma separated modes from: {", ".join(MODES)}')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes.split(','):
+        result = run_mode(mode, args)
+        results.append(result)
+        print(f"{mode:8} {result['reads_per_second']:8} reads/s {result['writes_per_second']:8} writes/s  "
+              f"locked errors {result['locked_errors']}, other errors {result['other_errors']}")
+        for kind in ('reads', 'writes'):
+            stats = result[kind]
+            print(f"  {kind:6} p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms  max {stats['max_ms']} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    failed = any(result['locked_errors'] or result['other_errors'] for result in results if result['mode'] == 'tuned')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Alpha Vantage fixtures for offline benchmarks.
+
+Responses come from recorded files in benchmarks/fixtures/ when present,
+otherwise from a deterministic synthetic generator with the same shapes as
+the real API. Record real responses once with an API key:
+
+    python benchmarks/fixtures.py record AAPL MSFT
+
+Recorded files are named <FUNCTION>_<SYMBOL>.json. A file named
+<FUNCTION>.json is used for every symbol that has no file of its own, and
+LISTING_STATUS.csv for the symbol directory's listing download.
+"""
+import json
+import os
+import random
+import string
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# Functions /analyze and the watchlist call for one symbol, as (function, extra params)
+ANALYSIS_REQUESTS = [
+    ('TIME_SERIES_DAILY', {'outputsize': 'full'}),
+    ('TIME_SERIES_DAILY', {'outputsize': 'compact'}),
+    ('BBANDS', {}), ('STOCHRSI', {}), ('STOCHF', {}), ('APO', {}),
+    ('OVERVIEW', {}), ('BALANCE_SHEET', {}), ('INCOME_STATEMENT', {}), ('CASH_FLOW', {}),
+    ('EARNINGS', {}), ('INSIDER_TRANSACTIONS', {}), ('GLOBAL_QUOTE', {})
+]
+
+# Tickers the benchmarks and load tests use, always present in the synthetic listing
+LISTED_SYMBOLS = ['BENCH', 'DEMO'] + [f'{prefix}{i:03d}' for prefix in 'WLM' for i in range(1000)]
+
+INDICATOR_KEYS = {
+    'BBANDS': ['Real Upper Band', 'Real Middle Band', 'Real Lower Band'],
+    'STOCHRSI': ['FastK', 'FastD'],
+    'STOCHF': ['FastK', 'FastD'],
+    'APO': ['APO']
+}
+
+class FixtureResponse:
+    """The parts of requests.Response the DataFetcher uses"""
+
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.text)
+
+class FixtureUpstream:
+    """Stand-in for requests.get that serves recorded or synthetic Alpha Vantage responses.
+
+    Synthetic bodies depend only on the function and output size, so they are
+    generated once and shared by every symbol; parsing cost stays realistic
+    without holding a separate copy per symbol.
+    """
+
+    def __init__(self, bars=6500, fixture_dir=FIXTURE_DIR):
+        self.bars = bars
+        self.fixture_dir = fixture_dir
+        self.bodies = {}
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+        return FixtureResponse(self.body(params or {}))
+
+    def install(self):
+        """Route every DataFetcher request to this upstream"""
+        import modules.data_fetcher
+        modules.data_fetcher.requests.get = self.get
+        return self
+
+    def body(self, params):
+        """Response text for a request"""
+        function = params.get('function', '')
+        symbol = params.get('symbol', '')
+        for name in (f'{function}_{symbol}.json', f'{function}.json', f'{function}.csv'):
+            path = os.path.join(self.fixture_dir, name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    return f.read()
+
+        key = (function, params.get('outputsize'), symbol if function in ('REALTIME_BULK_QUOTES', 'GLOBAL_QUOTE') else None)
+        body = self.bodies.get(key)
+        if body is None:
+            body = synthetic_listing() if function == 'LISTING_STATUS' else json.dumps(synthetic_response(params, self.bars))
+            self.bodies[key] = body
+        return body
+
+def price_history(bars, seed=7):
+    """Deterministic daily OHLCV random walk ending on a fixed date"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-06-30', periods=bars)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.003, bars)),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(500_000, 5_000_000, bars)
+    }, index=dates)
+
+def synthetic_response(params, bars=6500):
+    """A response shaped like the real API's for the requested function"""
+    function = params.get('function', '')
+    symbol = params.get('symbol', 'DEMO')
+
+    if function == 'TIME_SERIES_DAILY':
+        df = price_history(bars if params.get('outputsize') == 'full' else 100)
+        series = {
+            date.strftime('%Y-%m-%d'): {
+                '1. open': f'{row.open:.4f}', '2. high': f'{row.high:.4f}', '3. low': f'{row.low:.4f}',
+                '4. close': f'{row.close:.4f}', '5. volume': str(int(row.volume))
+            }
+            for date, row in df[::-1].iterrows()
+        }
+        return {'Meta Data': {'2. Symbol': symbol}, 'Time Series (Daily)': series}
+
+    if function in INDICATOR_KEYS:
+        close = price_history(bars)['close'][::-1]
+        values = {date.strftime('%Y-%m-%d'): {key: f'{value:.4f}' for key in INDICATOR_KEYS[function]}
+                  for date, value in close.items()}
+        return {'Meta Data': {'1: Symbol': symbol}, f'Technical Analysis: {function}': values}
+
+    if function == 'OVERVIEW':
+        return {
+            'Symbol': symbol, 'Name': f'{symbol} Corporation', 'Description': 'Synthetic company for benchmarks.',
+            'Exchange': 'NASDAQ', 'Sector': 'TECHNOLOGY', 'Industry': 'SOFTWARE', 'MarketCapitalization': '2500000000000',
+            'PERatio': '28.5', 'PEGRatio': '2.1', 'EPS': '6.1', 'ForwardPE': '26.3', 'DividendYield': '0.0055',
+            'Beta': '1.2', 'ProfitMargin': '0.25', 'OperatingMarginTTM': '0.3', 'ReturnOnEquityTTM': '1.5',
+            'ReturnOnAssetsTTM': '0.22', 'SharesOutstanding': '15000000000', 'SharesFloat': '14900000000',
+            'PercentInsiders': '0.07', 'PercentInstitutions': '61.2', 'ShortPercentFloat': '0.007',
+            '52WeekHigh': '199.6', '52WeekLow': '164.1', 'CurrentRatio': '0.99'
+        }
+
+    if function in ('BALANCE_SHEET', 'INCOME_STATEMENT', 'CASH_FLOW'):
+        report = {
+            'fiscalDateEnding': '2024-12-31', 'reportedCurrency': 'USD',
+            'totalAssets': '352583000000', 'totalCurrentAssets': '143566000000', 'totalLiabilities': '290437000000',
+            'totalCurrentLiabilities': '145308000000', 'totalShareholderEquity': '62146000000',
+            'intangibleAssets': '1000000000', 'longTermDebt': '95281000000', 'cashAndCashEquivalentsAtCarryingValue': '29965000000',
+            'totalRevenue': '383285000000', 'grossProfit': '169148000000', 'operatingIncome': '114301000000',
+            'netIncome': '96995000000', 'ebitda': '125820000000', 'operatingCashflow': '110543000000',
+            'capitalExpenditures': '10959000000', 'dividendPayout': '15025000000'
+        }
+        return {'symbol': symbol, 'annualReports': [report] * 5, 'quarterlyReports': [report] * 20}
+
+    if function == 'EARNINGS':
+        return {'symbol': symbol,
+                'annualEarnings': [{'fiscalDateEnding': f'{year}-12-31', 'reportedEPS': '6.1'} for year in range(2024, 2004, -1)],
+                'quarterlyEarnings': [{'fiscalDateEnding': '2024-12-31', 'reportedEPS': '1.5', 'estimatedEPS': '1.4',
+                                       'surprise': '0.1', 'surprisePercentage': '7.1'}] * 40}
+
+    if function == 'INSIDER_TRANSACTIONS':
+        return {'data': [{'transaction_date': '2025-05-01', 'ticker': symbol, 'executive': 'Executive',
+                          'acquisition_or_disposal': 'D' if i % 3 else 'A', 'shares': '10000', 'share_price': '180.0'}
+                         for i in range(100)]}
+
+    if function == 'GLOBAL_QUOTE':
+        return {'Global Quote': {'01. symbol': symbol, '02. open': '180.0', '03. high': '182.0', '04. low': '179.0',
+                                 '05. price': '181.2', '06. volume': '52000000', '07. latest trading day': '2025-06-30',
+                                 '08. previous close': '179.9', '09. change': '1.3', '10. change percent': '0.7226%'}}
+
+    if function == 'REALTIME_BULK_QUOTES':
+        return {'endpoint': 'Realtime Bulk Quotes', 'data': [
+            {'symbol': s, 'timestamp': '2025-06-30 16:00:00', 'open': '180.0', 'high': '182.0', 'low': '179.0',
+             'close': '181.2', 'volume': '52000000', 'previous_close': '179.9', 'change': '1.3', 'change_percent': '0.7226'}
+            for s in symbol.split(',')]}
+
+    if function == 'TOP_GAINERS_LOSERS':
+        def movers(sign):
+            return [{'ticker': f'M{i:03d}', 'price': '12.5', 'change_amount': f'{sign}1.1',
+                     'change_percentage': f'{sign}9.6%', 'volume': '3500000'} for i in range(20)]
+        return {'metadata': 'Top gainers, losers, and most actively traded US tickers',
+                'last_updated': '2025-06-30 16:15:59 US/Eastern',
+                'top_gainers': movers(''), 'top_losers': movers('-'), 'most_actively_traded': movers('')}
+
+    return {'Error Message': f'No fixture for function {function}'}
+
+def synthetic_listing(count=12000, seed=11):
+    """LISTING_STATUS CSV with the benchmark tickers and random ones, about as many rows as the real listing"""
+    rng = random.Random(seed)
+    symbols = list(LISTED_SYMBOLS)
+    seen = set(symbols)
+    while len(symbols) < count:
+        symbol = ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(1, 5)))
+        if symbol not in seen:
+            seen.add(symbol)
+            symbols.append(symbol)
+
+    words = ['Advanced', 'American', 'Bio', 'Capital', 'Digital', 'Energy', 'Financial', 'First', 'Global', 'Health',
+             'Holdings', 'Industries', 'Micro', 'National', 'Pacific', 'Pharma', 'Realty', 'Systems', 'Tech', 'United']
+    lines = ['symbol,name,exchange,assetType,ipoDate,delistingDate,status']
+    for symbol in symbols:
+        name = f'{rng.choice(words)} {rng.choice(words)} {symbol.title()} {rng.choice(["Inc", "Corp", "Ltd", "Trust"])}'
+        exchange = rng.choice(['NYSE', 'NASDAQ', 'NYSE ARCA', 'NYSE MKT'])
+        lines.append(f'{symbol},{name},{exchange},Stock,2001-05-17,null,Active')
+    return '\r\n'.join(lines) + '\r\n'
+
+def synthetic_fundamentals(count=10000, seed=5):
+    """Fundamentals rows for count listed symbols, with the gaps real overviews have"""
+    from modules.fundamentals import NUMERIC_FIELDS
+
+    rng = np.random.default_rng(seed)
+    symbols = sorted(LISTED_SYMBOLS + [f'U{i:05d}' for i in range(max(0, count - len(LISTED_SYMBOLS)))])[:count]
+    sectors = ['TECHNOLOGY', 'HEALTHCARE', 'FINANCIAL SERVICES', 'ENERGY', 'INDUSTRIALS', 'UTILITIES', 'REAL ESTATE']
+    columns = {
+        'market_cap': np.exp(rng.normal(21, 2.5, count)),
+        'pe_ratio': rng.lognormal(3, 0.6, count),
+        'dividend_yield': np.clip(rng.normal(0.015, 0.015, count), 0, None),
+        'beta': rng.normal(1, 0.4, count),
+        'price': rng.lognormal(3.5, 1, count),
+        'change_percent': rng.normal(0, 2.5, count),
+        'volume': rng.lognormal(13, 1.5, count),
+        'relative_volume': rng.lognormal(0, 0.4, count),
+        'rsi': rng.uniform(10, 90, count),
+        'return_1y': rng.normal(8, 30, count)
+    }
+    for field in NUMERIC_FIELDS:
+        values = columns.setdefault(field, rng.normal(0, 1, count))
+        # About one value in ten is missing, as in overviews of small or new listings
+        values[rng.random(count) < 0.1] = np.nan
+
+    rows = []
+    for i, symbol in enumerate(symbols):
+        row = {'symbol': symbol, 'name': f'{symbol} Holdings', 'exchange': ('NYSE', 'NASDAQ')[i % 2],
+               'sector': sectors[i % len(sectors)], 'industry': f'INDUSTRY {i % 60}'}
+        row.update({field: None if np.isnan(columns[field][i]) else float(columns[field][i]) for field in NUMERIC_FIELDS})
+        rows.append(row)
+    return rows
+
+def record(symbols):
+    """Save real API responses for the given symbols as fixtures"""
+    import requests
+    from config import Config
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    fetcher_params = _fetcher_params()
+    for symbol in symbols:
+        for function, extra in ANALYSIS_REQUESTS:
+            if extra.get('outputsize') == 'compact':
+                continue
+            params = dict(fetcher_params.get(function, {}), function=function, symbol=symbol,
+                          apikey=Config.ALPHA_VANTAGE_API_KEY, **extra)
+            response = requests.get(Config.ALPHA_VANTAGE_BASE_URL, params=params, timeout=Config.API_TIMEOUT)
+            path = os.path.join(FIXTURE_DIR, f'{function}_{symbol}.json')
+            with open(path, 'w') as f:
+                f.write(response.text)
+            print(f"Recorded {path} ({len(response.text)} bytes)")
+
+    response = requests.get(Config.ALPHA_VANTAGE_BASE_URL, params={'function': 'LISTING_STATUS', 'apikey': Config.ALPHA_VANTAGE_API_KEY},
+                            timeout=Config.API_TIMEOUT)
+    path = os.path.join(FIXTURE_DIR, 'LISTING_STATUS.csv')
+    with open(path, 'w') as f:
+        f.write(response.text)
+    print(f"Recorded {path} ({len(response.text)} bytes)")
+
+def _fetcher_params():
+    """Extra parameters the DataFetcher sends for each indicator, so recordings match its requests"""
+    return {
+        'BBANDS': {'interval': 'daily', 'time_period': '20', 'series_type': 'close'},
+        'STOCHRSI': {'interval': 'daily', 'time_period': '14', 'series_type': 'close',
+                     'fastk_period': '5', 'fastd_period': '3', 'fastd_matype': '0'},
+        'STOCHF': {'interval': 'daily', 'fastkperiod': '5', 'fastdperiod': '3', 'fastdmatype': '0'},
+        'APO': {'interval': 'daily', 'series_type': 'close', 'fastperiod': '12', 'slowperiod': '26', 'matype': '1'}
+    }
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'record':
+        print(__doc__)
+        sys.exit(1)
+    record([symbol.upper() for symbol in sys.argv[2:]])
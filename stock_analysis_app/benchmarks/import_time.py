@@ -0,0 +1,61 @@
+"""Check how long a fresh worker takes to import and create the app.
+
+Runs `python -X importtime` in a clean interpreter, prints the slowest
+top-level imports and exits non-zero when the total is over budget or a
+library that should load lazily was imported at startup.
+
+    python benchmarks/import_time.py --budget-ms 700
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded with the first analysis or chart, never at startup
+LAZY_MODULES = ('pandas', 'numpy', 'plotly', 'requests')
+
+STARTUP = 'from app import create_app; create_app()'
+
+def measure():
+    """Per-module import times in microseconds from one cold start, as (name, self, cumulative, depth)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=700, help='Maximum total import time')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+    args = parser.parse_args()
+
+    rows = measure()
+    top_level = [row for row in rows if row[3] == 0]
+    total_ms = sum(row[2] for row in top_level) / 1000
+    loaded = sorted({name.split('.')[0] for name, _, _, _ in rows} & set(LAZY_MODULES))
+
+    print(f"Total import time: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    # The app module and what it imports directly, slowest first
+    shallow = [row for row in rows if row[3] <= 1]
+    for name, _, cumulative_us, depth in sorted(shallow, key=lambda row: -row[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+    failed = False
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: imported at startup: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
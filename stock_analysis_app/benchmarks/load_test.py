@@ -0,0 +1,305 @@
+"""Load test the app with concurrent simulated users against a stub upstream.
+
+Starts a local HTTP stand-in for Alpha Vantage (serving benchmarks/fixtures
+responses after a configurable delay) and, for every scenario, a fresh app
+server pointed at it with the real rate limit. Simulated users then loop
+over /analyze, /api/watchlist/data and /api/gainers-losers in the given mix
+for a fixed time. Each scenario reports throughput, p50/p95/p99 latency per
+endpoint, upstream calls and time spent waiting for the rate limiter.
+
+    python benchmarks/load_test.py --users 1,10,50 --mix analyze=1,watchlist=2,movers=7
+    python benchmarks/load_test.py --users 20 --mix analyze=1 --symbols 5 --duration 60
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from fixtures import APP_DIR, FixtureUpstream
+
+# Request made by one simulated user action, as (method, path, form or JSON body)
+ACTIONS = {
+    'analyze': lambda symbol: ('POST', '/analyze', {'ticker': symbol}),
+    'watchlist': lambda symbol: ('GET', '/api/watchlist/data', None),
+    'movers': lambda symbol: ('GET', '/api/gainers-losers', None)
+}
+
+class StubUpstream:
+    """Alpha Vantage stand-in on a local port, counting the requests it serves"""
+
+    def __init__(self, latency, bars):
+        self.latency = latency
+        self.fixtures = FixtureUpstream(bars=bars)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = stub.fixtures.body(dict(parse_qsl(urlsplit(self.path).query))).encode('utf-8')
+                with stub.fixtures.lock:
+                    stub.fixtures.calls += 1
+                # Stands in for the network round trip and the API's own processing
+                time.sleep(stub.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}/query'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def calls(self):
+        return self.fixtures.calls
+
+    def close(self):
+        self.server.shutdown()
+
+def serve(args):
+    """Run the app against the stub upstream; started in a subprocess for every scenario"""
+    sys.path.insert(0, APP_DIR)
+    from config import Config
+    Config.ALPHA_VANTAGE_BASE_URL = args.upstream
+    Config.REQUESTS_PER_MINUTE = args.requests_per_minute
+    Config.SYMBOL_DIRECTORY_PATH = os.path.join(os.path.dirname(args.db), 'listing_status.csv')
+
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + args.db})
+    app.run(host='127.0.0.1', port=args.port, threaded=True, debug=False, use_reloader=False)
+
+class AppServer:
+    """A fresh app process for one scenario, so every scenario starts with cold caches"""
+
+    def __init__(self, upstream_url, requests_per_minute, log):
+        import socket
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.db_dir = tempfile.mkdtemp(prefix='stockapp-load-')
+        self.url = f'http://127.0.0.1:{port}'
+        self.log = open(log, 'a') if log else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'serve', '--upstream', upstream_url, '--port', str(port),
+             '--db', os.path.join(self.db_dir, 'load.db'), '--requests-per-minute', str(requests_per_minute)],
+            cwd=APP_DIR, stdout=self.log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, session, timeout=30):
+        """Block until /healthz answers"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('App server exited during startup')
+            try:
+                if session.get(self.url + '/healthz', timeout=1).ok:
+                    return
+            except Exception:
+                time.sleep(0.1)
+        raise RuntimeError('App server did not start in time')
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+def parse_mix(text):
+    """Action weights from text such as analyze=1,movers=3"""
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f'Unknown action {name!r}, expected one of {", ".join(ACTIONS)}')
+        weights[name] = float(weight or 1)
+    return weights
+
+def scrape(session, url):
+    """Upstream request count and rate limiter wait totals from the app's /metrics"""
+    totals = {'upstream_requests': 0.0, 'limiter_wait_seconds': 0.0, 'limiter_waits': 0.0}
+    for line in session.get(url + '/metrics', timeout=10).text.splitlines():
+        if line.startswith('stockapp_upstream_requests_total'):
+            totals['upstream_requests'] += float(line.rsplit(' ', 1)[1])
+        elif line.startswith('stockapp_rate_limiter_wait_seconds_sum'):
+            totals['limiter_wait_seconds'] += float(line.rsplit(' ', 1)[1])
+        elif line.startswith('stockapp_rate_limiter_wait_seconds_count'):
+            totals['limiter_waits'] += float(line.rsplit(' ', 1)[1])
+    return totals
+
+def succeeded(response):
+    """True for a 200 response whose JSON body, if it is an object, carries no error"""
+    if response.status_code != 200:
+        return False
+    if not response.headers.get('Content-Type', '').startswith('application/json'):
+        return True
+    body = response.json()
+    return not (isinstance(body, dict) and 'error' in body)
+
+def percentile(sorted_values, share):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(share * len(sorted_values)) - 1)]
+
+def latency_summary(latencies):
+    """Count and latency percentiles in ms"""
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 1) if values else None,
+        'p95_ms': round(percentile(values, 0.95) * 1000, 1) if values else None,
+        'p99_ms': round(percentile(values, 0.99) * 1000, 1) if values else None,
+        'max_ms': round(values[-1] * 1000, 1) if values else None
+    }
+
+def run_scenario(upstream, mix, users, args):
+    """Drive one app server with the given number of users for args.duration seconds"""
+    import requests
+
+    server = AppServer(upstream.url, args.requests_per_minute, args.app_log)
+    setup = requests.Session()
+    try:
+        server.wait_ready(setup)
+        symbols = [f'L{i:03d}' for i in range(args.symbols)]
+        # Every user has their own session and watchlist, drawn from the shared ticker pool
+        sessions = []
+        for seed in range(users):
+            session = requests.Session()
+            for symbol in random.Random(seed).sample(symbols, min(args.watchlist_size, len(symbols))):
+                session.post(server.url + '/api/watchlist/add', json={'symbol': symbol}, timeout=30)
+            sessions.append(session)
+
+        before = scrape(setup, server.url)
+        upstream_before = upstream.calls
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        results = {name: [] for name in names}
+        errors = {name: 0 for name in names}
+        lock = threading.Lock()
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        def user(seed):
+            rng = random.Random(seed)
+            session = sessions[seed]
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path, body = ACTIONS[name](rng.choice(symbols))
+                sent = time.perf_counter()
+                try:
+                    if method == 'POST':
+                        response = session.post(server.url + path, data=body, timeout=args.timeout)
+                    else:
+                        response = session.get(server.url + path, timeout=args.timeout)
+                    ok = succeeded(response)
+                except Exception:
+                    ok = False
+                elapsed = time.perf_counter() - sent
+                with lock:
+                    results[name].append(elapsed)
+                    if not ok:
+                        errors[name] += 1
+                if args.think:
+                    time.sleep(rng.expovariate(1 / args.think))
+
+        threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        after = scrape(setup, server.url)
+        limiter_waits = after['limiter_waits'] - before['limiter_waits']
+        limiter_wait = after['limiter_wait_seconds'] - before['limiter_wait_seconds']
+        all_latencies = [value for values in results.values() for value in values]
+        return {
+            'users': users,
+            'mix': mix,
+            'seconds': round(elapsed, 2),
+            'throughput_rps': round(len(all_latencies) / elapsed, 2),
+            'errors': sum(errors.values()),
+            'overall': latency_summary(all_latencies),
+            'endpoints': {name: dict(latency_summary(results[name]), errors=errors[name]) for name in names},
+            'upstream_calls': upstream.calls - upstream_before,
+            'upstream_requests_metric': int(after['upstream_requests'] - before['upstream_requests']),
+            'limiter_wait_seconds': round(limiter_wait, 3),
+            'limiter_wait_mean_ms': round(limiter_wait / limiter_waits * 1000, 1) if limiter_waits else 0.0
+        }
+    finally:
+        server.close()
+
+def report(result):
+    """Print one scenario's results"""
+    overall = result['overall']
+    print(f"\n{result['users']} users, mix {','.join(f'{k}={v:g}' for k, v in result['mix'].items())}: "
+          f"{result['throughput_rps']} req/s over {result['seconds']} s, {result['errors']} errors")
+    print(f"  {'endpoint':10} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in list(result['endpoints'].items()) + [('all', dict(overall, errors=result['errors']))]:
+        values = [stats[key] if stats[key] is not None else '-' for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"  {name:10} {stats['requests']:8} {stats['errors']:6} " + ' '.join(f'{value:>9}' for value in values))
+    print(f"  upstream calls {result['upstream_calls']}, rate limiter wait {result['limiter_wait_seconds']} s "
+          f"total ({result['limiter_wait_mean_ms']} ms per upstream request)")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        parser = argparse.ArgumentParser()
+        parser.add_argument('serve')
+        parser.add_argument('--upstream', required=True)
+        parser.add_argument('--port', type=int, required=True)
+        parser.add_argument('--db', required=True)
+        parser.add_argument('--requests-per-minute', type=int, required=True)
+        return serve(parser.parse_args())
+
+    sys.path.insert(0, APP_DIR)
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', default='1,10,50', help='Comma separated concurrent user counts, one scenario each')
+    parser.add_argument('--mix', type=parse_mix, action='append',
+                        help='Action weights, e.g. analyze=1,watchlist=2,movers=7; repeat for more mixes')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds each scenario runs')
+    parser.add_argument('--think', type=float, default=0, help='Mean pause between a user\'s requests in seconds')
+    parser.add_argument('--symbols', type=int, default=20, help='Distinct tickers users analyze')
+    parser.add_argument('--watchlist-size', type=int, default=10, help='Tickers on each user\'s watchlist')
+    parser.add_argument('--latency', type=float, default=0.15, help='Stub upstream response delay in seconds')
+    parser.add_argument('--bars', type=int, default=6500, help='Daily bars in stub price histories')
+    parser.add_argument('--requests-per-minute', type=int, default=Config.REQUESTS_PER_MINUTE,
+                        help='Upstream rate limit the app enforces')
+    parser.add_argument('--timeout', type=float, default=120, help='Client timeout per request in seconds')
+    parser.add_argument('--app-log', help='Append app server output to this file')
+    parser.add_argument('--output', help='Also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    mixes = args.mix or [{'analyze': 1, 'watchlist': 2, 'movers': 7}]
+    upstream = StubUpstream(args.latency, args.bars)
+    results = []
+    try:
+        for mix in mixes:
+            for users in (int(value) for value in args.users.split(',')):
+                result = run_scenario(upstream, mix, users, args)
+                report(result)
+                results.append(result)
+    finally:
+        upstream.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'settings': {key: value for key, value in vars(args).items() if key != 'mix'},
+                       'scenarios': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""Offline benchmarks for the data, indicator, chart and serialization paths.
+
+Every upstream request is answered from benchmarks/fixtures (recorded or
+synthetic), so runs are repeatable and need no API key or network. Each
+case is timed over several runs and then run once more under tracemalloc
+for its peak allocation. Results are written as JSON; pass an earlier
+results file as --baseline to fail on regressions.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --filter chart --repeat 10
+    python benchmarks/run.py --baseline benchmarks/results/baseline.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fixtures import APP_DIR, FixtureUpstream
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Ticker used for single-symbol cases, and the watchlist sizes measured
+SYMBOL = 'BENCH'
+WATCHLIST_SIZES = (1, 10, 100)
+
+# Symbols in the screener cases, and the screens run over them
+SCREENER_UNIVERSE = 10000
+SCREENER_QUERIES = {
+    'all_by_market_cap': [],
+    'large_cap_value': [('min_market_cap', '1e10'), ('max_pe_ratio', '20'), ('min_dividend_yield', '0.02')],
+    'sector_momentum': [('sector', 'TECHNOLOGY'), ('sector', 'ENERGY'), ('min_rsi', '50'), ('sort', 'return_1y')],
+    'deep_page': [('sort', 'relative_volume'), ('page', '150'), ('per_page', '50')],
+    'page_500': [('sort', 'change_percent'), ('per_page', '500')],
+    'filtered_deep_page': [('min_market_cap', '2e9'), ('sort', 'rsi'), ('page', '60'), ('per_page', '50')]
+}
+
+# Slowdowns smaller than this are timer noise on sub-millisecond cases, not regressions
+MIN_DELTA_MS = 1.0
+
+class Bench:
+    """App, services and fixture upstream shared by all cases"""
+
+    def __init__(self, bars):
+        from config import Config
+        # Fixtures answer instantly, so the real limit would only add sleeps
+        Config.REQUESTS_PER_MINUTE = 10 ** 9
+        # Snapshot refreshes are timed as their own case, not left to the background thread
+        Config.WATCHLIST_REFRESH_INTERVAL = 10 ** 9
+        # and recompute every row in one pass rather than a budgeted share of the rows per pass
+        Config.WATCHLIST_REFRESH_MAX_CALLS = 10 ** 9
+
+        self.upstream = FixtureUpstream(bars=bars).install()
+        self.db_dir = tempfile.mkdtemp(prefix='stockapp-bench-')
+        # The fixture listing must not replace a real download saved in the instance folder
+        Config.SYMBOL_DIRECTORY_PATH = os.path.join(self.db_dir, 'listing_status.csv')
+
+        import app as app_module
+        from modules import services
+        self.app_module = app_module
+        self.services = services
+        self.app = app_module.create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(self.db_dir, 'bench.db')
+        })
+        self.client = self.app.test_client()
+        # The watchlist cases read the rows set_watchlist writes for this user
+        with self.client.session_transaction() as session:
+            session['user_id'] = 'default_user'
+        self.fetcher = services.data_fetcher()
+
+    def clear_caches(self):
+        """Forget every cached response, dataset and chart so the next call does the full work"""
+        self.fetcher.clear_caches()
+        self.app_module.chart_cache.clear()
+
+    def analysis_data(self):
+        """Analysis payload the chart builders receive, with the downsampled chart frame"""
+        dataset, error = self.fetcher.compile_complete_dataset(SYMBOL)
+        if error:
+            raise RuntimeError(error)
+        data = self.app_module._build_analysis_data(dataset)
+        chart_df = self.services.downsampler().downsample(data['price_data'])
+        return data, chart_df
+
+    def set_watchlist(self, size):
+        """Make the watchlist hold the given number of symbols"""
+        from models import db, Watchlist, WatchlistUser
+        with self.app.app_context():
+            db.create_all()
+            # The background refresh only covers watchlists opened recently
+            db.session.merge(WatchlistUser(user_id='default_user', last_seen=datetime.datetime.utcnow()))
+            db.session.commit()
+            if Watchlist.query.count() == size:
+                return
+            Watchlist.query.delete()
+            db.session.add_all(Watchlist(symbol=f'W{i:03d}', user_id='default_user') for i in range(size))
+            db.session.commit()
+
+    def set_fundamentals(self, count):
+        """Fill the fundamentals table with count synthetic symbols"""
+        from fixtures import synthetic_fundamentals
+        from models import db, Fundamentals
+        with self.app.app_context():
+            db.create_all()
+            if Fundamentals.query.count() == count:
+                return
+            Fundamentals.query.delete()
+            self.app_module._store_fundamentals(synthetic_fundamentals(count))
+
+    def refresh_snapshots(self, drop=False):
+        """Bring the watchlist snapshot table up to date, recomputing every row if drop is set"""
+        from models import db, WatchlistSnapshot
+        with self.app.app_context():
+            if drop:
+                WatchlistSnapshot.query.delete()
+                db.session.commit()
+            self.app_module._refresh_watchlist_snapshots()
+
+def build_cases(bench):
+    """Benchmark cases as (name, setup, run); setup runs before every timed run and is not timed"""
+    from modules import json_encoder
+
+    fetcher = bench.fetcher
+    visualizer = bench.services.visualizer()
+    figures = bench.services.figure_builder()
+    data, chart_df = bench.analysis_data()
+    price_columns = fetcher.fetch_price_history(SYMBOL)[0]
+    insider = {'transactions': [{'transactionType': 'Buy' if i % 3 else 'Sell', 'shares': 1000} for i in range(10)]}
+
+    def no_setup():
+        pass
+
+    from modules.symbol_directory import SymbolIndex, parse_listing
+    listing = bench.upstream.body({'function': 'LISTING_STATUS'})
+    directory = bench.services.symbol_directory()
+    directory.wait()
+    if directory.known(SYMBOL) is not True:
+        raise RuntimeError('Symbol directory did not load the fixture listing')
+
+    cases = [
+        ('fetch_time_series_data', bench.clear_caches, lambda: fetcher.fetch_time_series_data(SYMBOL)),
+        ('fetch_price_history', bench.clear_caches, lambda: fetcher.fetch_price_history(SYMBOL)),
+        ('add_technical_indicators', no_setup, lambda: fetcher._add_technical_indicators(price_columns.copy())),
+        ('compile_complete_dataset', bench.clear_caches, lambda: fetcher.compile_complete_dataset(SYMBOL)),
+        ('downsample', no_setup, lambda: bench.services.downsampler().downsample(data['price_data']))
+    ]
+
+    # Plotly figures and the direct dict builders, on the same input the app passes them
+    chart_inputs = {
+        'price': lambda: (chart_df,),
+        'technical': lambda: (chart_df,),
+        'volume': lambda: (chart_df,),
+        'summary': lambda: (dict(data, price_data=chart_df),),
+        'financial': lambda: (data['financial_data'],),
+        'ownership': lambda: (data.get('ownership_data'),),
+        'insider': lambda: (insider,)
+    }
+    for kind, args in chart_inputs.items():
+        method = f'create_{kind}_chart'
+        cases.append((f'visualizer.{method}', no_setup, lambda method=method, args=args: getattr(visualizer, method)(*args())))
+        if hasattr(figures, method):
+            cases.append((f'figure_builder.{method}', no_setup, lambda method=method, args=args: getattr(figures, method)(*args())))
+
+    figure = visualizer.create_price_chart(chart_df)
+    cases.append(('visualizer.figure_to_json', no_setup, lambda: visualizer.figure_to_json(figure)))
+
+    # Serializing the full /analyze payload, charts included
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        payload = bench.client.post('/analyze', data={'ticker': SYMBOL, 'include_charts': 'true'}).get_json()
+    cases.append(('json_encoder.dumps(analyze)', no_setup, lambda: json_encoder.dumps(payload)))
+
+    def analyze():
+        response = bench.client.post('/analyze', data={'ticker': SYMBOL, 'include_charts': 'true'})
+        if response.status_code != 200 or 'error' in response.get_json():
+            raise RuntimeError(f'/analyze failed: {response.get_data(as_text=True)[:200]}')
+
+    # Building the index once a day, then the lookups autocomplete and validation make
+    cases.append(('symbol_directory.build', no_setup, lambda: SymbolIndex(parse_listing(listing))))
+    for kind, query in (('exact', 'BENCH'), ('prefix', 'W0'), ('name', 'pharma'), ('substring', 'ech hol')):
+        cases.append((f'symbol_search.{kind}', no_setup, lambda query=query: directory.search(query)))
+    cases.append(('symbol_search.endpoint', no_setup, lambda: bench.client.get('/api/symbols/search?q=glob')))
+
+    # Screening the whole stored universe: loading the table into columns, then filtered, sorted pages
+    from modules.screener import Screener, parse_query
+    from werkzeug.datastructures import MultiDict
+    bench.set_fundamentals(SCREENER_UNIVERSE)
+    screener = Screener(reload_interval=0)
+    with bench.app.app_context():
+        screener.refresh(bench.app_module._fundamentals_version, bench.app_module._load_fundamentals)
+
+    def reload_screener():
+        screener.version = None
+        with bench.app.app_context():
+            screener.refresh(bench.app_module._fundamentals_version, bench.app_module._load_fundamentals)
+
+    cases.append((f'screener_load.{SCREENER_UNIVERSE}', no_setup, reload_screener))
+    for name, args in SCREENER_QUERIES.items():
+        query, error = parse_query(MultiDict(args))
+        if error:
+            raise RuntimeError(error)
+        cases.append((f'screener.{name}', no_setup, lambda query=query: screener.screen(query)))
+    # Repeats above reuse the filtered order cached for paging; this one pays for building it each time
+    deep_query, _ = parse_query(MultiDict(SCREENER_QUERIES['filtered_deep_page']))
+    cases.append(('screener.filtered_deep_page.uncached', lambda: screener.store.matches.clear(),
+                  lambda: screener.screen(deep_query)))
+    cases.append(('screener.endpoint', no_setup, lambda: bench.client.get('/api/screener?min_market_cap=2e9&sort=rsi')))
+
+    # The per-item work the universe ingestion hands to its process pool
+    from modules.ingestion import FUNCTIONS, parse_response
+    for function, params in FUNCTIONS.items():
+        body = bench.upstream.body(dict(params, function=function, symbol=SYMBOL))
+        cases.append((f'ingest.parse.{function}', no_setup, lambda function=function, body=body: parse_response(function, body)))
+
+    cases.append(('analyze_e2e.cold', bench.clear_caches, analyze))
+    cases.append(('analyze_e2e.warm', no_setup, analyze))
+
+    for size in WATCHLIST_SIZES:
+        def warm_setup(size=size):
+            bench.set_watchlist(size)
+            bench.refresh_snapshots()
+
+        def cold_setup(size=size):
+            bench.set_watchlist(size)
+            bench.clear_caches()
+
+        def watchlist_data(size=size):
+            rows = bench.client.get('/api/watchlist/data').get_json()
+            complete = [row for row in rows if 'error' not in row and 'pending' not in row]
+            if len(complete) != size:
+                raise RuntimeError(f'/api/watchlist/data returned {len(complete)} complete rows, expected {size}')
+
+        # What a page load costs, and what the background refresher spends recomputing every row
+        cases.append((f'watchlist_data.{size}', warm_setup, watchlist_data))
+        cases.append((f'watchlist_refresh.{size}', cold_setup, lambda: bench.refresh_snapshots(drop=True)))
+
+    return cases
+
+def measure(setup, run, repeat, budget):
+    """Wall times in ms over repeat runs after one warm-up, then peak traced memory of one more run"""
+    setup()
+    started = time.perf_counter()
+    run()
+    # Slow cases (a cold 100 symbol watchlist) get fewer runs so a full suite stays practical
+    repeat = max(1, min(repeat, int(budget / (time.perf_counter() - started))))
+
+    times = []
+    for _ in range(repeat):
+        setup()
+        started = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - started) * 1000)
+
+    # Traced separately because tracemalloc slows allocation-heavy code several times over
+    setup()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'runs': repeat,
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'mean_ms': round(statistics.mean(times), 3),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+def import_time_case(repeat):
+    """Cold import and app creation in a fresh interpreter, via benchmarks/import_time.py"""
+    from import_time import measure as measure_imports
+    times = [sum(row[2] for row in measure_imports() if row[3] == 0) / 1000 for _ in range(repeat)]
+    return {
+        'runs': repeat,
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'mean_ms': round(statistics.mean(times), 3),
+        'peak_kb': None
+    }
+
+def metadata(args):
+    """Environment details stored with results, so comparisons across machines are recognisable"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    import numpy
+    import pandas
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'bars': args.bars,
+        'repeat': args.repeat
+    }
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline and return the names that regressed"""
+    regressions = []
+    print(f"\n{'case':42} {'median ms':>10} {'baseline':>10} {'change':>8}   {'peak KB':>10} {'baseline':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or 'median_ms' not in base or 'median_ms' not in result:
+            continue
+        change = result['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0
+        slower = change > threshold and result['median_ms'] - base['median_ms'] > MIN_DELTA_MS
+        bigger = (result['peak_kb'] is not None and base.get('peak_kb')
+                  and result['peak_kb'] / base['peak_kb'] - 1 > threshold)
+        flag = '  REGRESSION' if slower or bigger else ''
+        print(f"{name:42} {result['median_ms']:10.2f} {base['median_ms']:10.2f} {change:+8.1%}   "
+              f"{result['peak_kb'] if result['peak_kb'] is not None else '-':>10} {base.get('peak_kb') or '-':>10}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+    parser.add_argument('--budget', type=float, default=30, help='Seconds of timed runs per case before runs are cut short')
+    parser.add_argument('--bars', type=int, default=6500, help='Daily bars in synthetic price histories')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this text')
+    parser.add_argument('--output', help='Results file (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown or memory growth before failing')
+    parser.add_argument('--skip-import', action='store_true', help='Skip the cold import case')
+    args = parser.parse_args()
+
+    results = {}
+    # The app logs every request and stage; keep the report readable
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        bench = Bench(args.bars)
+        cases = build_cases(bench)
+
+    for name, setup, run in cases:
+        if args.filter not in name:
+            continue
+        try:
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                results[name] = measure(setup, run, args.repeat, args.budget)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            print(f"{name:42} ERROR {str(e)}")
+            continue
+        print(f"{name:42} {results[name]['median_ms']:10.2f} ms  (min {results[name]['min_ms']:.2f})  "
+              f"peak {results[name]['peak_kb']:10.1f} KB")
+
+    if not args.skip_import and args.filter in 'import_app':
+        results['import_app'] = import_time_case(args.repeat)
+        print(f"{'import_app':42} {results['import_app']['median_ms']:10.2f} ms  (min {results['import_app']['min_ms']:.2f})")
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': metadata(args), 'results': results}, f, indent=2)
+    print(f"\nResults written to {output} ({bench.upstream.calls} fixture requests served)")
+
+    failed = any('error' in result for result in results.values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} case(s) regressed more than {args.threshold:.0%}")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,7 +6,8 @@ import os
 
 class Config:
     # Flask settings
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev')
+    SECRET_KEY = os.getenv('SECRET_KEY')  # Signs the session cookie that carries each browser's user id
+    SECRET_KEY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'secret_key')  # Random key generated and shared by all processes when SECRET_KEY is unset
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     
     # Alpha Vantage API settings
@@ -17,5 +18,67 @@ class Config:
     # Application settings
     REQUESTS_PER_MINUTE = 75    # Premium tier limit
     CACHE_DURATION = 3600  # Cache duration in seconds (1 hour)
+    DATASET_CACHE_MAX_ENTRIES = 64  # Compiled datasets kept in memory (full history with indicators, a few MB each)
+    RESPONSE_CACHE_DURATION = 900  # Seconds a raw API response is reused by any caller making the same request
+    QUOTE_CACHE_DURATION = 60  # Shorter reuse window for quote and market movers responses
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory budget for raw API responses, most recently used kept (64 MB)
     USE_MOCK_DATA = True  # Use mock data when API calls fail
-    USE_ADVANCED_INDICATORS = True  # Enable advanced technical indicators 
\ No newline at end of file
+    USE_ADVANCED_INDICATORS = True  # Enable advanced technical indicators
+    ANALYSIS_WORKERS = 4  # Worker threads running queued analysis jobs
+    ANALYSIS_QUEUE_LIMIT = 50  # Queued or running jobs accepted before new ones are refused
+    JOB_RETENTION = 600  # Seconds a finished job's result stays available for polling
+    JOB_MAX_WAIT = 30  # Longest a job status request may wait for the job to finish (seconds)
+    JOB_PRUNE_INTERVAL = 60  # Seconds between deletions of expired jobs from the shared job table
+    JOB_POLL_INTERVAL = 0.25  # Seconds between checks on a job another worker process is running
+    MARKET_FEED_INTERVAL = 300  # Seconds between market movers polls shared by all clients
+    COMPRESSION_MIN_SIZE = 1024  # Responses smaller than this many bytes are sent uncompressed
+    COMPRESSION_GZIP_LEVEL = 6  # gzip level for JSON responses (1 fastest - 9 smallest)
+    COMPRESSION_BROTLI_QUALITY = 5  # Brotli quality when the brotli package is installed (0 - 11)
+    MARKET_FEED_HEARTBEAT = 15  # Seconds between keep-alives on idle market feed streams
+    BATCH_MAX_SYMBOLS = 200  # Most tickers accepted by one batch analysis request
+    BATCH_FETCH_WORKERS = 4  # Concurrent price history fetches in a batch, all sharing the rate limit
+    BULK_QUOTE_CHUNK = 100  # Symbols per REALTIME_BULK_QUOTES request (API maximum)
+    WATCHLIST_IMPORT_MAX = 1000  # Most symbols accepted by one watchlist import
+    USER_SESSION_DAYS = 365  # Days a browser keeps its anonymous user id, and with it its watchlist
+    WATCHLIST_ACTIVE_DAYS = 30  # Only watchlists used within this many days are kept fresh in the background
+    WATCHLIST_REFRESH_INTERVAL = 60  # Seconds between background passes over the watchlist snapshot
+    WATCHLIST_SNAPSHOT_MAX_AGE = 900  # Snapshot rows older than this are recomputed and reported as stale
+    WATCHLIST_REFRESH_MAX_CALLS = 20  # Upstream requests one refresh pass may use before leaving the rest for the next pass
+    WATCHLIST_REFRESH_LEASE = 300  # Seconds a process holds a symbol's refresh before another process may take it over
+    SYMBOL_DIRECTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'listing_status.csv')  # Saved LISTING_STATUS download shared by all processes
+    SYMBOL_DIRECTORY_MAX_AGE = 86400  # Seconds before the listed symbols are downloaded again (daily)
+    SYMBOL_DIRECTORY_RETRY = 300  # Seconds to wait after a failed listing download before trying again
+    SYMBOL_SEARCH_MAX_RESULTS = 50  # Most matches one symbol search may ask for
+    SCREENER_PAGE_SIZE = 50  # Screener results per page unless the request asks for another size
+    SCREENER_MAX_PAGE_SIZE = 500  # Largest page one screener request may ask for
+    SCREENER_RELOAD_INTERVAL = 30  # Seconds between checks for changed fundamentals before reloading the screener store
+    SCREENER_CACHED_QUERIES = 64  # Filtered screens kept in sort order so later pages are slices
+    INGEST_FETCH_WORKERS = 4  # Concurrent ingestion requests, all sharing the per-minute limit
+    INGEST_PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Processes parsing ingested responses (0 parses in the fetching process)
+    INGEST_BATCH_SIZE = 50  # Parsed items stored and checkpointed per transaction
+    INGEST_MAX_ATTEMPTS = 3  # Failures before an item is skipped until --retry-failed or its refresh is due
+    INGEST_REFRESH_AFTER = 86400  # Seconds before an ingested item is fetched again (daily)
+    INGEST_RATE_LIMIT_PAUSE = 60  # Seconds to wait when the API reports the rate limit was exceeded anyway
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False').lower() == 'true'  # Run the sampling profiler and serve /debug/profile to local requests; keep off in production
+    PROFILER_INTERVAL = 0.01  # Seconds between stack samples (100 Hz)
+    PROFILER_WINDOW = 300  # Seconds of sampled stacks kept in memory
+    PROFILER_MAX_SECONDS = 60  # Longest profile one /debug/profile request may collect
+    PROFILER_MAX_LABELS = 10000  # Frame labels cached before the cache is emptied and rebuilt
+    
+    # Database settings
+    SQLITE_JOURNAL_MODE = 'WAL'  # Readers and the single writer no longer block each other (None keeps the file's mode)
+    SQLITE_SYNCHRONOUS = 'NORMAL'  # Safe with WAL; fsync at checkpoints instead of every commit
+    SQLITE_BUSY_TIMEOUT = 5000  # Milliseconds a connection waits for another process's write lock
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # Bytes of the database file read through memory mapping
+    DB_POOL_SIZE = 8  # Connections kept open per process, roughly one per request thread
+    DB_MAX_OVERFLOW = 16  # Extra connections allowed under bursts, closed when returned
+    DB_POOL_TIMEOUT = 10  # Seconds a request waits for a free connection before failing
+    
+    # Chart settings
+    CHART_DOWNSAMPLING = True  # Downsample long price histories before building charts
+    CHART_MAX_POINTS = 1500  # Target number of points per chart trace
+    CHART_FULL_RESOLUTION_BARS = 252  # Most recent bars always kept at full resolution (~1 trading year)
+    CHART_BINARY_ARRAYS = False  # Send chart arrays as base64 typed arrays (needs plotly.js >= 2.28)
+    CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory budget for serialized charts (64 MB)
+    CHART_FAST_FIGURES = True  # Build figure dicts directly instead of validating every trace through Plotly
+    CHART_SHARED_COLUMNS = True  # Send each distinct trace column once and let the client rebuild figures
@@ -1,13 +1,57 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
 from datetime import datetime
+import sqlite3
+from config import Config
 
 db = SQLAlchemy()
 
+def engine_options():
+    """Connection pool settings; every pooled connection keeps its pragmas and page cache between requests"""
+    return {
+        'pool_size': Config.DB_POOL_SIZE,
+        'max_overflow': Config.DB_MAX_OVERFLOW,
+        'pool_timeout': Config.DB_POOL_TIMEOUT
+    }
+
+def upgrade_schema():
+    """Add indexes that create_all skips on tables created by older versions; safe to run on every start"""
+    # Duplicates left by the old check-then-insert add would block the unique index
+    db.session.execute(text('DELETE FROM watchlist WHERE id NOT IN '
+                            '(SELECT MIN(id) FROM watchlist GROUP BY user_id, symbol)'))
+    db.session.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_watchlist_user_symbol ON watchlist (user_id, symbol)'))
+    db.session.commit()
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure each new SQLite connection for several worker processes sharing one file"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    pragmas = (
+        ('journal_mode', Config.SQLITE_JOURNAL_MODE),
+        ('synchronous', Config.SQLITE_SYNCHRONOUS),
+        ('busy_timeout', Config.SQLITE_BUSY_TIMEOUT),
+        ('mmap_size', Config.SQLITE_MMAP_SIZE)
+    )
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            if value is not None:
+                cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+# Owner of the watchlist rows saved before each browser got its own anonymous id
+LEGACY_USER_ID = 'default_user'
+
 class Watchlist(db.Model):
     __tablename__ = 'watchlist'
+    # One row per symbol per user; also serves every per-user lookup
+    __table_args__ = (db.Index('ix_watchlist_user_symbol', 'user_id', 'symbol', unique=True),)
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(50), default='default_user')  # For future user authentication
+    user_id = db.Column(db.String(50), default=LEGACY_USER_ID)  # Anonymous id kept in the browser session
     symbol = db.Column(db.String(20), nullable=False)
     date_added = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text, nullable=True)
@@ -21,4 +65,111 @@ class Watchlist(db.Model):
             'symbol': self.symbol,
             'date_added': self.date_added.strftime('%Y-%m-%d %H:%M:%S'),
             'notes': self.notes
-        } 
\ No newline at end of file
+        }
+
+class WatchlistUser(db.Model):
+    """When an anonymous watchlist user last made a watchlist request"""
+    __tablename__ = 'watchlist_user'
+    
+    user_id = db.Column(db.String(50), primary_key=True)
+    last_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<WatchlistUser {self.user_id}>'
+
+class WatchlistSnapshot(db.Model):
+    """Last computed watchlist table row for a symbol, shared by every watchlist that holds it"""
+    __tablename__ = 'watchlist_snapshot'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    data = db.Column(db.Text, nullable=False)  # The row as JSON, without the watchlist item id
+    error = db.Column(db.Text, nullable=True)  # Set when the row could not be computed
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<WatchlistSnapshot {self.symbol}>'
+
+class SnapshotLease(db.Model):
+    """Claim by one worker process on recomputing a symbol's watchlist snapshot"""
+    __tablename__ = 'snapshot_lease'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False)  # Another process may take the symbol over after this
+    
+    def __repr__(self):
+        return f'<SnapshotLease {self.symbol}>'
+
+class Fundamentals(db.Model):
+    """Latest screener fields for one symbol: overview fundamentals plus metrics from its price history"""
+    __tablename__ = 'fundamentals'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    name = db.Column(db.String(200), nullable=True)
+    exchange = db.Column(db.String(20), nullable=True)
+    sector = db.Column(db.String(100), nullable=True)
+    industry = db.Column(db.String(200), nullable=True)
+    
+    # From OVERVIEW; ratios and margins are fractions as the API reports them
+    market_cap = db.Column(db.Float, nullable=True)
+    pe_ratio = db.Column(db.Float, nullable=True)
+    forward_pe = db.Column(db.Float, nullable=True)
+    peg_ratio = db.Column(db.Float, nullable=True)
+    price_to_book = db.Column(db.Float, nullable=True)
+    price_to_sales = db.Column(db.Float, nullable=True)
+    eps = db.Column(db.Float, nullable=True)
+    dividend_yield = db.Column(db.Float, nullable=True)
+    beta = db.Column(db.Float, nullable=True)
+    profit_margin = db.Column(db.Float, nullable=True)
+    operating_margin = db.Column(db.Float, nullable=True)
+    return_on_equity = db.Column(db.Float, nullable=True)
+    revenue_growth = db.Column(db.Float, nullable=True)
+    earnings_growth = db.Column(db.Float, nullable=True)
+    
+    # From the daily price history; returns and change in percent
+    price = db.Column(db.Float, nullable=True)
+    change_percent = db.Column(db.Float, nullable=True)
+    volume = db.Column(db.Float, nullable=True)
+    avg_volume = db.Column(db.Float, nullable=True)
+    relative_volume = db.Column(db.Float, nullable=True)
+    rsi = db.Column(db.Float, nullable=True)
+    ma50 = db.Column(db.Float, nullable=True)
+    ma200 = db.Column(db.Float, nullable=True)
+    return_1m = db.Column(db.Float, nullable=True)
+    return_3m = db.Column(db.Float, nullable=True)
+    return_1y = db.Column(db.Float, nullable=True)
+    high_52w = db.Column(db.Float, nullable=True)
+    low_52w = db.Column(db.Float, nullable=True)
+    
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<Fundamentals {self.symbol}>'
+
+class IngestionCheckpoint(db.Model):
+    """Outcome of the last universe ingestion of one API function for one symbol"""
+    __tablename__ = 'ingestion_checkpoint'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    function = db.Column(db.String(30), primary_key=True)
+    status = db.Column(db.String(10), nullable=False)  # 'done' or 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Failures since the last success
+    error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<IngestionCheckpoint {self.symbol} {self.function}>'
+
+class AnalysisJob(db.Model):
+    """State of a queued analysis job, readable by every worker process"""
+    __tablename__ = 'analysis_job'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(10), nullable=False)  # queued, running, done or failed
+    stage = db.Column(db.String(200), nullable=True)
+    result = db.Column(db.Text, nullable=True)  # Response payload as JSON once done
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True, index=True)
+    
+    def __repr__(self):
+        return f'<AnalysisJob {self.id}>'
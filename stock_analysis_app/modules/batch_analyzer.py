@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+class BatchAnalyzer:
+    """Compute the same price metrics for many tickers in one pass.
+
+    Upstream calls are planned across the whole batch: quotes come from bulk
+    requests, price histories reuse compiled datasets and cached responses,
+    and every request goes through the one DataFetcher rate limiter.
+    Indicators are then computed once on a matrix holding every symbol's
+    recent history, one column per symbol.
+    """
+
+    HISTORY_BARS = 260  # Enough for the 200-day average and a 52-week range
+
+    OVERVIEW_FIELDS = {
+        'name': 'Name',
+        'sector': 'Sector',
+        'industry': 'Industry',
+        'market_cap': 'MarketCapitalization',
+        'pe_ratio': 'PERatio',
+        'eps': 'EPS',
+        'dividend_yield': 'DividendYield',
+        'beta': 'Beta'
+    }
+
+    def __init__(self, data_fetcher):
+        self.data_fetcher = data_fetcher
+
+    def analyze(self, symbols, include_overview=False, progress=None):
+        """Metrics for every symbol as columns aligned with the returned symbol list"""
+        if progress:
+            progress(f'Fetching quotes for {len(symbols)} symbols')
+        quotes, errors = self.data_fetcher.fetch_bulk_quotes(symbols)
+
+        if progress:
+            progress('Fetching price histories')
+        with ThreadPoolExecutor(max_workers=Config.BATCH_FETCH_WORKERS, thread_name_prefix='batch') as pool:
+            histories = dict(zip(symbols, pool.map(self.data_fetcher.fetch_price_history, symbols)))
+            overviews = {}
+            if include_overview:
+                overviews = dict(zip(symbols, pool.map(self.data_fetcher.fetch_company_overview, symbols)))
+
+        frames = {}
+        for symbol, (df, error) in histories.items():
+            if error or not isinstance(df, pd.DataFrame) or df.empty:
+                errors.setdefault(symbol, error or 'No time series data found')
+            else:
+                frames[symbol] = df
+
+        if progress:
+            progress('Computing indicators')
+        analyzed = [symbol for symbol in symbols if symbol in frames or symbol in quotes]
+        columns = self._price_columns(analyzed, frames)
+        columns.update(self._quote_columns(analyzed, quotes))
+        if include_overview:
+            columns.update(self._overview_columns(analyzed, overviews))
+
+        return {
+            'symbols': analyzed,
+            'columns': self._json_columns(columns),
+            'errors': {symbol: errors.get(symbol, 'No data found') for symbol in symbols if symbol not in analyzed}
+        }
+
+    def _price_columns(self, symbols, frames):
+        """Indicator values on the latest bar for every symbol, computed on one matrix"""
+        bars = self.HISTORY_BARS
+        shape = (bars, len(symbols))
+        close, high, low, volume = (np.full(shape, np.nan) for _ in range(4))
+
+        # Histories are aligned on their latest bar; shorter ones are padded with NaN at the top
+        for j, symbol in enumerate(symbols):
+            df = frames.get(symbol)
+            if df is None:
+                continue
+            tail = df.iloc[-bars:]
+            rows = slice(bars - len(tail), bars)
+            close[rows, j] = tail['close'].to_numpy()
+            high[rows, j] = tail['high'].to_numpy()
+            low[rows, j] = tail['low'].to_numpy()
+            volume[rows, j] = tail['volume'].to_numpy()
+
+        close = pd.DataFrame(close)
+        volume = pd.DataFrame(volume)
+        last = close.iloc[-1]
+
+        ma20 = close.rolling(window=20).mean()
+        std20 = close.rolling(window=20).std()
+        avg_volume = volume.rolling(window=20).mean()
+
+        # Same formulas as DataFetcher._add_technical_indicators, applied to every column at once
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+        loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
+        rsi = 100 - (100 / (1 + gain / loss))
+
+        macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        macd_signal = macd.ewm(span=9, adjust=False).mean()
+
+        previous_close = np.vstack([np.full((1, len(symbols)), np.nan), close.to_numpy()[:-1]])
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+        atr = pd.DataFrame(true_range).rolling(window=14).mean()
+
+        def trailing_return(periods):
+            return (last / close.iloc[-1 - periods] - 1) * 100
+
+        return {
+            'last_close': last,
+            'MA20': ma20.iloc[-1],
+            'MA50': close.rolling(window=50).mean().iloc[-1],
+            'MA200': close.rolling(window=200).mean().iloc[-1],
+            'upper_band': (ma20 + std20 * 2).iloc[-1],
+            'lower_band': (ma20 - std20 * 2).iloc[-1],
+            'RSI': rsi.iloc[-1],
+            'MACD': macd.iloc[-1],
+            'MACD_signal': macd_signal.iloc[-1],
+            'MACD_hist': (macd - macd_signal).iloc[-1],
+            'ATR': atr.iloc[-1],
+            'avg_volume': avg_volume.iloc[-1],
+            'relative_volume': (volume / avg_volume).iloc[-1],
+            'return_1m': trailing_return(21),
+            'return_3m': trailing_return(63),
+            'return_1y': trailing_return(252),
+            '52_week_high': pd.DataFrame(high).iloc[-252:].max(),
+            '52_week_low': pd.DataFrame(low).iloc[-252:].min()
+        }
+
+    @staticmethod
+    def _quote_columns(symbols, quotes):
+        """Latest quote fields, parsed to numbers"""
+        columns = {}
+        for name in ('close', 'change', 'change_percent', 'volume', 'previous_close'):
+            values = [quotes.get(symbol, {}).get(name) for symbol in symbols]
+            columns['price' if name == 'close' else name] = pd.to_numeric(pd.Series(values, dtype=object),
+                                                                          errors='coerce')
+        return columns
+
+    def _overview_columns(self, symbols, overviews):
+        """Company overview fields, kept as the strings the API returns"""
+        columns = {}
+        for name, field in self.OVERVIEW_FIELDS.items():
+            values = []
+            for symbol in symbols:
+                overview, error = overviews.get(symbol, (None, None))
+                values.append(overview.get(field) if overview and not error else None)
+            columns[name] = values
+        return columns
+
+    @staticmethod
+    def _json_columns(columns, decimals=4):
+        """Numeric columns as rounded lists with NaN as None, ready for JSON"""
+        result = {}
+        for name, values in columns.items():
+            if isinstance(values, pd.Series):
+                array = np.round(values.to_numpy(dtype=float), decimals)
+                values = [None if np.isnan(v) else float(v) for v in array]
+            result[name] = values
+        return result
@@ -0,0 +1,75 @@
+import json
+
+# Arrays shorter than this are left inline, a reference would not save anything
+MIN_SHARED_LENGTH = 16
+
+# Key used by traces to reference a shared column
+COLUMN_REF = '$col'
+
+def build_chart_bundle(figures):
+    """Pack JSON-ready figures into a bundle that stores each distinct column once.
+
+    Trace arrays (x, y, open/high/low/close, marker colors, typed arrays) and
+    layout templates are moved into a shared 'columns' map and replaced by
+    {"$col": name} references. expandChartBundle() in main.js reverses this.
+    """
+    columns = {}
+    names_by_content = {}
+
+    def share(value):
+        content = json.dumps(value, separators=(',', ':'))
+        name = names_by_content.get(content)
+        if name is None:
+            name = f"c{len(columns)}"
+            names_by_content[content] = name
+            columns[name] = value
+        return {COLUMN_REF: name}
+
+    def pack(obj):
+        for key, value in obj.items():
+            if _is_column(value):
+                obj[key] = share(value)
+            elif isinstance(value, dict):
+                pack(value)
+
+    packed = {}
+    for kind, figure in figures.items():
+        if not figure:
+            continue
+        figure = dict(figure)
+        figure['data'] = [dict(trace) for trace in figure.get('data', [])]
+        for trace in figure['data']:
+            pack(trace)
+
+        # The Plotly template is identical across figures and a sizeable part of each one
+        layout = dict(figure.get('layout', {}))
+        if 'template' in layout:
+            layout['template'] = share(layout['template'])
+        figure['layout'] = layout
+
+        packed[kind] = figure
+
+    return {'format': 'shared-columns', 'columns': columns, 'figures': packed}
+
+def expand_chart_bundle(bundle):
+    """Rebuild plain figures from a chart bundle"""
+    columns = bundle.get('columns', {})
+
+    def expand(value):
+        if isinstance(value, dict):
+            if set(value) == {COLUMN_REF}:
+                return columns[value[COLUMN_REF]]
+            return {key: expand(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [expand(item) for item in value]
+        return value
+
+    return {kind: expand(figure) for kind, figure in bundle.get('figures', {}).items()}
+
+def _is_column(value):
+    """True for long data arrays, either plain lists or Plotly typed arrays"""
+    if isinstance(value, list):
+        return len(value) >= MIN_SHARED_LENGTH
+    if isinstance(value, dict):
+        return 'bdata' in value and 'dtype' in value
+    return False
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from modules.compression import precompress
+from modules import metrics
+
+class ChartCache:
+    """LRU cache of serialized chart JSON, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or Config.CHART_CACHE_MAX_BYTES
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        metrics.gauge('chart_cache_bytes', lambda: self.total_bytes)
+
+    @staticmethod
+    def make_key(symbol, data_version, kind, options=()):
+        """Build a cache key from the symbol, last bar date, chart type and chart options"""
+        return (symbol.upper(), str(data_version), kind, tuple(options))
+
+    def get(self, key):
+        """Return the cached entry for key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.inc('cache_requests_total', cache='chart', result='miss')
+                return None
+
+            # Mark as most recently used
+            self.entries.move_to_end(key)
+            self.hits += 1
+            metrics.inc('cache_requests_total', cache='chart', result='hit')
+            return entry
+
+    def revalidate(self, symbol, kind, options, etags):
+        """The entry one of the client's ETags names, if it was built within CACHE_DURATION, else None"""
+        for etag in etags:
+            key = self.make_key(symbol, etag.split('.', 1)[0], kind, options)
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None or entry['etag'] != etag:
+                    continue
+                if time.time() - entry['created'] >= Config.CACHE_DURATION:
+                    # Rebuilt from a fresh dataset by this request, which restarts its age
+                    self.entries.pop(key)
+                    self.total_bytes -= entry['size']
+                    continue
+                self.entries.move_to_end(key)
+                self.hits += 1
+            metrics.inc('cache_requests_total', cache='chart', result='hit')
+            return entry
+        return None
+
+    def put(self, key, body):
+        """Store serialized chart bytes with their compressed variants and return the new entry"""
+        # Compressed once here so repeat requests are served without compressing again
+        encoded = precompress(body)
+        entry = {
+            'body': body,
+            'encoded': encoded,
+            # Leads with the last bar date so a revalidation can find its entry before any data is fetched
+            'etag': f'{key[1]}.{hashlib.sha1(body).hexdigest()}',
+            'created': time.time(),
+            'size': len(body) + sum(len(variant) for variant in encoded.values())
+        }
+
+        # Charts larger than the whole budget are served but never cached
+        if entry['size'] > self.max_bytes:
+            return entry
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.total_bytes -= previous['size']
+
+            self.entries[key] = entry
+            self.total_bytes += entry['size']
+
+            # Evict least recently used charts until we are back under budget
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted['size']
+
+        return entry
+
+    def clear(self):
+        """Drop all cached charts"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,79 @@
+import gzip
+from flask import Response
+from config import Config
+
+# Brotli is optional; without it responses are only gzip-compressed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/css', 'text/plain', 'application/javascript')
+
+def available_encodings():
+    """Content encodings this server can produce, best first"""
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+def choose_encoding(accept_encodings):
+    """Pick the best encoding the client accepts, or None to send the body as is"""
+    for encoding in available_encodings():
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+def compress(body, encoding):
+    """Compress bytes with the given content encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.COMPRESSION_GZIP_LEVEL)
+
+def precompress(body):
+    """Compressed variants of a cacheable body by encoding, empty if it is below the size threshold"""
+    if len(body) < Config.COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(body, encoding) for encoding in available_encodings()}
+
+def encoded_response(body, variants, accept_encodings, mimetype='application/json', etag=None):
+    """Build a response from a body and its precompressed variants, picking one the client accepts"""
+    encoding = choose_encoding(accept_encodings) if variants else None
+    response = Response(variants[encoding] if encoding in variants else body, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    if etag:
+        response.set_etag(etag)
+    if encoding in variants:
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+    return response
+
+def compress_response(response, accept_encodings):
+    """Compress a finished response in place when it is large enough and the client accepts it"""
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    # Already encoded, either precompressed or by an earlier handler
+    if 'Content-Encoding' in response.headers:
+        _weaken_etag(response)
+        return response
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+def _weaken_etag(response):
+    """Mark the ETag weak: the encoded bytes differ, but If-None-Match still matches the same content"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
@@ -2,19 +2,27 @@ import requests
 import pandas as pd
 from datetime import datetime
 import time
+import threading
 from config import Config
+from modules import metrics
 import re
-from collections import deque
+from collections import deque, OrderedDict
 from datetime import datetime, timedelta
 import json
 import random
 import numpy as np
 
 class DataFetcher:
+    # Prices that move during the day are cached for QUOTE_CACHE_DURATION instead of RESPONSE_CACHE_DURATION
+    QUOTE_FUNCTIONS = ('GLOBAL_QUOTE', 'REALTIME_BULK_QUOTES', 'TOP_GAINERS_LOSERS')
+
     def __init__(self):
         self.api_key = Config.ALPHA_VANTAGE_API_KEY
         self.base_url = Config.ALPHA_VANTAGE_BASE_URL
         self.request_times = deque(maxlen=Config.REQUESTS_PER_MINUTE)
+        # Requests come from several threads (request handlers, job workers, the market feed)
+        self.rate_limit_lock = threading.Lock()
+        self.upstream_calls = 0  # Requests that have passed the rate limiter since startup
         self.api_timeout = Config.API_TIMEOUT
         
         print(f"DataFetcher initialized with API key: {self.api_key[:4]}***")
@@ -30,6 +38,22 @@ class DataFetcher:
         
         self.mock_data_loaded = False
         self.mock_data = {}
+        
+        # Compiled datasets by ticker, reused for CACHE_DURATION seconds; least recently used dropped beyond the limit
+        self.cache_duration = Config.CACHE_DURATION
+        self.dataset_cache = OrderedDict()
+        self.dataset_cache_lock = threading.Lock()
+        metrics.gauge('dataset_cache_entries', lambda: len(self.dataset_cache))
+        # Datasets being compiled right now, so concurrent requests for a ticker share one set of fetches
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        
+        # Raw API responses by request, so any caller repeating a recent request skips the upstream call
+        self.response_cache = OrderedDict()
+        self.response_cache_bytes = 0
+        self.response_cache_lock = threading.Lock()
+        metrics.gauge('response_cache_entries', lambda: len(self.response_cache))
+        metrics.gauge('response_cache_bytes', lambda: self.response_cache_bytes)
 
     def _load_mock_data(self):
         """Load mock data for fallback when APIs fail"""
@@ -287,34 +311,53 @@ class DataFetcher:
 
     def _check_rate_limits(self):
         """Check and enforce rate limits"""
-        current_time = time.time()
-        
-        # Check per-minute limit
-        if len(self.request_times) >= Config.REQUESTS_PER_MINUTE:
-            oldest_request = self.request_times[0]
-            time_since_oldest = current_time - oldest_request
-            
-            if time_since_oldest < 60:  # Less than a minute has passed
-                sleep_time = 60 - time_since_oldest + 1  # Add 1 second buffer
-                print(f"Rate limit approaching, waiting {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-        
-        # Update request times
-        self.request_times.append(current_time)
+        # Held while sleeping so concurrent callers queue up instead of all passing the check at once
+        with metrics.span('rate_limiter_wait_seconds'), self.rate_limit_lock:
+            current_time = time.time()
+            
+            # Check per-minute limit
+            if len(self.request_times) >= Config.REQUESTS_PER_MINUTE:
+                oldest_request = self.request_times[0]
+                time_since_oldest = current_time - oldest_request
+                
+                if time_since_oldest < 60:  # Less than a minute has passed
+                    sleep_time = 60 - time_since_oldest + 1  # Add 1 second buffer
+                    print(f"Rate limit approaching, waiting {sleep_time:.2f} seconds")
+                    time.sleep(sleep_time)
+                    current_time = time.time()
+            
+            # Update request times
+            self.request_times.append(current_time)
+            self.upstream_calls += 1
 
     def _make_request(self, params):
         """Make API request with rate limiting"""
         try:
+            cache_key = tuple(sorted((k, v) for k, v in params.items() if k != 'apikey'))
+            function = params.get('function')
+            data = self._cached_response(cache_key, function)
+            if data is not None:
+                metrics.inc('cache_requests_total', cache='response', result='hit')
+                return data, None
+            metrics.inc('cache_requests_total', cache='response', result='miss')
+            
             self._check_rate_limits()
             
-            print(f"Making API request: {self.base_url} with params: {params}")
-            response = requests.get(self.base_url, params=params, timeout=self.api_timeout)
+            # The API key stays out of the logs
+            print(f"Making API request: {function} {dict(cache_key)}")
+            with metrics.span('upstream_request_seconds', function=function):
+                response = requests.get(self.base_url, params=params, timeout=self.api_timeout)
             
             if response.status_code != 200:
                 print(f"HTTP Error: {response.status_code}, Response: {response.text}")
+                metrics.inc('upstream_requests_total', function=function, outcome='http_error')
                 return None, f"HTTP Error: {response.status_code}"
             
-            data = response.json()
+            with metrics.span('json_parse_seconds', source='upstream'):
+                data = response.json()
+            # Rate limit notices and API errors arrive as HTTP 200 with a message instead of data
+            failed = any(key in data for key in ("Information", "Error Message", "Note"))
+            metrics.inc('upstream_requests_total', function=function, outcome='api_error' if failed else 'ok')
             
             # Check for various API error responses
             if "Information" in data:
@@ -332,19 +375,59 @@ class DataFetcher:
             if "Note" in data:
                 print(f"API note: {data['Note']}")
                 return None, data["Note"]
-                
+            
+            self._store_response(cache_key, response.text)
             return data, None
             
         except requests.exceptions.RequestException as e:
             print(f"Network error: {str(e)}")
+            metrics.inc('upstream_requests_total', function=params.get('function'), outcome='network_error')
             return None, f"Network error: {str(e)}"
         except ValueError as e:
             print(f"Invalid response: {str(e)}")
+            metrics.inc('upstream_requests_total', function=params.get('function'), outcome='invalid_response')
             return None, f"Invalid response: {str(e)}"
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             return None, f"Unexpected error: {str(e)}"
 
+    def _cached_response(self, cache_key, function):
+        """Parsed copy of a cached response that is still fresh, or None"""
+        ttl = Config.QUOTE_CACHE_DURATION if function in self.QUOTE_FUNCTIONS else Config.RESPONSE_CACHE_DURATION
+        with self.response_cache_lock:
+            cached = self.response_cache.get(cache_key)
+            if cached is None or time.time() - cached['timestamp'] >= ttl:
+                return None
+            self.response_cache.move_to_end(cache_key)
+        
+        # Kept as text and parsed per hit, since callers add fields to the dicts they get back
+        with metrics.span('json_parse_seconds', source='cache'):
+            return json.loads(cached['text'])
+
+    def _store_response(self, cache_key, text):
+        """Remember a successful response, dropping the least recently used beyond the memory budget"""
+        # A full daily history is about half a megabyte, so the budget is in bytes rather than entries
+        size = len(text)
+        if size > Config.RESPONSE_CACHE_MAX_BYTES:
+            return
+        with self.response_cache_lock:
+            previous = self.response_cache.pop(cache_key, None)
+            if previous:
+                self.response_cache_bytes -= previous['size']
+            self.response_cache[cache_key] = {'timestamp': time.time(), 'text': text, 'size': size}
+            self.response_cache_bytes += size
+            while self.response_cache_bytes > Config.RESPONSE_CACHE_MAX_BYTES:
+                _, evicted = self.response_cache.popitem(last=False)
+                self.response_cache_bytes -= evicted['size']
+
+    def clear_caches(self):
+        """Forget every cached response and compiled dataset"""
+        with self.response_cache_lock:
+            self.response_cache.clear()
+            self.response_cache_bytes = 0
+        with self.dataset_cache_lock:
+            self.dataset_cache.clear()
+
     def _generate_mock_technical_indicator(self, params):
         """Generate mock technical indicator data based on function type"""
         function = params.get('function', '').lower()
@@ -499,6 +582,7 @@ class DataFetcher:
             return None, "No time series data found"
             
         try:
+            started = time.perf_counter()
             df = pd.DataFrame(time_series).T
             
             # Rename columns for consistency
@@ -545,13 +629,16 @@ class DataFetcher:
             
             # Sort from oldest to newest
             df = df.sort_index()
+            metrics.observe('stage_seconds', time.perf_counter() - started, stage='parse_time_series')
             
             # Calculate additional metrics
-            self._add_technical_indicators(df)
+            with metrics.span('stage_seconds', stage='indicators'):
+                self._add_technical_indicators(df)
             
             # Enhance with additional Alpha Vantage technical indicators if possible
             try:
-                df = self.enhance_technical_indicators(ticker, df)
+                with metrics.span('stage_seconds', stage='api_indicators'):
+                    df = self.enhance_technical_indicators(ticker, df)
             except Exception as e:
                 print(f"Warning: Could not enhance time series with API indicators: {e}")
             
@@ -559,6 +646,37 @@ class DataFetcher:
         except Exception as e:
             return None, f"Error processing time series data: {str(e)}"
 
+    def fetch_price_history(self, ticker):
+        """Daily OHLCV history without indicators, reusing a compiled dataset or cached response if available"""
+        dataset = self._cached_dataset(ticker)
+        if dataset is not None:
+            return dataset['time_series'][['open', 'high', 'low', 'close', 'volume']], None
+        
+        # Same request as fetch_time_series_data, so either one can reuse the other's response
+        params = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": ticker,
+            "outputsize": "full",
+            "apikey": self.api_key
+        }
+        
+        data, error = self._make_request(params)
+        if error:
+            return None, error
+        
+        time_series = data.get("Time Series (Daily)")
+        if not time_series:
+            return None, "No time series data found"
+        
+        try:
+            dates = sorted(time_series)
+            fields = ('1. open', '2. high', '3. low', '4. close', '5. volume')
+            values = np.array([[float(time_series[date][field]) for field in fields] for date in dates])
+            df = pd.DataFrame(values, index=pd.to_datetime(dates), columns=['open', 'high', 'low', 'close', 'volume'])
+            return df, None
+        except Exception as e:
+            return None, f"Error processing time series data: {str(e)}"
+
     def _add_technical_indicators(self, df):
         """Add technical indicators to the dataframe"""
         try:
@@ -970,6 +1088,86 @@ class DataFetcher:
             
         return data["Global Quote"], None
 
+    def fetch_bulk_quotes(self, symbols):
+        """Fetch realtime quotes for many symbols, up to BULK_QUOTE_CHUNK per request"""
+        quotes = {}
+        errors = {}
+        for start in range(0, len(symbols), Config.BULK_QUOTE_CHUNK):
+            chunk = symbols[start:start + Config.BULK_QUOTE_CHUNK]
+            params = {
+                "function": "REALTIME_BULK_QUOTES",
+                "symbol": ",".join(chunk),
+                "apikey": self.api_key
+            }
+            
+            data, error = self._make_request(params)
+            if not error and not data.get("data"):
+                error = data.get("message", "No bulk quote data found")
+            if error:
+                print(f"Bulk quotes failed for {len(chunk)} symbols: {error}")
+                errors.update({symbol: error for symbol in chunk})
+                continue
+            
+            for quote in data["data"]:
+                if quote.get("symbol") in chunk:
+                    quotes[quote["symbol"]] = quote
+        
+        # Symbols the bulk endpoint did not cover fall back to one quote request each
+        for symbol in symbols:
+            if symbol in quotes:
+                errors.pop(symbol, None)
+                continue
+            quote, error = self.fetch_global_quote(symbol)
+            if error:
+                errors[symbol] = error
+                continue
+            errors.pop(symbol, None)
+            quotes[symbol] = {
+                "symbol": symbol,
+                "close": quote.get("05. price"),
+                "volume": quote.get("06. volume"),
+                "previous_close": quote.get("08. previous close"),
+                "change": quote.get("09. change"),
+                "change_percent": quote.get("10. change percent", "").rstrip("%")
+            }
+        
+        return quotes, errors
+
+    def fetch_listing_status(self):
+        """Fetch the active US listings as CSV text, for the symbol directory"""
+        text, error = self.fetch_raw({"function": "LISTING_STATUS"})
+        if error:
+            return None, error
+        # Errors and rate limit notices still come back as JSON
+        if not text.startswith("symbol,"):
+            print(f"Unexpected listing response: {text[:200]}")
+            return None, "Listing status not available"
+        return text, None
+
+    def fetch_raw(self, params):
+        """Fetch a response body as text, rate limited but neither parsed nor cached, returning (text, error)"""
+        # For large or bulk downloads (listings, universe ingestion) that would only churn the response cache;
+        # API errors inside a 200 response are left to the caller
+        function = params.get("function")
+        try:
+            self._check_rate_limits()
+            print(f"Making API request: {function} {params.get('symbol', '')}".rstrip())
+            with metrics.span('upstream_request_seconds', function=function):
+                response = requests.get(self.base_url, params=dict(params, apikey=self.api_key), timeout=self.api_timeout)
+
+            if response.status_code != 200:
+                print(f"HTTP Error: {response.status_code}, Response: {response.text[:200]}")
+                metrics.inc('upstream_requests_total', function=function, outcome='http_error')
+                return None, f"HTTP Error: {response.status_code}"
+
+            metrics.inc('upstream_requests_total', function=function, outcome='ok')
+            return response.text, None
+
+        except requests.exceptions.RequestException as e:
+            print(f"Network error: {str(e)}")
+            metrics.inc('upstream_requests_total', function=function, outcome='network_error')
+            return None, f"Network error: {str(e)}"
+
     def fetch_supplementary_data(self, ticker):
         """Fetch additional supplementary data for a stock."""
         try:
@@ -1063,8 +1261,67 @@ class DataFetcher:
 
     def compile_complete_dataset(self, ticker):
         """Fetch all data for a ticker and compile into a complete dataset"""
+        # Serve from cache while the compiled dataset is still fresh
+        dataset = self._cached_dataset(ticker)
+        if dataset is not None:
+            print(f"Using cached dataset for {ticker}")
+            metrics.inc('cache_requests_total', cache='dataset', result='hit')
+            return dataset, None
+        
+        # Every user watching or analyzing a ticker that is already being compiled waits for that one result
+        with self.inflight_lock:
+            # A compile may have finished since the check above
+            dataset = self._cached_dataset(ticker)
+            if dataset is not None:
+                metrics.inc('cache_requests_total', cache='dataset', result='hit')
+                return dataset, None
+            flight = self.inflight.get(ticker)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[ticker] = {'done': threading.Event(), 'result': (None, "Error compiling dataset")}
+        if not leader:
+            metrics.inc('cache_requests_total', cache='dataset', result='shared')
+            flight['done'].wait()
+            return flight['result']
+        
+        metrics.inc('cache_requests_total', cache='dataset', result='miss')
+        try:
+            flight['result'] = self._compile_dataset(ticker)
+        finally:
+            with self.inflight_lock:
+                del self.inflight[ticker]
+            flight['done'].set()
+        return flight['result']
+    
+    def _cached_dataset(self, ticker):
+        """The ticker's compiled dataset if it is still fresh, else None"""
+        with self.dataset_cache_lock:
+            cached = self.dataset_cache.get(ticker)
+            if cached is None:
+                return None
+            if time.time() - cached['timestamp'] >= self.cache_duration:
+                del self.dataset_cache[ticker]
+                return None
+            self.dataset_cache.move_to_end(ticker)
+            return cached['dataset']
+    
+    def _store_dataset(self, ticker, dataset):
+        """Cache a compiled dataset, dropping expired ones and the least recently used beyond the size limit"""
+        now = time.time()
+        with self.dataset_cache_lock:
+            self.dataset_cache[ticker] = {'timestamp': now, 'dataset': dataset}
+            self.dataset_cache.move_to_end(ticker)
+            expired = [key for key, cached in self.dataset_cache.items() if now - cached['timestamp'] >= self.cache_duration]
+            for key in expired:
+                del self.dataset_cache[key]
+            while len(self.dataset_cache) > Config.DATASET_CACHE_MAX_ENTRIES:
+                self.dataset_cache.popitem(last=False)
+    
+    def _compile_dataset(self, ticker):
+        """Fetch and compile a ticker's dataset, caching it when it has price history"""
         try:
             print(f"Compiling complete dataset for {ticker}...")
+            started = time.perf_counter()
             
             # Get time series data
             time_series_data, error = self.fetch_time_series_data(ticker)
@@ -1127,6 +1384,11 @@ class DataFetcher:
             # Calculate additional metrics if we have the necessary data
             self._add_calculated_metrics(dataset)
             
+            # Only cache datasets that have price history, so failed fetches are retried
+            if isinstance(time_series_data, pd.DataFrame) and not time_series_data.empty:
+                self._store_dataset(ticker, dataset)
+            
+            metrics.observe('stage_seconds', time.perf_counter() - started, stage='compile_dataset')
             return dataset, None
             
         except Exception as e:
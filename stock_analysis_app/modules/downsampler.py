@@ -0,0 +1,125 @@
+import pandas as pd
+import numpy as np
+from config import Config
+
+class Downsampler:
+    """Reduce long price histories to a fixed point budget before charting.
+
+    Recent bars stay at full resolution. Older history is bucketed: one
+    LTTB-selected day per bucket, chosen on the close, supplies the date,
+    the close and every line column, so series drawn together (close and
+    its moving averages, the MACD lines, the bands) stay on the same day.
+    The candle around it spans the whole bucket, and volume and its average
+    become mean daily values.
+    """
+
+    # Selection is driven by the close, or by the first line column when there is none
+    DRIVER_COLUMN = 'close'
+    # Averaged rather than summed, so old buckets stay on the daily scale of the recent bars and the average line
+    MEAN_COLUMNS = ('volume', 'avg_volume')
+    # Recomputed from the bucket means as numerator / denominator
+    RATIO_COLUMNS = {'relative_volume': ('volume', 'avg_volume')}
+
+    def __init__(self, max_points=None, full_resolution_bars=None):
+        self.max_points = max_points or Config.CHART_MAX_POINTS
+        self.full_resolution_bars = full_resolution_bars or Config.CHART_FULL_RESOLUTION_BARS
+
+    def downsample(self, df):
+        """Return a copy of df reduced to at most max_points rows"""
+        if not isinstance(df, pd.DataFrame) or len(df) <= self.max_points:
+            return df
+
+        # Keep the recent window untouched, but always leave room for a few history buckets
+        recent_bars = max(0, min(self.full_resolution_bars, self.max_points - 3))
+        n_buckets = self.max_points - recent_bars
+
+        history = df.iloc[:len(df) - recent_bars]
+        recent = df.iloc[len(df) - recent_bars:]
+
+        if len(history) <= n_buckets:
+            return df
+
+        edges = np.linspace(0, len(history), n_buckets + 1).astype(int)
+        starts = edges[:-1]
+        ends = edges[1:]
+
+        numeric = history.select_dtypes(include='number')
+        bucketed = {}
+
+        # Candlestick range: first open, highest high and lowest low of the bucket; the close is the selected day's
+        if 'open' in numeric.columns:
+            bucketed['open'] = numeric['open'].to_numpy()[starts]
+        if 'high' in numeric.columns:
+            bucketed['high'] = np.fmax.reduceat(numeric['high'].to_numpy(), starts)
+        if 'low' in numeric.columns:
+            bucketed['low'] = np.fmin.reduceat(numeric['low'].to_numpy(), starts)
+
+        # Volume columns: mean daily value per bucket, ignoring missing days
+        for col in self.MEAN_COLUMNS:
+            if col in numeric.columns:
+                values = numeric[col].to_numpy(dtype=float)
+                valid = ~np.isnan(values)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    bucketed[col] = (np.add.reduceat(np.where(valid, values, 0.0), starts) /
+                                     np.add.reduceat(valid.astype(float), starts))
+        for col, (numerator, denominator) in self.RATIO_COLUMNS.items():
+            if col in numeric.columns and numerator in bucketed and denominator in bucketed:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    bucketed[col] = bucketed[numerator] / bucketed[denominator]
+
+        # Close and line columns: every one taken from the same selected day of each bucket
+        line_columns = [col for col in numeric.columns if col not in bucketed]
+        if line_columns:
+            driver = self.DRIVER_COLUMN if self.DRIVER_COLUMN in line_columns else line_columns[0]
+            selected = self._lttb_indices(numeric[driver].to_numpy(dtype=float), edges)
+        else:
+            selected = ends - 1
+        for col in line_columns:
+            bucketed[col] = numeric[col].to_numpy()[selected]
+
+        # Each bucket is stamped with its selected day, the day its close and line values come from
+        downsampled = pd.DataFrame(bucketed, index=history.index[selected])
+        downsampled = downsampled.reindex(columns=df.columns)
+        downsampled.index.name = df.index.name
+
+        return pd.concat([downsampled, recent])
+
+    def _lttb_indices(self, values, edges):
+        """Pick one row per bucket of a series using Largest-Triangle-Three-Buckets"""
+        n_rows = len(values)
+        n_buckets = len(edges) - 1
+        starts = edges[:-1]
+        counts = np.diff(edges).astype(float)
+        positions = np.arange(n_rows, dtype=float)
+        valid = ~np.isnan(values)
+
+        # Average point of every bucket, ignoring missing values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_x = np.add.reduceat(positions, starts) / counts
+            avg_y = (np.add.reduceat(np.where(valid, values, 0.0), starts) /
+                     np.add.reduceat(valid.astype(float), starts))
+
+        selected = np.empty(n_buckets, dtype=np.intp)
+        selected[0] = 0
+        selected[-1] = n_rows - 1
+
+        previous = 0
+        for i in range(1, n_buckets - 1):
+            lo, hi = edges[i], edges[i + 1]
+
+            # Triangle between the previously selected point, each candidate and the next bucket average
+            ax = positions[previous]
+            ay = values[previous]
+            bx = positions[lo:hi]
+            by = values[lo:hi]
+            cx = avg_x[i + 1]
+            cy = avg_y[i + 1]
+
+            with np.errstate(invalid='ignore'):
+                area = np.abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+            area = np.where(np.isnan(area), -1.0, area)
+
+            previous = lo + int(area.argmax())
+            selected[i] = previous
+
+        return selected
@@ -0,0 +1,237 @@
+import plotly.graph_objects as go
+import pandas as pd
+import numpy as np
+
+class FigureBuilder:
+    """Build chart figures as plain dicts straight from NumPy arrays.
+
+    Plotly validates every property of every trace it is given, which is a
+    large part of chart time for long histories. Traces here are assembled
+    directly, and each chart's static layout is built once through the
+    Visualizer and reused as a template.
+    """
+
+    def __init__(self, visualizer):
+        self.visualizer = visualizer
+        self.colors = visualizer.colors
+        self.layouts = {}
+
+    def create_price_chart(self, df):
+        """Price history with candlesticks and volume, as a figure dict"""
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return None
+
+        x = df.index.to_numpy()
+        has_ma = 'MA20' in df.columns and 'MA50' in df.columns
+
+        data = [self._trace('candlestick', '',
+            x=x,
+            open=df['open'].to_numpy(),
+            high=df['high'].to_numpy(),
+            low=df['low'].to_numpy(),
+            close=df['close'].to_numpy(),
+            name='Price',
+            increasing={'line': {'color': self.colors['success']}},
+            decreasing={'line': {'color': self.colors['danger']}}
+        )]
+
+        if has_ma:
+            data.append(self._line(x, df['MA20'], '20-day MA', '', color='rgba(66, 133, 244, 0.7)', width=1))
+            data.append(self._line(x, df['MA50'], '50-day MA', '', color='rgba(219, 68, 55, 0.7)', width=1))
+
+        if 'upper_band' in df.columns and 'lower_band' in df.columns:
+            band = dict(color='rgba(173, 216, 230, 0.7)', width=1, dash='dash')
+            data.append(self._line(x, df['upper_band'], 'Upper BB', '', showlegend=True, **band))
+            data.append(self._line(x, df['lower_band'], 'Lower BB', '', showlegend=True, fill='tonexty',
+                                   fillcolor='rgba(173, 216, 230, 0.1)', **band))
+
+        data.append(self._trace('bar', '2',
+            x=x,
+            y=df['volume'].to_numpy(),
+            name='Volume',
+            marker={'color': np.where(df['close'] >= df['open'], 'green', 'red'), 'line': {'width': 0}},
+            opacity=0.7
+        ))
+
+        if 'avg_volume' in df.columns:
+            data.append(self._line(x, df['avg_volume'], 'Avg Volume', '2', color='black', width=1))
+
+        # Only the annotation and timeframe buttons depend on the data, and both are small
+        layout = self._layout(('price',), self.visualizer._price_chart_layout)
+        dynamic = go.Layout(
+            annotations=[self.visualizer._price_annotation(df, has_ma)],
+            updatemenus=self.visualizer._price_chart_menus(df)
+        ).to_plotly_json()
+        layout['annotations'] = list(layout.get('annotations', [])) + dynamic['annotations']
+        layout['updatemenus'] = dynamic['updatemenus']
+
+        return {'data': data, 'layout': layout}
+
+    def create_technical_chart(self, df):
+        """Technical indicators chart, as a figure dict"""
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return None
+
+        x = df.index.to_numpy()
+        oscillator, trend = self.visualizer._technical_variant(df)
+        has_volume = 'volume' in df.columns
+
+        data = [self._line(x, df['close'], 'Price', '', color=self.colors['primary'], width=1.5)]
+
+        if 'MA20' in df.columns:
+            data.append(self._line(x, df['MA20'], '20-day MA', '', color=self.colors['success'], width=1))
+        if 'MA50' in df.columns:
+            data.append(self._line(x, df['MA50'], '50-day MA', '', color=self.colors['warning'], width=1))
+        if 'MA200' in df.columns:
+            data.append(self._line(x, df['MA200'], '200-day MA', '', color=self.colors['danger'], width=1))
+
+        if 'upper_band' in df.columns and 'lower_band' in df.columns:
+            band = dict(color='rgba(173, 216, 230, 0.7)', width=1, dash='dash')
+            data.append(self._line(x, df['upper_band'], 'Upper BB', '', **band))
+            data.append(self._line(x, df['lower_band'], 'Lower BB', '', fill='tonexty', **band))
+
+        if oscillator == 'stochrsi':
+            data.append(self._line(x, df['fastk'], 'FastK', '2', color=self.colors['primary']))
+            data.append(self._line(x, df['fastd'], 'FastD', '2', color=self.colors['danger']))
+        elif oscillator == 'rsi':
+            data.append(self._line(x, df['RSI'], 'RSI', '2', color=self.colors['primary']))
+
+        if trend == 'macd':
+            data.append(self._line(x, df['MACD'], 'MACD', '3', color=self.colors['primary']))
+            data.append(self._line(x, df['MACD_signal'], 'Signal', '3', color=self.colors['danger']))
+            data.append(self._trace('bar', '3',
+                x=x,
+                y=df['MACD_hist'].to_numpy(),
+                name='Histogram',
+                marker={'color': np.where(df['MACD_hist'].fillna(0) >= 0, 'green', 'red')}
+            ))
+        elif trend == 'apo':
+            data.append(self._line(x, df['apo'], 'APO', '3', color=self.colors['primary']))
+
+        if has_volume:
+            data.append(self._trace('bar', '4',
+                x=x,
+                y=df['volume'].to_numpy(),
+                name='Volume',
+                marker={'color': self.visualizer._up_day_colors(df['close'].to_numpy())},
+                opacity=0.7
+            ))
+            if 'avg_volume' in df.columns:
+                data.append(self._line(x, df['avg_volume'], 'Avg Volume', '4', color='black', width=1))
+
+        layout = self._layout(('technical', oscillator, trend, has_volume),
+                              self.visualizer._technical_chart_layout, oscillator, trend, has_volume)
+        y_min, y_max = self.visualizer._technical_price_range(df)
+        layout['yaxis'] = dict(layout.get('yaxis', {}), range=[float(y_min), float(y_max)])
+
+        return {'data': data, 'layout': layout}
+
+    def create_volume_chart(self, df):
+        """Volume analysis chart, as a figure dict"""
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return None
+
+        x = df.index.to_numpy()
+        if 'avg_volume' in df.columns and 'relative_volume' in df.columns:
+            avg_volume = df['avg_volume']
+            relative_volume = df['relative_volume']
+        else:
+            avg_volume = df['volume'].rolling(window=20).mean()
+            relative_volume = df['volume'] / avg_volume
+
+        data = [
+            self._trace('bar', '',
+                x=x,
+                y=df['volume'].to_numpy(),
+                name='Volume',
+                marker={'color': np.where(df['close'] < df['open'], 'red', 'green')}
+            ),
+            self._line(x, avg_volume, '20-day Average', '', color=self.colors['primary']),
+            self._trace('bar', '2',
+                x=x,
+                y=relative_volume.to_numpy(),
+                name='Relative Volume',
+                marker={'color': self.colors['info']}
+            )
+        ]
+
+        layout = self._layout(('volume',), self.visualizer._volume_chart_layout)
+        return {'data': data, 'layout': layout}
+
+    def create_summary_chart(self, data):
+        """Summary dashboard, as a figure dict"""
+        if not data or not isinstance(data, dict):
+            return None
+
+        df = data.get('price_data')
+        if not isinstance(df, pd.DataFrame):
+            df = None
+        has_performance = df is not None and len(df) > 20
+
+        traces = []
+        if df is not None:
+            x = df.index.to_numpy()
+            traces.append(self._trace('candlestick', '',
+                x=x,
+                open=df['open'].to_numpy(),
+                high=df['high'].to_numpy(),
+                low=df['low'].to_numpy(),
+                close=df['close'].to_numpy(),
+                name='Price'
+            ))
+            traces.append(self._trace('bar', '2',
+                x=x,
+                y=df['volume'].to_numpy(),
+                name='Volume',
+                marker={'color': np.where(df['close'] >= df['open'], 'green', 'red')}
+            ))
+
+            if has_performance:
+                recent_df = df.iloc[-30:]
+                traces.append(self._line(recent_df.index.to_numpy(),
+                                         self.visualizer._cumulative_performance(recent_df),
+                                         '30-Day Performance', '3', color=self.colors['primary'], width=2))
+
+        if 'financial_data' in data and isinstance(data['financial_data'], dict):
+            metrics = self.visualizer._summary_metrics(data['financial_data'])
+            traces.append(self._trace('bar', '4',
+                x=list(metrics.keys()),
+                y=list(metrics.values()),
+                name='Financial Metrics',
+                marker={'color': self.colors['info']}
+            ))
+
+        layout = self._layout(('summary', has_performance),
+                              self.visualizer._summary_chart_layout, has_performance)
+        return {'data': traces, 'layout': layout}
+
+    def create_financial_chart(self, financial_data):
+        """Financial metrics chart, small enough to keep going through Plotly"""
+        return self.visualizer.create_financial_chart(financial_data)
+
+    def _layout(self, key, factory, *args):
+        """Copy of the static layout for a chart variant, built through Plotly on first use"""
+        layout = self.layouts.get(key)
+        if layout is None:
+            layout = factory(*args).to_plotly_json()['layout']
+            self.layouts[key] = layout
+
+        # Callers replace top-level entries but never change the nested template values
+        return dict(layout)
+
+    @staticmethod
+    def _trace(trace_type, axis, **props):
+        """Trace dict placed on the subplot whose axis names end with the given suffix"""
+        props.update(type=trace_type, xaxis='x' + axis, yaxis='y' + axis)
+        return props
+
+    def _line(self, x, y, name, axis, fill=None, fillcolor=None, showlegend=None, **line):
+        """Scatter line trace"""
+        trace = self._trace('scatter', axis, x=x, y=np.asarray(y), name=name, line=line)
+        if fill:
+            trace['fill'] = fill
+        if fillcolor:
+            trace['fillcolor'] = fillcolor
+        if showlegend is not None:
+            trace['showlegend'] = showlegend
+        return trace
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Screener fields parsed from the company overview, as column -> OVERVIEW key
+OVERVIEW_TEXT = {
+    'name': 'Name',
+    'exchange': 'Exchange',
+    'sector': 'Sector',
+    'industry': 'Industry'
+}
+
+OVERVIEW_NUMBERS = {
+    'market_cap': 'MarketCapitalization',
+    'pe_ratio': 'PERatio',
+    'forward_pe': 'ForwardPE',
+    'peg_ratio': 'PEGRatio',
+    'price_to_book': 'PriceToBookRatio',
+    'price_to_sales': 'PriceToSalesRatioTTM',
+    'eps': 'EPS',
+    'dividend_yield': 'DividendYield',
+    'beta': 'Beta',
+    'profit_margin': 'ProfitMargin',
+    'operating_margin': 'OperatingMarginTTM',
+    'return_on_equity': 'ReturnOnEquityTTM',
+    'revenue_growth': 'QuarterlyRevenueGrowthYOY',
+    'earnings_growth': 'QuarterlyEarningsGrowthYOY'
+}
+
+# Screener fields computed from the daily price history
+PRICE_NUMBERS = ('price', 'change_percent', 'volume', 'avg_volume', 'relative_volume', 'rsi',
+                 'ma50', 'ma200', 'return_1m', 'return_3m', 'return_1y', 'high_52w', 'low_52w')
+
+TEXT_FIELDS = tuple(OVERVIEW_TEXT)
+NUMERIC_FIELDS = tuple(OVERVIEW_NUMBERS) + PRICE_NUMBERS
+
+def _number(value):
+    """Float from an API value, or None for the "None", "-" and empty placeholders"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if np.isfinite(number) else None
+
+def parse_overview(overview):
+    """Screener columns from an OVERVIEW response (raw or as returned by fetch_company_overview)"""
+    row = {}
+    for column, key in OVERVIEW_TEXT.items():
+        value = overview.get(key)
+        row[column] = value if value and value not in ('None', '-') else None
+    for column, key in OVERVIEW_NUMBERS.items():
+        row[column] = _number(overview.get(key))
+    return row
+
+def price_metrics(df):
+    """Screener columns from a daily price history (DataFrame or dict of arrays), oldest bar first"""
+    close = np.asarray(df['close'], dtype=float)[-260:]
+    high = np.asarray(df['high'], dtype=float)[-252:]
+    low = np.asarray(df['low'], dtype=float)[-252:]
+    volume = np.asarray(df['volume'], dtype=float)[-20:]
+    if not len(close):
+        return {}
+
+    def trailing_return(periods):
+        return (close[-1] / close[-1 - periods] - 1) * 100 if len(close) > periods else None
+
+    def average(periods):
+        return close[-periods:].mean() if len(close) >= periods else None
+
+    # 14 bar simple-average RSI, the formula the indicators and batch analysis use
+    rsi = None
+    if len(close) > 14:
+        delta = np.diff(close[-15:])
+        gain = delta[delta > 0].sum() / 14
+        loss = -delta[delta < 0].sum() / 14
+        rsi = 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+
+    avg_volume = volume.mean() if len(volume) else None
+    metrics = {
+        'price': close[-1],
+        'change_percent': trailing_return(1),
+        'volume': volume[-1] if len(volume) else None,
+        'avg_volume': avg_volume,
+        'relative_volume': volume[-1] / avg_volume if avg_volume else None,
+        'rsi': rsi,
+        'ma50': average(50),
+        'ma200': average(200),
+        'return_1m': trailing_return(21),
+        'return_3m': trailing_return(63),
+        'return_1y': trailing_return(252),
+        'high_52w': high.max() if len(high) else None,
+        'low_52w': low.min() if len(low) else None
+    }
+    return {name: _number(value) for name, value in metrics.items()}
@@ -0,0 +1,175 @@
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from config import Config
+from modules.fundamentals import parse_overview, price_metrics
+
+# API functions ingested for every symbol, with their extra request parameters
+FUNCTIONS = {
+    'OVERVIEW': {},
+    # compact holds only 100 bars, too few for the 200 day average and 1 year return
+    'TIME_SERIES_DAILY': {'outputsize': 'full'}
+}
+
+PRICE_KEYS = {'high': '2. high', 'low': '3. low', 'close': '4. close', 'volume': '5. volume'}
+
+def api_message(text):
+    """The Information, Note or Error Message a response carries instead of data, or None"""
+    # Messages are short, so large data responses are never parsed just to check
+    if not text or len(text) > 2048:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        for key in ('Information', 'Note', 'Error Message'):
+            if key in data:
+                return str(data[key])
+    return None
+
+def is_rate_limited(message):
+    """Whether an API message is a rate limit notice rather than an error for this request"""
+    message = message.lower()
+    return 'frequency' in message or 'rate limit' in message
+
+def parse_response(function, text):
+    """Fundamentals columns from one raw response, returning (columns, error); runs in a pool process"""
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        return None, f'Invalid response: {str(e)}'
+    if not isinstance(data, dict):
+        return None, 'Invalid response'
+    for key in ('Information', 'Note', 'Error Message'):
+        if key in data:
+            return None, str(data[key])
+
+    if function == 'OVERVIEW':
+        if not data.get('Symbol'):
+            return None, 'No overview data'
+        return parse_overview(data), None
+
+    series = data.get('Time Series (Daily)')
+    if not series:
+        return None, 'No time series data'
+    dates = sorted(series)[-260:]
+    try:
+        columns = {name: np.array([float(series[date][key]) for date in dates]) for name, key in PRICE_KEYS.items()}
+    except (KeyError, TypeError, ValueError) as e:
+        return None, f'Malformed time series: {str(e)}'
+    return price_metrics(columns), None
+
+class Ingestion:
+    """Fetch and parse (symbol, function) items for the fundamentals table.
+
+    Fetch threads share the DataFetcher's per-minute budget, so the network
+    side runs at the API limit and no faster. Responses are parsed on a
+    process pool and handed to save() in batches, which stores them with
+    their checkpoints in one transaction. Items still in flight when a run
+    is interrupted have no checkpoint and are fetched again next run.
+    """
+
+    def __init__(self, fetch, save, parse_workers=None, fetch_workers=None, batch_size=None):
+        self.fetch = fetch  # params -> (text, error)
+        self.save = save  # [(symbol, function, columns, error)] -> None
+        self.parse_workers = parse_workers if parse_workers is not None else Config.INGEST_PARSE_WORKERS
+        self.fetch_workers = fetch_workers or Config.INGEST_FETCH_WORKERS
+        self.batch_size = batch_size or Config.INGEST_BATCH_SIZE
+        self.stop = threading.Event()
+        # Fetched but unsaved items, so an interrupted run discards at most this many requests
+        self.slots = threading.Semaphore(self.fetch_workers + 2 * max(self.parse_workers, 1))
+
+    def run(self, items):
+        """Fetch, parse and save every item, returning counts of stored, failed and pending items"""
+        todo = queue.Queue()
+        for item in items:
+            todo.put(item)
+        results = queue.Queue()
+        # spawn rather than fork: the parent holds database connections and threads
+        pool = None
+        if self.parse_workers:
+            pool = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'))
+        threads = [threading.Thread(target=self._fetch_loop, args=(todo, results, pool), name=f'ingest-fetch-{i}', daemon=True)
+                   for i in range(min(self.fetch_workers, len(items)))]
+        for thread in threads:
+            thread.start()
+
+        counts = {'stored': 0, 'failed': 0}
+        batch = []
+        started = time.time()
+        try:
+            while counts['stored'] + counts['failed'] < len(items):
+                try:
+                    symbol, function, outcome = results.get(timeout=1)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads) and results.empty():
+                        break
+                    continue
+                try:
+                    columns, error = outcome.result()
+                except Exception as e:
+                    columns, error = None, f'Parse failed: {str(e)}'
+                self.slots.release()
+                if error:
+                    print(f"{symbol} {function}: {error}")
+                counts['failed' if error else 'stored'] += 1
+                batch.append((symbol, function, columns, error))
+                if len(batch) >= self.batch_size:
+                    self.save(batch)
+                    batch = []
+                    self._report(counts, len(items), started)
+        except KeyboardInterrupt:
+            print("Interrupted; saving finished items, the rest resume on the next run")
+        finally:
+            self.stop.set()
+            if batch:
+                self.save(batch)
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._report(counts, len(items), started)
+        counts['pending'] = len(items) - counts['stored'] - counts['failed']
+        return counts
+
+    def _fetch_loop(self, todo, results, pool):
+        """Fetch queued items until none are left, passing each response on for parsing"""
+        while not self.stop.is_set():
+            if not self.slots.acquire(timeout=1):
+                continue
+            try:
+                symbol, function = todo.get_nowait()
+            except queue.Empty:
+                return
+            params = dict(FUNCTIONS[function], function=function, symbol=symbol)
+            text, error = self.fetch(params)
+            message = api_message(text)
+            # Another client sharing the key used up the budget; wait it out and ask again
+            while message and is_rate_limited(message):
+                print(f"Rate limited by the API, pausing {Config.INGEST_RATE_LIMIT_PAUSE} seconds")
+                if self.stop.wait(Config.INGEST_RATE_LIMIT_PAUSE):
+                    return
+                text, error = self.fetch(params)
+                message = api_message(text)
+            if self.stop.is_set():
+                return
+
+            if error:
+                outcome = Future()
+                outcome.set_result((None, error))
+            elif pool is not None:
+                outcome = pool.submit(parse_response, function, text)
+            else:
+                outcome = Future()
+                outcome.set_result(parse_response(function, text))
+            results.put((symbol, function, outcome))
+
+    def _report(self, counts, total, started):
+        done = counts['stored'] + counts['failed']
+        minutes = (time.time() - started) / 60
+        rate = done / minutes if minutes else 0
+        remaining = f", about {(total - done) / rate:.0f} min left" if rate and done < total else ''
+        print(f"Ingested {done}/{total} items ({counts['failed']} failed), {rate:.0f}/min{remaining}")
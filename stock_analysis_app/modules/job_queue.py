@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from modules import metrics
+
+class JobQueue:
+    """Run analysis jobs on a bounded worker pool, merging duplicate jobs for the same key.
+
+    Jobs run in the process that accepted them. When a store is set, every
+    state change is also written there, so a status request that reaches
+    another worker process can still report the job and its result.
+    """
+
+    FINISHED = ('done', 'failed')
+
+    def __init__(self, max_workers=None, max_pending=None, retention=None):
+        self.max_pending = max_pending or Config.ANALYSIS_QUEUE_LIMIT
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or Config.ANALYSIS_WORKERS,
+                                           thread_name_prefix='analysis')
+        self.retention = retention or Config.JOB_RETENTION
+        self.jobs = {}
+        self.active = {}
+        self.store = None  # Shared job state: save(job), load(job_id) and prune(cutoff)
+        self.store_pruned_at = 0
+        self.condition = threading.Condition()
+        metrics.gauge('jobs_active', lambda: len(self.active))
+
+    def submit(self, key, func):
+        """Queue func(progress) under key and return the job, or None if the queue is full.
+
+        A job with the same key that is still queued or running is returned instead of a new one.
+        """
+        with self.condition:
+            cutoff = self._prune()
+
+            job_id = self.active.get(key)
+            if job_id:
+                print(f"Joining in-flight job {job_id} for {key}")
+                return self._snapshot(self.jobs[job_id])
+
+            if len(self.active) >= self.max_pending:
+                print(f"Job queue full ({len(self.active)} jobs), rejecting {key}")
+                return None
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'key': key,
+                'status': 'queued',
+                'stage': 'Waiting for a free worker',
+                'result': None,
+                'error': None,
+                'created': time.time(),
+                'finished': None
+            }
+            self.jobs[job['id']] = job
+            self.active[key] = job['id']
+            snapshot = self._snapshot(job)
+
+        self._prune_store(cutoff)
+        # Saved before the worker starts, so its later updates cannot be overwritten by this one
+        self._save(job)
+        self.executor.submit(self._run, job, func)
+        return snapshot
+
+    def get(self, job_id, wait=0):
+        """Return a copy of the job, waiting up to wait seconds for it to finish; None if unknown"""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                if wait > 0:
+                    self.condition.wait_for(lambda: job['status'] in self.FINISHED, timeout=wait)
+                return self._snapshot(job)
+        return self._load(job_id, wait)
+
+    def _load(self, job_id, wait=0):
+        """A job another process is running, read from the store and polled until it finishes or wait runs out"""
+        if self.store is None:
+            return None
+        deadline = time.time() + wait
+        while True:
+            try:
+                snapshot = self.store.load(job_id)
+            except Exception as e:
+                print(f"Error loading job {job_id}: {str(e)}")
+                return None
+            if snapshot is None or snapshot['status'] in self.FINISHED or time.time() >= deadline:
+                return snapshot
+            time.sleep(min(Config.JOB_POLL_INTERVAL, max(0, deadline - time.time())))
+
+    def _run(self, job, func):
+        """Worker body: run the job and publish its result"""
+        self._update(job, status='running', stage='Starting')
+        try:
+            result = func(lambda stage: self._update(job, stage=stage))
+            self._update(job, status='done', stage='Done', result=result)
+        except Exception as e:
+            print(f"Job {job['id']} failed: {str(e)}")
+            self._update(job, status='failed', stage='Failed', error=str(e))
+
+    def _update(self, job, **changes):
+        """Apply changes to a job and wake anyone waiting on it"""
+        with self.condition:
+            job.update(changes)
+            if job['status'] in self.FINISHED:
+                job['finished'] = time.time()
+                self.active.pop(job['key'], None)
+            self.condition.notify_all()
+        # Updates come from the job's own worker thread, so they reach the store in order
+        self._save(job)
+
+    def _save(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except Exception as e:
+            print(f"Error saving job {job['id']}: {str(e)}")
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period and return the cutoff; caller holds the condition"""
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['finished'] and job['finished'] < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return cutoff
+
+    def _prune_store(self, cutoff):
+        """Delete stored jobs finished before cutoff, at most once per JOB_PRUNE_INTERVAL; called without the condition"""
+        # A database write under the condition would hold up every progress update and waiting status request
+        if self.store is None or time.time() - self.store_pruned_at < Config.JOB_PRUNE_INTERVAL:
+            return
+        self.store_pruned_at = time.time()
+        try:
+            self.store.prune(cutoff)
+        except Exception as e:
+            print(f"Error pruning stored jobs: {str(e)}")
+
+    @staticmethod
+    def _snapshot(job):
+        """Public view of a job"""
+        snapshot = {key: job[key] for key in ('id', 'status', 'stage')}
+        if job['status'] == 'done':
+            snapshot['result'] = job['result']
+        elif job['status'] == 'failed':
+            snapshot['error'] = job['error']
+        return snapshot
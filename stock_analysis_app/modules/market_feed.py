@@ -0,0 +1,106 @@
+import threading
+import time
+from config import Config
+from modules.compression import precompress
+from modules.json_encoder import dumps
+
+class MarketFeed:
+    """Poll market movers on a fixed cadence and broadcast each snapshot to all subscribers.
+
+    One background thread makes the upstream call no matter how many browsers
+    are listening. It stops once nobody has read the feed for a full interval
+    and starts again on the next read.
+    """
+
+    def __init__(self, fetch, interval=None, heartbeat=None):
+        self.fetch = fetch
+        self.interval = interval or Config.MARKET_FEED_INTERVAL
+        self.heartbeat = heartbeat or Config.MARKET_FEED_HEARTBEAT
+        self.snapshot = None
+        self.version = 0
+        self.polls = 0
+        self.subscribers = 0
+        self.last_read = 0
+        self.thread = None
+        self.condition = threading.Condition()
+
+    def latest(self, timeout=None):
+        """Return the current snapshot, waiting for the first poll if there is none yet"""
+        with self.condition:
+            self.last_read = time.time()
+            polls = self.polls
+            # A snapshot left over from before the poller went idle is out of date
+            if self._ensure_running() or self.snapshot is None:
+                self.condition.wait_for(lambda: self.polls != polls, timeout=timeout)
+            return self.snapshot
+
+    def subscribe(self):
+        """Yield every new snapshot as it is published, or None as a keep-alive heartbeat"""
+        with self.condition:
+            self.subscribers += 1
+            self._ensure_running()
+
+        seen = 0
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.version != seen, timeout=self.heartbeat)
+                    snapshot = self.snapshot if self.version != seen else None
+                    seen = self.version
+                yield snapshot
+        finally:
+            with self.condition:
+                self.subscribers -= 1
+                self.last_read = time.time()
+
+    def refresh(self):
+        """Fetch movers now and publish the result to every subscriber"""
+        data, error = self.fetch()
+        with self.condition:
+            self.polls += 1
+
+            # Keep serving the last good data when a poll fails
+            if error and self.snapshot and not self.snapshot['error']:
+                print(f"Market feed poll failed, keeping previous snapshot: {error}")
+                self.condition.notify_all()
+                return
+            updated = time.time()
+            if error:
+                body = dumps({'error': error}).encode('utf-8')
+            else:
+                body = dumps(dict(data, last_updated=updated)).encode('utf-8')
+
+            # Serialized and compressed once per poll, then shared by every request and stream
+            self.snapshot = {
+                'data': data,
+                'error': error,
+                'updated': updated,
+                'body': body,
+                'encoded': precompress(body)
+            }
+            self.version += 1
+            self.condition.notify_all()
+
+    def _ensure_running(self):
+        """Start the poller thread if it is not running; caller holds the condition"""
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        self.thread = threading.Thread(target=self._run, name='market-feed', daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        """Poll until nobody has subscribed to or read the feed for a whole interval"""
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Market feed poll error: {str(e)}")
+
+            time.sleep(self.interval)
+
+            with self.condition:
+                if self.subscribers == 0 and time.time() - self.last_read > self.interval:
+                    print("Market feed idle, stopping poller")
+                    self.thread = None
+                    return
@@ -0,0 +1,110 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Exported metric names are prefixed so they are easy to find next to other apps' metrics
+PREFIX = 'stockapp_'
+
+# Histogram bucket upper bounds in seconds, from cache lookups up to rate limiter sleeps
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Every metric the app records, with its Prometheus type and help text
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests handled, by endpoint and status code'),
+    'http_request_seconds': ('histogram', 'Time to produce a response (first byte for streams), by endpoint'),
+    'stage_seconds': ('histogram', 'Time spent in each analysis stage'),
+    'upstream_requests_total': ('counter', 'Alpha Vantage requests sent, by function and outcome'),
+    'upstream_request_seconds': ('histogram', 'Alpha Vantage response time including download, by function'),
+    'json_parse_seconds': ('histogram', 'Time parsing Alpha Vantage JSON, by source'),
+    'rate_limiter_wait_seconds': ('histogram', 'Time each upstream request waited for the rate limiter'),
+    'cache_requests_total': ('counter', 'Cache lookups, by cache and result'),
+    'unknown_symbols_total': ('counter', 'Symbols rejected by the symbol directory before any upstream call, by endpoint'),
+    'chart_cache_bytes': ('gauge', 'Bytes of serialized charts held in the chart cache'),
+    'response_cache_entries': ('gauge', 'Alpha Vantage responses held in the response cache'),
+    'response_cache_bytes': ('gauge', 'Characters of Alpha Vantage responses held in the response cache'),
+    'dataset_cache_entries': ('gauge', 'Compiled ticker datasets held in the dataset cache'),
+    'symbol_directory_entries': ('gauge', 'Listed symbols loaded in the symbol directory'),
+    'jobs_active': ('gauge', 'Analysis jobs queued or running')
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_gauges = {}
+
+def inc(name, amount=1, **labels):
+    """Add to a counter"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    """Record one histogram observation"""
+    key = (name, tuple(sorted(labels.items())))
+    index = bisect.bisect_left(BUCKETS, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0}
+        histogram['buckets'][index] += 1
+        histogram['sum'] += value
+
+@contextmanager
+def span(name, **labels):
+    """Time the enclosed block into a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def gauge(name, read):
+    """Report read() as the gauge's value, evaluated only when metrics are scraped"""
+    _gauges[name] = read
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {'buckets': list(h['buckets']), 'sum': h['sum']} for key, h in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        full_name = PREFIX + name
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} {kind}')
+
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{full_name}{_format_labels(labels)} {value}')
+
+        elif kind == 'histogram':
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram['buckets']):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {histogram["sum"]:.6f}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+
+        elif name in _gauges:
+            try:
+                lines.append(f'{full_name} {_gauges[name]()}')
+            except Exception as e:
+                print(f"Error reading gauge {name}: {str(e)}")
+
+    return '\n'.join(lines) + '\n'
+
+def _format_labels(labels):
+    """Render label pairs as {a="1",b="2"}, escaping values"""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from config import Config
+
+# Leaf frames of threads that are blocked rather than running, left out unless asked for
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socket.py', 'readinto'),
+    ('ssl.py', 'read'),
+    ('profiler.py', 'collect')
+}
+
+class SamplingProfiler:
+    """Sample every thread's Python stack on a fixed interval.
+
+    Stacks are aggregated per second in collapsed flamegraph format
+    ("thread;outer;inner count") and kept for a bounded window, so the
+    sampler can stay on and a profile of any recent period is just a merge.
+    Each second's bucket also records the time spent sampling in it.
+    """
+
+    def __init__(self, interval=None, window=None):
+        self.interval = interval or Config.PROFILER_INTERVAL
+        self.window = window or Config.PROFILER_WINDOW
+        self.buckets = deque()
+        self.labels = {}
+        self.samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the sampler thread if it is not already running"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self.thread.start()
+        print(f"Sampling profiler started ({1 / self.interval:.0f} Hz, {self.window} s window)")
+
+    def stop(self):
+        """Stop sampling; collected stacks are kept"""
+        self.stopping.set()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive() and not self.stopping.is_set()
+
+    def collect(self, seconds, include_idle=False):
+        """Wait for the given number of seconds and return the stacks sampled meanwhile, most frequent first"""
+        started = time.time()
+        time.sleep(seconds)
+        return self.stacks(since=started, include_idle=include_idle)
+
+    def stacks(self, since=0, include_idle=False):
+        """Collapsed stacks sampled since a wall-clock time, as (stack, count) pairs"""
+        merged = Counter()
+        with self.lock:
+            for second, counts, _ in self.buckets:
+                if second >= int(since):
+                    merged.update(counts)
+        return [(stack, count) for stack, count in merged.most_common()
+                if include_idle or not stack.endswith(' [idle]')]
+
+    def overhead(self):
+        """Share of wall time spent taking samples over the seconds still in the window"""
+        with self.lock:
+            if not self.buckets:
+                return 0.0
+            elapsed = max(time.time() - self.buckets[0][0], self.interval)
+            sample_time = sum(cost for _, _, cost in self.buckets)
+        return sample_time / elapsed
+
+    def _run(self):
+        """Sampler thread body"""
+        own_id = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            try:
+                self._sample(own_id)
+            except Exception as e:
+                print(f"Profiler sample error: {str(e)}")
+
+    def _sample(self, own_id):
+        """Take one sample of every other thread and add it to the current second's bucket"""
+        started = time.perf_counter()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        second = int(time.time())
+
+        stacks = []
+        for thread_id, frame in frames.items():
+            if thread_id != own_id:
+                stacks.append(self._collapse(names.get(thread_id, str(thread_id)), frame))
+
+        with self.lock:
+            if not self.buckets or self.buckets[-1][0] != second:
+                # [second, stack counts, seconds spent sampling]
+                self.buckets.append([second, Counter(), 0.0])
+                # Forget seconds that fell out of the window
+                while self.buckets and self.buckets[0][0] <= second - self.window:
+                    self.buckets.popleft()
+            self.buckets[-1][1].update(stacks)
+            self.buckets[-1][2] += time.perf_counter() - started
+            self.samples += 1
+
+    def _collapse(self, thread_name, frame):
+        """One thread's stack as "thread;outermost;...;innermost", marking blocked threads idle"""
+        code = frame.f_code
+        idle = (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+        names = []
+        while frame is not None:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        names.append(thread_name.replace(';', ':'))
+        names.reverse()
+
+        stack = ';'.join(names)
+        return stack + ' [idle]' if idle else stack
+
+    def _label(self, code):
+        """Frame label "function (dir/file.py:line)", cached per code object"""
+        label = self.labels.get(code)
+        if label is None:
+            if len(self.labels) >= Config.PROFILER_MAX_LABELS:
+                # Code compiled at run time keeps adding new objects; emptying the cache also lets them be freed
+                self.labels.clear()
+            path = code.co_filename.replace('\\', '/').split('/')
+            label = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})".replace(';', ':')
+            self.labels[code] = label
+        return label
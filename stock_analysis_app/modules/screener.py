@@ -0,0 +1,241 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import Config
+from modules.fundamentals import NUMERIC_FIELDS
+
+# Text fields stored as category codes, so filters on them are integer comparisons
+CATEGORY_FIELDS = ('exchange', 'sector', 'industry')
+
+# Order of the columns load_rows must return
+LOAD_COLUMNS = ('symbol', 'name') + CATEGORY_FIELDS + NUMERIC_FIELDS
+
+def parse_query(args):
+    """Screen request from query arguments, returning (query, error).
+
+    min_<field> and max_<field> bound numeric fields, exchange, sector and
+    industry may be repeated to allow several values, and sort, order, page
+    and per_page choose the slice of results.
+    """
+    ranges = {}
+    categories = {}
+    for key in args:
+        if key in CATEGORY_FIELDS:
+            values = [value for value in args.getlist(key) if value]
+            if values:
+                categories[key] = values
+            continue
+        bound, _, field = key.partition('_')
+        if bound not in ('min', 'max') or not field:
+            if key not in ('sort', 'order', 'page', 'per_page'):
+                return None, f'Unknown screener parameter: {key}'
+            continue
+        if field not in NUMERIC_FIELDS:
+            return None, f'Unknown screener field: {field}'
+        if args.get(key) in (None, ''):
+            continue
+        try:
+            value = float(args.get(key))
+        except ValueError:
+            return None, f'{key} must be a number'
+        low, high = ranges.get(field, (None, None))
+        ranges[field] = (value, high) if bound == 'min' else (low, value)
+
+    sort = args.get('sort') or 'market_cap'
+    if sort not in NUMERIC_FIELDS and sort != 'symbol':
+        return None, f'Cannot sort by {sort}'
+    try:
+        page = max(1, int(args.get('page', 1)))
+        per_page = min(max(1, int(args.get('per_page', Config.SCREENER_PAGE_SIZE))), Config.SCREENER_MAX_PAGE_SIZE)
+    except ValueError:
+        return None, 'page and per_page must be whole numbers'
+
+    return {
+        'ranges': ranges,
+        'categories': categories,
+        'sort': sort,
+        'descending': args.get('order', 'desc' if sort != 'symbol' else 'asc') != 'asc',
+        'page': page,
+        'per_page': per_page
+    }, None
+
+def _filter_mask(store, query):
+    """Boolean mask of the rows matching every range and category filter"""
+    mask = np.ones(len(store), dtype=bool)
+    for field, (low, high) in query['ranges'].items():
+        column = store.numbers[field]
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high
+    for field, values in query['categories'].items():
+        mask &= np.isin(store.codes[field], store.category_codes(field, values))
+    return mask
+
+def _first_matches(order, mask, total, count):
+    """The first count matching positions along order, scanning only as far as that needs"""
+    needed = min(count, total)
+    if not needed:
+        return order[:0]
+    # Matches spread evenly would be found within needed * len / total; scan twice that, widening if they bunch up
+    scan = min(len(order), max(1024, 2 * needed * len(order) // total))
+    while True:
+        head = order[:scan]
+        matches = head[mask[head]]
+        if len(matches) >= needed or scan == len(order):
+            return matches[:count]
+        scan = min(len(order), scan * 4)
+
+class FundamentalsStore:
+    """Screener data held column by column, in symbol order.
+
+    Numeric fields are float64 arrays with NaN where a value is missing, so
+    a range filter is one vectorized comparison that also drops missing
+    values. Exchange, sector and industry are integer codes into sorted
+    category lists. Every sort order is computed once per load, and the
+    matches of recent filters are kept in sort order for paging.
+    """
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) if rows else [()] * len(LOAD_COLUMNS)
+        data = dict(zip(LOAD_COLUMNS, columns))
+        self.symbols = np.array(data['symbol'], dtype=object)
+        self.names = np.array(data['name'], dtype=object)
+        self.numbers = {field: np.array(data[field], dtype=float) for field in NUMERIC_FIELDS}
+
+        self.categories = {}
+        self.codes = {}
+        for field in CATEGORY_FIELDS:
+            values = [value or '' for value in data[field]]
+            categories = sorted(set(values))
+            positions = {value: code for code, value in enumerate(categories)}
+            self.categories[field] = categories
+            self.codes[field] = np.array([positions[value] for value in values], dtype=np.int32)
+
+        # (ascending, descending) positions per sort field; missing values sort last and ties stay in symbol order
+        in_order = np.arange(len(self.symbols), dtype=np.int32)
+        self.orders = {'symbol': (in_order, in_order[::-1].copy())}
+        for field in NUMERIC_FIELDS:
+            column = self.numbers[field]
+            self.orders[field] = (np.argsort(column, kind='stable').astype(np.int32),
+                                  np.argsort(-column, kind='stable').astype(np.int32))
+
+        self.matches = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def category_codes(self, field, values):
+        """Codes of the given values, ignoring values no symbol has"""
+        positions = {value: code for code, value in enumerate(self.categories[field])}
+        return [positions[value] for value in values if value in positions]
+
+    def order(self, field, descending):
+        """Every position sorted by field"""
+        return self.orders[field][1 if descending else 0]
+
+    def cached_matches(self, key):
+        """Matching positions in sort order saved for a filter and sort, or None"""
+        with self.lock:
+            matches = self.matches.get(key)
+            if matches is not None:
+                self.matches.move_to_end(key)
+            return matches
+
+    def cache_matches(self, key, matches):
+        """Save a filter's matches in sort order, dropping the least recently used beyond SCREENER_CACHED_QUERIES"""
+        with self.lock:
+            self.matches[key] = matches
+            self.matches.move_to_end(key)
+            while len(self.matches) > Config.SCREENER_CACHED_QUERIES:
+                self.matches.popitem(last=False)
+
+    def rows(self, indices, decimals=4):
+        """Result rows for the given positions, with missing numbers as None"""
+        columns = {'symbol': self.symbols[indices].tolist(), 'name': self.names[indices].tolist()}
+        for field in CATEGORY_FIELDS:
+            categories = self.categories[field]
+            columns[field] = [categories[code] or None for code in self.codes[field][indices]]
+        for field in NUMERIC_FIELDS:
+            values = np.round(self.numbers[field][indices], decimals)
+            columns[field] = [None if value != value else value for value in values.tolist()]
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+class Screener:
+    """Filter, sort and page every stored symbol in memory.
+
+    The store is rebuilt from the fundamentals table when its version (row
+    count and last update) changes, checked at most every
+    SCREENER_RELOAD_INTERVAL seconds; requests arriving during a rebuild are
+    answered from the previous store.
+    """
+
+    def __init__(self, reload_interval=None):
+        self.reload_interval = reload_interval if reload_interval is not None else Config.SCREENER_RELOAD_INTERVAL
+        self.store = FundamentalsStore([])
+        self.version = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def refresh(self, read_version, load_rows):
+        """Rebuild the store from load_rows() if read_version() reports a change"""
+        now = time.time()
+        if now - self.checked_at < self.reload_interval:
+            return
+        with self.lock:
+            if now - self.checked_at < self.reload_interval:
+                return
+            self.checked_at = now
+            version = read_version()
+            if version == self.version:
+                return
+            started = time.perf_counter()
+            self.store = FundamentalsStore(load_rows())
+            self.version = version
+            print(f"Screener store loaded: {len(self.store)} symbols in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def screen(self, query):
+        """One page of the symbols matching every filter, in the requested order"""
+        store = self.store
+        order = store.order(query['sort'], query['descending'])
+        per_page = query['per_page']
+        start = (query['page'] - 1) * per_page
+
+        # Nothing is sorted per request: unfiltered pages slice the presorted order, filtered ones walk it
+        if not query['ranges'] and not query['categories']:
+            total = len(store)
+            positions = order[start:start + per_page]
+        else:
+            key = (tuple(sorted(query['ranges'].items())),
+                   tuple(sorted((field, tuple(sorted(values))) for field, values in query['categories'].items())),
+                   query['sort'], query['descending'])
+            matches = store.cached_matches(key)
+            if matches is not None:
+                total = len(matches)
+                positions = matches[start:start + per_page]
+            else:
+                mask = _filter_mask(store, query)
+                total = int(np.count_nonzero(mask))
+                if query['page'] == 1:
+                    # Top of the list: stop scanning the order once the page is full
+                    positions = _first_matches(order, mask, total, per_page)
+                else:
+                    # Paging deeper: filter the whole order once, later pages are slices of it
+                    matches = order[mask[order]]
+                    store.cache_matches(key, matches)
+                    positions = matches[start:start + per_page]
+
+        return {
+            'total': total,
+            'universe': len(store),
+            'page': query['page'],
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page,
+            'sort': query['sort'],
+            'order': 'desc' if query['descending'] else 'asc',
+            'rows': store.rows(positions),
+            'sectors': [sector for sector in store.categories['sector'] if sector],
+            'exchanges': [exchange for exchange in store.categories['exchange'] if exchange]
+        }
@@ -0,0 +1,70 @@
+import threading
+
+# Shared service objects, created on first use. Their modules pull in pandas,
+# NumPy, Plotly and requests, so nothing here is imported at app startup.
+_instances = {}
+_lock = threading.RLock()
+
+def _get(name, factory):
+    """Return the named service, creating it once across all threads"""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+def loaded():
+    """Names of the services created so far"""
+    return sorted(_instances)
+
+def data_fetcher():
+    """Alpha Vantage client shared by requests, job workers and the market feed"""
+    def create():
+        from modules.data_fetcher import DataFetcher
+        return DataFetcher()
+    return _get('data_fetcher', create)
+
+def visualizer():
+    """Plotly chart builder"""
+    def create():
+        from modules.visualizer import Visualizer
+        return Visualizer()
+    return _get('visualizer', create)
+
+def figure_builder():
+    """Fast figure dict builder, reusing the Visualizer's layouts"""
+    def create():
+        from modules.figure_builder import FigureBuilder
+        return FigureBuilder(visualizer())
+    return _get('figure_builder', create)
+
+def downsampler():
+    """Price history downsampler for charts"""
+    def create():
+        from modules.downsampler import Downsampler
+        return Downsampler()
+    return _get('downsampler', create)
+
+def batch_analyzer():
+    """Columnar metrics for many tickers"""
+    def create():
+        from modules.batch_analyzer import BatchAnalyzer
+        return BatchAnalyzer(data_fetcher())
+    return _get('batch_analyzer', create)
+
+def symbol_directory():
+    """Listed symbols for search and validation; the data fetcher is only created if the listing must be downloaded"""
+    def create():
+        from modules.symbol_directory import SymbolDirectory
+        return SymbolDirectory(lambda: data_fetcher().fetch_listing_status())
+    return _get('symbol_directory', create)
+
+def screener():
+    """In-memory screener over the fundamentals table"""
+    def create():
+        from modules.screener import Screener
+        return Screener()
+    return _get('screener', create)
@@ -0,0 +1,59 @@
+import threading
+import time
+from config import Config
+
+class SnapshotRefresher:
+    """Keep materialized watchlist rows fresh from one background thread per process.
+
+    The thread runs a refresh pass as soon as it starts and then every
+    interval, or sooner when woken. Like the market feed it stops once nobody
+    has read the rows for the snapshot max age, since nothing it computed
+    would still be fresh by then, and starts again on the next read. Every
+    worker process runs one; the refresh function leases each symbol so they
+    split the stale rows between them instead of each computing all of them.
+    """
+
+    def __init__(self, refresh, interval=None, idle_after=None):
+        self.refresh = refresh
+        self.interval = interval or Config.WATCHLIST_REFRESH_INTERVAL
+        self.idle_after = idle_after or Config.WATCHLIST_SNAPSHOT_MAX_AGE
+        self.app = None
+        self.thread = None
+        self.last_read = 0
+        self.passes = 0
+        self.woken = False
+        self.condition = threading.Condition()
+
+    def touch(self, app):
+        """Note a read of the rows and start the refresher thread if it is not running"""
+        with self.condition:
+            self.app = app
+            self.last_read = time.time()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='watchlist-refresher', daemon=True)
+                self.thread.start()
+
+    def wake(self):
+        """Run a refresh pass now instead of at the next interval"""
+        with self.condition:
+            self.woken = True
+            self.condition.notify_all()
+
+    def _run(self):
+        """Refresh until nobody has read the rows for idle_after seconds"""
+        while True:
+            try:
+                # The pass reads and writes the database, which needs an app context outside requests
+                with self.app.app_context():
+                    self.refresh()
+            except Exception as e:
+                print(f"Watchlist refresh error: {str(e)}")
+
+            with self.condition:
+                self.passes += 1
+                self.condition.wait_for(lambda: self.woken, timeout=self.interval)
+                self.woken = False
+                if time.time() - self.last_read > self.idle_after:
+                    print("Watchlist refresher idle, stopping")
+                    self.thread = None
+                    return
@@ -0,0 +1,270 @@
+import bisect
+import csv
+import heapq
+import io
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from config import Config
+from modules import metrics
+
+SYMBOL_PATTERN = re.compile(r'^[A-Z][A-Z0-9.\-]{0,9}$')
+
+# Exchange-suffixed tickers (TSCO.LON, SHOP.TRT) are valid upstream but absent from the US listing file
+FOREIGN_SUFFIX = re.compile(r'\.[A-Z]{3,4}$')
+
+WORD_SPLIT = re.compile(r'[^a-z0-9]+')
+
+def normalize_symbols(symbols):
+    """Upper-case and de-duplicate symbols in order, returning (valid, invalid)"""
+    valid = []
+    seen = set()
+    invalid = []
+    for symbol in symbols:
+        symbol = str(symbol).strip().upper()
+        if not symbol or symbol in seen:
+            continue
+        if SYMBOL_PATTERN.match(symbol):
+            seen.add(symbol)
+            valid.append(symbol)
+        else:
+            invalid.append(symbol)
+    return valid, invalid
+
+def parse_listing(text):
+    """Rows of a LISTING_STATUS CSV as (symbol, name, exchange, asset type) tuples"""
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        symbol = (row.get('symbol') or '').strip().upper()
+        if symbol:
+            rows.append((symbol, (row.get('name') or '').strip(), row.get('exchange') or '', row.get('assetType') or ''))
+    return rows
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _deletions(symbol):
+    """The symbol with each one character removed; two symbols sharing one are at most one edit apart"""
+    return {symbol[:i] + symbol[i + 1:] for i in range(len(symbol))}
+
+class SymbolIndex:
+    """Immutable in-memory index over listed tickers and company names.
+
+    Ticker prefixes and name-word prefixes are answered by bisecting sorted
+    key lists; other substrings of "ticker name" go through a trigram
+    index, intersecting posting sets before checking each candidate.
+    Mistyped tickers are matched through their one-deletion variants.
+    """
+
+    def __init__(self, rows):
+        self.entries = rows
+        self.by_symbol = {row[0]: i for i, row in enumerate(rows)}
+
+        by_symbol = sorted((row[0], i) for i, row in enumerate(rows))
+        self.symbol_keys = [key for key, _ in by_symbol]
+        self.symbol_ids = [i for _, i in by_symbol]
+
+        words = sorted({(word, i) for i, row in enumerate(rows) for word in WORD_SPLIT.split(row[1].lower()) if word})
+        self.word_keys = [word for word, _ in words]
+        self.word_ids = [i for _, i in words]
+
+        self.haystacks = [f'{row[0].lower()} {row[1].lower()}' for row in rows]
+        postings = defaultdict(set)
+        for i, haystack in enumerate(self.haystacks):
+            for trigram in _trigrams(haystack):
+                postings[trigram].add(i)
+        self.trigrams = dict(postings)
+
+        variants = defaultdict(list)
+        for i, row in enumerate(rows):
+            for variant in _deletions(row[0]) | {row[0]}:
+                variants[variant].append(i)
+        self.variants = dict(variants)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, symbol):
+        return symbol in self.by_symbol
+
+    def search(self, query, limit=10):
+        """Best matches for a ticker or name fragment: exact ticker, ticker prefix, name word prefix, then substring"""
+        lower = ' '.join(query.lower().split())
+        upper = lower.upper()
+        if not lower:
+            return []
+
+        found = []
+        seen = set()
+
+        def add(ids):
+            for i in ids:
+                if len(found) >= limit:
+                    return
+                if i not in seen:
+                    seen.add(i)
+                    found.append(i)
+
+        if upper in self.by_symbol:
+            add([self.by_symbol[upper]])
+
+        # Shortest tickers first, so "A" ranks Agilent above every other A-ticker
+        start = bisect.bisect_left(self.symbol_keys, upper)
+        end = bisect.bisect_left(self.symbol_keys, upper + '￿')
+        add(heapq.nsmallest(limit + 1, self.symbol_ids[start:end], key=lambda i: (len(self.entries[i][0]), self.entries[i][0])))
+
+        if len(found) < limit and ' ' not in lower:
+            start = bisect.bisect_left(self.word_keys, lower)
+            end = bisect.bisect_left(self.word_keys, lower + '￿')
+            add(self.word_ids[start:start + min(end - start, 4 * limit)])
+
+        if len(found) < limit and len(lower) >= 3:
+            postings = [self.trigrams.get(trigram) for trigram in _trigrams(lower)]
+            if all(postings):
+                postings.sort(key=len)
+                candidates = postings[0].intersection(*postings[1:])
+                add(sorted(i for i in candidates if lower in self.haystacks[i]))
+
+        return [self._result(i) for i in found]
+
+    def similar(self, symbol, limit=5):
+        """Listed tickers one typo away from symbol: a character added, dropped, changed or swapped"""
+        ids = set()
+        for variant in _deletions(symbol) | {symbol}:
+            ids.update(self.variants.get(variant, ()))
+        ids.discard(self.by_symbol.get(symbol))
+        ranked = sorted(ids, key=lambda i: (abs(len(self.entries[i][0]) - len(symbol)), self.entries[i][0]))
+        return [self._result(i) for i in ranked[:limit]]
+
+    def _result(self, i):
+        symbol, name, exchange, asset_type = self.entries[i]
+        return {'symbol': symbol, 'name': name, 'exchange': exchange, 'type': asset_type}
+
+class SymbolDirectory:
+    """Listed US symbols from the LISTING_STATUS download, refreshed daily.
+
+    The listing is saved to disk so restarts and other worker processes
+    reuse the day's download. Loading and daily refreshes run on a
+    background thread and swap the finished index in, so lookups never
+    wait for the file or the download. Until the first load finishes, and
+    whenever no listing can be loaded, every symbol is treated as
+    unknown-but-allowed.
+    """
+
+    def __init__(self, fetch, path=None, max_age=None, retry=None):
+        self.fetch = fetch
+        self.path = path or Config.SYMBOL_DIRECTORY_PATH
+        self.max_age = max_age or Config.SYMBOL_DIRECTORY_MAX_AGE
+        self.retry = retry or Config.SYMBOL_DIRECTORY_RETRY
+        self.index = None
+        self.loaded_at = 0
+        self.attempted_at = 0
+        self.refreshing = False
+        self.idle = threading.Event()  # Clear while a load is running
+        self.idle.set()
+        self.lock = threading.Lock()
+        metrics.gauge('symbol_directory_entries', lambda: len(self.index) if self.index is not None else 0)
+
+    @property
+    def ready(self):
+        return self.index is not None
+
+    def start(self):
+        """Begin loading the listing in the background if it is missing or due for a refresh"""
+        self._current()
+
+    def wait(self, timeout=None):
+        """Load the listing if needed and wait for it, for callers that cannot go on without it; True once ready"""
+        self._current()
+        self.idle.wait(timeout)
+        return self.ready
+
+    def search(self, query, limit=10):
+        """Matching listings as dicts, best first; empty while no listing is available"""
+        index = self._current()
+        return index.search(query, limit) if index is not None else []
+
+    def similar(self, symbol, limit=5):
+        """Listed tickers close to a mistyped one"""
+        index = self._current()
+        return index.similar(symbol, limit) if index is not None else []
+
+    def symbols(self, asset_type='Stock'):
+        """Every listed symbol of an asset type (all types for None), in ticker order"""
+        index = self._current()
+        if index is None:
+            return []
+        return [index.entries[i][0] for i in index.symbol_ids if asset_type is None or index.entries[i][3] == asset_type]
+
+    def known(self, symbol):
+        """True if the symbol is listed, False if it is not, None if the directory cannot tell"""
+        index = self._current()
+        if index is None or FOREIGN_SUFFIX.search(symbol):
+            return None
+        return symbol in index
+
+    def _current(self):
+        """The index, or None before the first load; starts a background load when it is missing or a day old"""
+        now = time.time()
+        if self.index is not None and now - self.loaded_at < self.max_age:
+            return self.index
+
+        with self.lock:
+            # Failed downloads are retried after a pause rather than on every lookup
+            if self.refreshing or now - self.attempted_at < self.retry:
+                return self.index
+            self.attempted_at = now
+            self.refreshing = True
+            self.idle.clear()
+        threading.Thread(target=self._refresh, name='symbol-directory', daemon=True).start()
+        return self.index
+
+    def _refresh(self):
+        try:
+            self._load()
+        finally:
+            self.refreshing = False
+            self.idle.set()
+
+    def _load(self):
+        """Build a new index from the saved listing if it is recent, otherwise from a fresh download"""
+        text, saved_at = self._read_saved()
+        if text is None or time.time() - saved_at >= self.max_age:
+            fetched, error = self.fetch()
+            if error:
+                print(f"Symbol directory download failed: {error}")
+            else:
+                text, saved_at = fetched, time.time()
+                self._save(text)
+        if text is None:
+            return
+
+        try:
+            started = time.perf_counter()
+            index = SymbolIndex(parse_listing(text))
+        except Exception as e:
+            print(f"Error building symbol directory: {str(e)}")
+            return
+        self.index, self.loaded_at = index, saved_at
+        print(f"Symbol directory loaded: {len(index)} symbols in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _read_saved(self):
+        """The saved listing and when it was downloaded, or (None, 0)"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return f.read(), os.path.getmtime(self.path)
+        except OSError:
+            return None, 0
+
+    def _save(self, text):
+        """Write the listing atomically, so other processes never read half a file"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save symbol directory: {str(e)}")
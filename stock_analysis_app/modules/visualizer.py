@@ -1,12 +1,20 @@
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
+from plotly.utils import PlotlyJSONEncoder
 import pandas as pd
 import numpy as np
+import base64
+import json
 import re
+from datetime import datetime
+from config import Config
 
 class Visualizer:
+    # Largest value that fits a Plotly.js 'u4' typed array
+    UINT32_MAX = np.iinfo(np.uint32).max
+
     def __init__(self):
+        self.binary_arrays = Config.CHART_BINARY_ARRAYS
         self.colors = {
             'primary': '#007bff',
             'success': '#28a745',
@@ -23,10 +31,7 @@ class Visualizer:
             return None
 
         # Create subplots: 2 rows, 1 column, shared x-axis
-        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
-                           vertical_spacing=0.03, 
-                           row_heights=[0.7, 0.3],
-                           subplot_titles=('Price History', 'Volume'))
+        fig = self._price_chart_layout()
 
         # Add moving averages if available
         has_ma = 'MA20' in df.columns and 'MA50' in df.columns
@@ -80,8 +85,7 @@ class Visualizer:
             ), row=1, col=1)
 
         # Volume bars for volume history - color based on price change
-        colors = ['green' if row['close'] >= row['open'] else 'red' 
-                 for index, row in df.iterrows()]
+        colors = np.where(df['close'] >= df['open'], 'green', 'red')
         
         fig.add_trace(go.Bar(
             x=df.index,
@@ -101,33 +105,20 @@ class Visualizer:
                 line=dict(color='black', width=1)
             ), row=2, col=1)
 
-        # Calculate price statistics for the annotation
-        if not df.empty:
-            current_price = df['close'].iloc[-1]
-            price_change = df['close'].iloc[-1] - df['close'].iloc[-2]
-            price_change_pct = (price_change / df['close'].iloc[-2]) * 100
-            fifty_day_avg = df['MA50'].iloc[-1] if has_ma else None
-            
-            # Add annotation with price info
-            annotation_text = f"Current: ${current_price:.2f}<br>"
-            annotation_text += f"Change: ${price_change:.2f} ({price_change_pct:.2f}%)<br>"
-            if fifty_day_avg:
-                annotation_text += f"50-day MA: ${fifty_day_avg:.2f}"
-                
-            fig.add_annotation(
-                x=0.05,
-                y=0.95,
-                xref="paper",
-                yref="paper",
-                text=annotation_text,
-                showarrow=False,
-                bgcolor="rgba(255, 255, 255, 0.8)",
-                bordercolor="black",
-                borderwidth=1,
-                borderpad=4,
-                font=dict(size=10),
-                align="left"
-            )
+        # Add annotation with price info
+        fig.add_annotation(**self._price_annotation(df, has_ma))
+        
+        # Add button for timeframe selection
+        fig.update_layout(updatemenus=self._price_chart_menus(df))
+
+        return fig
+
+    def _price_chart_layout(self):
+        """Subplots and static layout of the price chart, without any traces"""
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
+                           vertical_spacing=0.03, 
+                           row_heights=[0.7, 0.3],
+                           subplot_titles=('Price History', 'Volume'))
 
         # Update layout for better appearance
         fig.update_layout(
@@ -154,45 +145,71 @@ class Visualizer:
             gridcolor='lightgray',
             row=1, col=1
         )
+
+        return fig
+
+    def _price_annotation(self, df, has_ma):
+        """Annotation settings with the current price, daily change and 50-day MA"""
+        current_price = df['close'].iloc[-1]
+        price_change = df['close'].iloc[-1] - df['close'].iloc[-2]
+        price_change_pct = (price_change / df['close'].iloc[-2]) * 100
+        fifty_day_avg = df['MA50'].iloc[-1] if has_ma else None
         
-        # Add button for timeframe selection
-        fig.update_layout(
-            updatemenus=[
-                dict(
-                    buttons=list([
-                        dict(
-                            args=[{'visible': [True, True, True, True, True, True]}],
-                            label="All Data",
-                            method="update"
-                        ),
-                        dict(
-                            args=[{'xaxis.range': [df.index[-90], df.index[-1]]}],
-                            label="3 Months",
-                            method="relayout"
-                        ),
-                        dict(
-                            args=[{'xaxis.range': [df.index[-30], df.index[-1]]}],
-                            label="1 Month",
-                            method="relayout"
-                        ),
-                        dict(
-                            args=[{'xaxis.range': [df.index[-7], df.index[-1]]}],
-                            label="1 Week",
-                            method="relayout"
-                        ),
-                    ]),
-                    direction="down",
-                    pad={"r": 10, "t": 10},
-                    showactive=True,
-                    x=0.1,
-                    xanchor="left",
-                    y=1.1,
-                    yanchor="top"
-                ),
-            ]
+        annotation_text = f"Current: ${current_price:.2f}<br>"
+        annotation_text += f"Change: ${price_change:.2f} ({price_change_pct:.2f}%)<br>"
+        if fifty_day_avg:
+            annotation_text += f"50-day MA: ${fifty_day_avg:.2f}"
+            
+        return dict(
+            x=0.05,
+            y=0.95,
+            xref="paper",
+            yref="paper",
+            text=annotation_text,
+            showarrow=False,
+            bgcolor="rgba(255, 255, 255, 0.8)",
+            bordercolor="black",
+            borderwidth=1,
+            borderpad=4,
+            font=dict(size=10),
+            align="left"
         )
 
-        return fig
+    def _price_chart_menus(self, df):
+        """Timeframe selection buttons for the price chart"""
+        return [
+            dict(
+                buttons=list([
+                    dict(
+                        args=[{'visible': [True, True, True, True, True, True]}],
+                        label="All Data",
+                        method="update"
+                    ),
+                    dict(
+                        args=[{'xaxis.range': [df.index[-90], df.index[-1]]}],
+                        label="3 Months",
+                        method="relayout"
+                    ),
+                    dict(
+                        args=[{'xaxis.range': [df.index[-30], df.index[-1]]}],
+                        label="1 Month",
+                        method="relayout"
+                    ),
+                    dict(
+                        args=[{'xaxis.range': [df.index[-7], df.index[-1]]}],
+                        label="1 Week",
+                        method="relayout"
+                    ),
+                ]),
+                direction="down",
+                pad={"r": 10, "t": 10},
+                showactive=True,
+                x=0.1,
+                xanchor="left",
+                y=1.1,
+                yanchor="top"
+            ),
+        ]
 
     def create_technical_chart(self, df):
         """Create technical indicators chart with enhanced indicators"""
@@ -200,11 +217,8 @@ class Visualizer:
             return None
 
         # Create figure with multiple subplots
-        fig = make_subplots(rows=4, cols=1, 
-                           shared_xaxes=True,
-                           vertical_spacing=0.05,
-                           row_heights=[0.4, 0.2, 0.2, 0.2],
-                           subplot_titles=('Price & Moving Averages', 'RSI/StochRSI', 'MACD', 'Volume'))
+        oscillator, trend = self._technical_variant(df)
+        fig = self._technical_chart_layout(oscillator, trend, 'volume' in df.columns)
 
         # Price and moving averages
         fig.add_trace(go.Scatter(
@@ -251,7 +265,7 @@ class Visualizer:
             ), row=1, col=1)
 
         # RSI or StochRSI in second row
-        if 'fastk' in df.columns and 'fastd' in df.columns:
+        if oscillator == 'stochrsi':
             # Use StochRSI if available
             fig.add_trace(go.Scatter(
                 x=df.index, y=df['fastk'],
@@ -264,25 +278,16 @@ class Visualizer:
                 name='FastD',
                 line=dict(color=self.colors['danger'])
             ), row=2, col=1)
-            
-            fig.update_yaxes(title_text="StochRSI", row=2, col=1)
-        elif 'RSI' in df.columns:
+        elif oscillator == 'rsi':
             # Fallback to RSI if StochRSI not available
             fig.add_trace(go.Scatter(
                 x=df.index, y=df['RSI'],
                 name='RSI',
                 line=dict(color=self.colors['primary'])
             ), row=2, col=1)
-            
-            fig.update_yaxes(title_text="RSI", row=2, col=1)
-        
-        # Add reference lines for RSI/StochRSI
-        fig.add_hline(y=80, line_dash="dash", line_color="red", line_width=1, row=2, col=1)
-        fig.add_hline(y=20, line_dash="dash", line_color="green", line_width=1, row=2, col=1)
-        fig.add_hline(y=50, line_dash="dash", line_color="gray", line_width=1, row=2, col=1)
 
         # MACD in third row
-        if 'MACD' in df.columns and 'MACD_signal' in df.columns and 'MACD_hist' in df.columns:
+        if trend == 'macd':
             # MACD Line
             fig.add_trace(go.Scatter(
                 x=df.index, y=df['MACD'],
@@ -298,31 +303,23 @@ class Visualizer:
             ), row=3, col=1)
             
             # Histogram
-            colors = ['green' if val >= 0 else 'red' for val in df['MACD_hist'].fillna(0)]
+            colors = np.where(df['MACD_hist'].fillna(0) >= 0, 'green', 'red')
             fig.add_trace(go.Bar(
                 x=df.index, y=df['MACD_hist'],
                 name='Histogram',
                 marker_color=colors
             ), row=3, col=1)
-            
-            fig.update_yaxes(title_text="MACD", row=3, col=1)
-        elif 'apo' in df.columns:
+        elif trend == 'apo':
             # APO if MACD not available
             fig.add_trace(go.Scatter(
                 x=df.index, y=df['apo'],
                 name='APO',
                 line=dict(color=self.colors['primary'])
             ), row=3, col=1)
-            
-            # Add zero line
-            fig.add_hline(y=0, line_dash="solid", line_color="gray", line_width=1, row=3, col=1)
-            
-            fig.update_yaxes(title_text="APO", row=3, col=1)
 
         # Volume with relative volume in fourth row
         if 'volume' in df.columns:
-            colors = ['green' if df['close'].iloc[i] >= (df['close'].iloc[i-1] if i > 0 else df['close'].iloc[0]) 
-                    else 'red' for i in range(len(df))]
+            colors = self._up_day_colors(df['close'].to_numpy())
             
             fig.add_trace(go.Bar(
                 x=df.index, y=df['volume'],
@@ -337,7 +334,60 @@ class Visualizer:
                     name='Avg Volume',
                     line=dict(color='black', width=1)
                 ), row=4, col=1)
+        
+        # Suppress auto-ranging on price chart
+        fig.update_yaxes(range=self._technical_price_range(df), row=1, col=1)
+
+        return fig
+
+    def _technical_variant(self, df):
+        """Which oscillator (row 2) and trend indicator (row 3) the technical chart shows"""
+        oscillator = None
+        if 'fastk' in df.columns and 'fastd' in df.columns:
+            oscillator = 'stochrsi'
+        elif 'RSI' in df.columns:
+            oscillator = 'rsi'
+
+        trend = None
+        if 'MACD' in df.columns and 'MACD_signal' in df.columns and 'MACD_hist' in df.columns:
+            trend = 'macd'
+        elif 'apo' in df.columns:
+            trend = 'apo'
+
+        return oscillator, trend
+
+    def _technical_chart_layout(self, oscillator, trend, has_volume):
+        """Subplots, reference lines and static layout of the technical chart, without any traces"""
+        fig = make_subplots(rows=4, cols=1, 
+                           shared_xaxes=True,
+                           vertical_spacing=0.05,
+                           row_heights=[0.4, 0.2, 0.2, 0.2],
+                           subplot_titles=('Price & Moving Averages', 'RSI/StochRSI', 'MACD', 'Volume'))
+
+        if oscillator == 'stochrsi':
+            fig.update_yaxes(title_text="StochRSI", row=2, col=1)
+        elif oscillator == 'rsi':
+            fig.update_yaxes(title_text="RSI", row=2, col=1)
+        
+        # Add reference lines for RSI/StochRSI
+        if oscillator:
+            fig.add_hline(y=80, line_dash="dash", line_color="red", line_width=1, row=2, col=1,
+                          exclude_empty_subplots=False)
+            fig.add_hline(y=20, line_dash="dash", line_color="green", line_width=1, row=2, col=1,
+                          exclude_empty_subplots=False)
+            fig.add_hline(y=50, line_dash="dash", line_color="gray", line_width=1, row=2, col=1,
+                          exclude_empty_subplots=False)
+
+        if trend == 'macd':
+            fig.update_yaxes(title_text="MACD", row=3, col=1)
+        elif trend == 'apo':
+            # Add zero line
+            fig.add_hline(y=0, line_dash="solid", line_color="gray", line_width=1, row=3, col=1,
+                          exclude_empty_subplots=False)
             
+            fig.update_yaxes(title_text="APO", row=3, col=1)
+
+        if has_volume:
             fig.update_yaxes(title_text="Volume", row=4, col=1)
 
         # Update layout for better appearance
@@ -354,12 +404,6 @@ class Visualizer:
             margin=dict(l=60, r=60, t=80, b=40)
         )
         
-        # Suppress auto-ranging on price chart
-        last_month = df.iloc[-30:] if len(df) > 30 else df
-        y_min = last_month['low'].min() * 0.98
-        y_max = last_month['high'].max() * 1.02
-        fig.update_yaxes(range=[y_min, y_max], row=1, col=1)
-        
         # Make axis more readable
         fig.update_xaxes(
             rangeslider_visible=False,
@@ -376,22 +420,32 @@ class Visualizer:
 
         return fig
 
+    def _technical_price_range(self, df):
+        """Price axis range around the last month of trading"""
+        last_month = df.iloc[-30:] if len(df) > 30 else df
+        y_min = last_month['low'].min() * 0.98
+        y_max = last_month['high'].max() * 1.02
+        return [y_min, y_max]
+
+    def _up_day_colors(self, close):
+        """Green for bars that closed at or above the previous close, red otherwise"""
+        previous = np.concatenate([close[:1], close[:-1]])
+        return np.where(close >= previous, 'green', 'red')
+
     def create_volume_chart(self, df):
         """Create volume analysis chart"""
         if not isinstance(df, pd.DataFrame) or df.empty:
             return None
 
-        # Calculate relative volume
-        df['avg_volume'] = df['volume'].rolling(window=20).mean()
-        df['relative_volume'] = df['volume'] / df['avg_volume']
+        # Calculate relative volume unless it was already computed on the daily bars
+        if 'avg_volume' not in df.columns or 'relative_volume' not in df.columns:
+            df['avg_volume'] = df['volume'].rolling(window=20).mean()
+            df['relative_volume'] = df['volume'] / df['avg_volume']
 
-        fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
-                           vertical_spacing=0.03,
-                           row_heights=[0.5, 0.5])
+        fig = self._volume_chart_layout()
 
         # Volume bars
-        colors = ['red' if row['close'] < row['open'] else 'green' 
-                 for index, row in df.iterrows()]
+        colors = np.where(df['close'] < df['open'], 'red', 'green')
         
         fig.add_trace(go.Bar(
             x=df.index,
@@ -416,6 +470,14 @@ class Visualizer:
             marker_color=self.colors['info']
         ), row=2, col=1)
 
+        return fig
+
+    def _volume_chart_layout(self):
+        """Subplots and static layout of the volume chart, without any traces"""
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                           vertical_spacing=0.03,
+                           row_heights=[0.5, 0.5])
+
         fig.update_layout(
             title='Volume Analysis',
             height=600,
@@ -542,17 +604,15 @@ class Visualizer:
         if not data or not isinstance(data, dict):
             return None
 
+        df = data.get('price_data')
+        if not isinstance(df, pd.DataFrame):
+            df = None
+
         # Create a figure with multiple subplots
-        fig = make_subplots(
-            rows=2, cols=2,
-            subplot_titles=('Price History', 'Volume', 'Price Performance', 'Financial Metrics'),
-            specs=[[{"type": "candlestick"}, {"type": "bar"}],
-                  [{"type": "scatter"}, {"type": "bar"}]]
-        )
+        fig = self._summary_chart_layout(df is not None and len(df) > 20)
 
         # Add price history
-        if 'price_data' in data and isinstance(data['price_data'], pd.DataFrame):
-            df = data['price_data']
+        if df is not None:
             fig.add_trace(go.Candlestick(
                 x=df.index,
                 open=df['open'],
@@ -563,8 +623,7 @@ class Visualizer:
             ), row=1, col=1)
 
             # Add volume
-            colors = ['green' if row['close'] >= row['open'] else 'red' 
-                     for index, row in df.iterrows()]
+            colors = np.where(df['close'] >= df['open'], 'green', 'red')
             fig.add_trace(go.Bar(
                 x=df.index,
                 y=df['volume'],
@@ -573,45 +632,20 @@ class Visualizer:
             ), row=1, col=2)
             
             # Add price performance chart (instead of ownership)
-            # Calculate daily returns
             if len(df) > 20:
                 # Get the last 30 days of data
                 recent_df = df.iloc[-30:]
                 
-                # Calculate daily returns
-                if 'daily_return' not in recent_df.columns:
-                    recent_df['daily_return'] = recent_df['close'].pct_change() * 100
-                
-                # Plot cumulative performance
-                base = 100
-                cumulative = [base]
-                for ret in recent_df['daily_return'].fillna(0).values[1:]:
-                    cumulative.append(cumulative[-1] * (1 + ret/100))
-                
                 fig.add_trace(go.Scatter(
                     x=recent_df.index,
-                    y=cumulative,
+                    y=self._cumulative_performance(recent_df),
                     name='30-Day Performance',
                     line=dict(color=self.colors['primary'], width=2)
                 ), row=2, col=1)
-                
-                # Add reference line at 100 (starting value)
-                fig.add_hline(
-                    y=base, 
-                    line_dash="dash", 
-                    line_color="gray", 
-                    row=2, 
-                    col=1
-                )
 
         # Add financial metrics
         if 'financial_data' in data and isinstance(data['financial_data'], dict):
-            financial = data['financial_data']
-            metrics = {
-                'Current Ratio': self._extract_float_from_string(financial.get('current_ratio', 0)),
-                'Debt/Equity': self._extract_float_from_string(financial.get('debt_to_equity', 0)),
-                'Profit Margin': self._extract_float_from_string(financial.get('profit_margin', 0))
-            }
+            metrics = self._summary_metrics(data['financial_data'])
             
             fig.add_trace(go.Bar(
                 x=list(metrics.keys()),
@@ -620,6 +654,28 @@ class Visualizer:
                 marker_color=self.colors['info']
             ), row=2, col=2)
 
+        return fig
+
+    def _summary_chart_layout(self, has_performance):
+        """Subplots and static layout of the summary dashboard, without any traces"""
+        fig = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=('Price History', 'Volume', 'Price Performance', 'Financial Metrics'),
+            specs=[[{"type": "candlestick"}, {"type": "bar"}],
+                  [{"type": "scatter"}, {"type": "bar"}]]
+        )
+
+        # Add reference line at 100 (starting value)
+        if has_performance:
+            fig.add_hline(
+                y=100, 
+                line_dash="dash", 
+                line_color="gray", 
+                row=2, 
+                col=1,
+                exclude_empty_subplots=False
+            )
+
         fig.update_layout(
             title='Stock Analysis Summary',
             height=800,
@@ -628,6 +684,25 @@ class Visualizer:
 
         return fig
 
+    def _cumulative_performance(self, recent_df, base=100):
+        """Growth of base over the window, from daily returns in percent"""
+        if 'daily_return' in recent_df.columns:
+            returns = recent_df['daily_return']
+        else:
+            returns = recent_df['close'].pct_change() * 100
+
+        # Multiplying step by step keeps the same rounding as compounding in a loop
+        factors = 1 + returns.fillna(0).to_numpy()[1:] / 100
+        return np.multiply.accumulate(np.concatenate([[base], factors]))
+
+    def _summary_metrics(self, financial):
+        """Financial metrics shown on the summary dashboard"""
+        return {
+            'Current Ratio': self._extract_float_from_string(financial.get('current_ratio', 0)),
+            'Debt/Equity': self._extract_float_from_string(financial.get('debt_to_equity', 0)),
+            'Profit Margin': self._extract_float_from_string(financial.get('profit_margin', 0))
+        }
+
     def _calculate_rsi(self, prices, period=14):
         """Calculate Relative Strength Index"""
         delta = prices.diff()
@@ -635,4 +710,77 @@ class Visualizer:
         loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
         
         rs = gain / loss
-        return 100 - (100 / (1 + rs)) 
\ No newline at end of file
+        return 100 - (100 / (1 + rs))
+
+    def figure_to_json(self, fig):
+        """Serialize a figure or figure dict to JSON, using binary typed arrays when enabled"""
+        if isinstance(fig, dict):
+            # Figure dicts from the FigureBuilder carry raw NumPy arrays and shared layout templates
+            figure = {
+                'data': [dict(trace) for trace in fig.get('data', [])],
+                'layout': dict(fig.get('layout', {}))
+            }
+        elif not self.binary_arrays:
+            return fig.to_json()
+        else:
+            figure = fig.to_plotly_json()
+
+        date_axes = set()
+
+        for trace in figure.get('data', []):
+            for key, value in list(trace.items()):
+                if not isinstance(value, np.ndarray):
+                    continue
+                if not self.binary_arrays:
+                    # Same ISO strings Plotly writes for timestamps
+                    if np.issubdtype(value.dtype, np.datetime64):
+                        trace[key] = np.datetime_as_string(value, unit='s')
+                    continue
+                encoded, is_date = self._encode_typed_array(value)
+                if encoded is None:
+                    continue
+                trace[key] = encoded
+                if is_date and key == 'x':
+                    date_axes.add(trace.get('xaxis', 'x'))
+                elif is_date and key == 'y':
+                    date_axes.add(trace.get('yaxis', 'y'))
+
+        # Epoch numbers would otherwise make Plotly treat the axis as linear
+        layout = figure.setdefault('layout', {})
+        for axis in date_axes:
+            axis_name = axis[0] + 'axis' + axis[1:]
+            layout[axis_name] = dict(layout.get(axis_name, {}), type='date')
+
+        return json.dumps(figure, cls=PlotlyJSONEncoder, separators=(',', ':'))
+
+    def _encode_typed_array(self, values):
+        """Encode a numeric or date array as a Plotly.js typed array ({dtype, bdata})"""
+        is_date = False
+
+        if values.dtype == object and len(values) and isinstance(values[0], (pd.Timestamp, datetime, np.datetime64)):
+            try:
+                values = pd.to_datetime(values)
+            except (ValueError, TypeError):
+                return None, False
+
+        if np.issubdtype(values.dtype, np.datetime64) or isinstance(values, pd.DatetimeIndex):
+            # Plotly.js has no int64 typed array, so dates go out as epoch milliseconds in float64
+            dates = pd.DatetimeIndex(values)
+            if dates.tz is not None:
+                dates = dates.tz_convert('UTC').tz_localize(None)
+            millis = dates.asi8 // 1_000_000
+            values = np.where(dates.isna(), np.nan, millis.astype(np.float64))
+            is_date = True
+        elif np.issubdtype(values.dtype, np.bool_) or not np.issubdtype(values.dtype, np.number):
+            return None, False
+
+        values = np.asarray(values, dtype=np.float64)
+
+        # Whole non-negative numbers such as volume fit in four bytes instead of eight
+        dtype = 'f8'
+        if not is_date and len(values) and np.isfinite(values).all():
+            if values.min() >= 0 and values.max() <= self.UINT32_MAX and (values == np.floor(values)).all():
+                dtype = 'u4'
+
+        array = values.astype('<u4' if dtype == 'u4' else '<f8')
+        return {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}, is_date
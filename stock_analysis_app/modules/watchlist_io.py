@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+# Columns written by CSV export and recognised by CSV import
+CSV_COLUMNS = ('symbol', 'date_added', 'notes')
+
+def parse_import(text, file_format):
+    """Read (symbol, notes) pairs from a CSV or JSON watchlist file, returning (entries, error)"""
+    try:
+        if file_format == 'json':
+            return _parse_json(text), None
+        return _parse_csv(text), None
+    except (ValueError, csv.Error) as e:
+        return None, f"Could not read {file_format.upper()} watchlist: {str(e)}"
+
+def _parse_json(text):
+    """A list of symbols, a list of {symbol, notes} objects, or either under a "symbols" key"""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('symbols', data.get('watchlist', []))
+    if not isinstance(data, list):
+        raise ValueError('expected a list of symbols')
+
+    entries = []
+    for item in data:
+        if isinstance(item, dict):
+            entries.append((str(item.get('symbol', '')), item.get('notes')))
+        else:
+            entries.append((str(item), None))
+    return entries
+
+def _parse_csv(text):
+    """Rows with a symbol column, or one symbol per line when there is no header"""
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'symbol' not in header:
+        return [(row[0], None) for row in rows]
+
+    symbol_index = header.index('symbol')
+    notes_index = header.index('notes') if 'notes' in header else None
+    entries = []
+    for row in rows[1:]:
+        if symbol_index >= len(row):
+            continue
+        notes = None
+        if notes_index is not None and notes_index < len(row):
+            notes = row[notes_index].strip() or None
+        entries.append((row[symbol_index], notes))
+    return entries
+
+def export_csv(items):
+    """Watchlist items as CSV text"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_COLUMNS)
+    for item in items:
+        writer.writerow([item['symbol'], item['date_added'], item['notes'] or ''])
+    return output.getvalue()
@@ -4,6 +4,16 @@ console.log("Main.js loaded");
 // Global variables
 let currentTicker = '';
 let chartDataStore = {};
+let chartObserver = null;
+
+// Chart container for each chart type returned by the server
+const CHART_CONTAINERS = {
+    summary: 'summaryChart',
+    price: 'priceChart',
+    technical: 'techChart',
+    volume: 'volumeChart',
+    financial: 'financialChart'
+};
 
 // Initialize the application when the document is ready
 document.addEventListener('DOMContentLoaded', function() {
@@ -49,9 +59,16 @@ function initializeForm() {
 function fetchStockData(ticker) {
     currentTicker = ticker;
     
+    // Stop lazy chart loading for the previous ticker
+    if (chartObserver) {
+        chartObserver.disconnect();
+        chartObserver = null;
+    }
+    
     // Show loading spinner and hide previous results
     const loadingSpinner = document.getElementById('loadingSpinner');
     const loadingTicker = document.getElementById('loadingTicker');
+    const loadingStage = document.getElementById('loadingStage');
     const companyData = document.getElementById('companyData');
     const advancedMetrics = document.getElementById('advancedMetrics');
     const analysisResults = document.getElementById('analysisResults');
@@ -59,6 +76,7 @@ function fetchStockData(ticker) {
     
     if (loadingSpinner) loadingSpinner.style.display = 'flex';
     if (loadingTicker) loadingTicker.textContent = ticker;
+    if (loadingStage) loadingStage.textContent = loadingStage.dataset.defaultText || loadingStage.textContent;
     if (companyData) companyData.style.display = 'none';
     if (advancedMetrics) advancedMetrics.style.display = 'none';
     if (analysisResults) analysisResults.style.display = 'none';
@@ -80,6 +98,7 @@ function fetchStockData(ticker) {
     formData.append('ticker', ticker);
     formData.append('use_mock', 'false'); // Always set to false, never use mock data
     formData.append('disable_charts', disableCharts);
+    formData.append('async', 'true'); // Queue the analysis and poll for the result
     
     // Make the fetch request
     fetch('/analyze', {
@@ -90,7 +109,11 @@ function fetchStockData(ticker) {
         console.log("Response status:", response.status);
         return response.json();
     })
+    .then(data => data.job_id ? waitForAnalysisJob(data, ticker, loadingStage) : data)
     .then(data => {
+        // A newer search has started; its own request will fill the page
+        if (!data) return;
+        
         // Hide loading spinner
         if (loadingSpinner) loadingSpinner.style.display = 'none';
         
@@ -107,6 +130,11 @@ function fetchStockData(ticker) {
         if (data.company_data) {
             console.log("Company data received:", data.company_data);
             
+            // Inline charts may arrive as a shared-column bundle
+            if (data.chart_bundle) {
+                data.charts = expandChartBundle(data.chart_bundle);
+            }
+            
             if (data.charts) {
                 console.log("Charts data keys:", Object.keys(data.charts));
                 chartDataStore = data.charts;
@@ -117,8 +145,11 @@ function fetchStockData(ticker) {
             // Display company data
             displayCompanyData(data.company_data);
             
-            // Display charts if enabled
-            if (!disableCharts && data.charts) {
+            // Display charts if enabled, loading each one as it scrolls into view
+            if (!disableCharts && data.chart_urls && Object.keys(data.chart_urls).length) {
+                setupLazyCharts(data.chart_urls);
+                showAlert(`Data loaded for ${ticker}, charts load as you view them`, 'success', true);
+            } else if (!disableCharts && data.charts && Object.keys(data.charts).length) {
                 try {
                     displayCharts(data.charts);
                     showAlert(`Data loaded successfully for ${ticker}`, 'success', true);
@@ -142,6 +173,23 @@ function fetchStockData(ticker) {
     });
 }
 
+// Poll a queued analysis job until it finishes, showing its progress, and resolve to its result
+function waitForAnalysisJob(job, ticker, stageElement) {
+    if (currentTicker !== ticker) return null;
+    if (stageElement && job.stage) stageElement.textContent = `${job.stage}...`;
+    
+    if (job.status === 'done') return job.result;
+    if (job.status === 'failed') return { error: job.error || 'Analysis failed' };
+    
+    // The server holds each poll open until the job finishes or the wait runs out
+    return fetch(`/api/jobs/${job.id}?wait=25`)
+        .then(response => response.json())
+        .then(status => {
+            if (status.error && !status.status) return { error: status.error };
+            return waitForAnalysisJob(status, ticker, stageElement);
+        });
+}
+
 // Display company data in the UI
 function displayCompanyData(data) {
     console.log("Updating company info with:", data);
@@ -288,84 +336,14 @@ function displayCharts(charts) {
     let successful = 0;
     let failed = 0;
     
-    // Helper function to safely render a chart
+    // Helper function to safely render a chart and count the result
     function safeRenderChart(containerId, chartData) {
-        try {
-            const container = document.getElementById(containerId);
-            if (!container) {
-                console.warn(`Chart container #${containerId} not found in DOM`);
-                failed++;
-                return false;
-            }
-            
-            if (!chartData || !chartData.data || !Array.isArray(chartData.data) || !chartData.layout) {
-                container.innerHTML = '<div class="alert alert-warning">Chart data not available or invalid</div>';
-                failed++;
-                return false;
-            }
-            
-            // Ensure the layout is responsive
-            const responsiveLayout = {
-                ...chartData.layout,
-                autosize: true,
-                responsive: true,
-                // Add margin for better visibility
-                margin: {
-                    ...chartData.layout.margin,
-                    pad: 5
-                }
-            };
-            
-            // Special handling for price chart to make it more detailed
-            if (containerId === 'priceChart') {
-                // Add responsive configuration specific to price chart
-                responsiveLayout.xaxis = {
-                    ...responsiveLayout.xaxis,
-                    autorange: true,
-                    rangeslider: {
-                        visible: false  // Disable rangeslider for cleaner look
-                    }
-                };
-                
-                // Make sure y-axis auto-scales
-                responsiveLayout.yaxis = {
-                    ...responsiveLayout.yaxis,
-                    autorange: true,
-                    fixedrange: false
-                };
-                
-                // Make sure modebar is always visible for zooming
-                responsiveLayout.modebar = {
-                    orientation: 'v',
-                    activecolor: '#007bff'
-                };
-            }
-            
-            // Create the chart with responsive config
-            const config = {
-                responsive: true,
-                displayModeBar: true, // Always show the mode bar
-                modeBarButtonsToAdd: ['toImage', 'resetScale2d'],
-                scrollZoom: true, // Enable scroll to zoom
-                displaylogo: false
-            };
-            
-            Plotly.newPlot(containerId, chartData.data, responsiveLayout, config);
+        if (renderChart(containerId, chartData)) {
             successful++;
-            
             return true;
-        } catch (error) {
-            console.error(`Error rendering ${containerId}:`, error);
-            const container = document.getElementById(containerId);
-            if (container) {
-                container.innerHTML = `<div class="alert alert-danger">
-                    Error rendering chart: ${error.message}
-                    <button class="btn btn-sm btn-outline-primary mt-2" onclick="retryChart('${containerId}')">Retry</button>
-                </div>`;
-            }
-            failed++;
-            return false;
         }
+        failed++;
+        return false;
     }
     
     // Try to render each chart
@@ -381,6 +359,184 @@ function displayCharts(charts) {
     return { successful, failed };
 }
 
+// Render a single chart into its container, returning true on success
+function renderChart(containerId, chartData) {
+    try {
+        const container = document.getElementById(containerId);
+        if (!container) {
+            console.warn(`Chart container #${containerId} not found in DOM`);
+            return false;
+        }
+        
+        if (!chartData || !chartData.data || !Array.isArray(chartData.data) || !chartData.layout) {
+            container.innerHTML = '<div class="alert alert-warning">Chart data not available or invalid</div>';
+            return false;
+        }
+        
+        // Ensure the layout is responsive
+        const responsiveLayout = {
+            ...chartData.layout,
+            autosize: true,
+            responsive: true,
+            // Add margin for better visibility
+            margin: {
+                ...chartData.layout.margin,
+                pad: 5
+            }
+        };
+        
+        // Special handling for price chart to make it more detailed
+        if (containerId === 'priceChart') {
+            // Add responsive configuration specific to price chart
+            responsiveLayout.xaxis = {
+                ...responsiveLayout.xaxis,
+                autorange: true,
+                rangeslider: {
+                    visible: false  // Disable rangeslider for cleaner look
+                }
+            };
+            
+            // Make sure y-axis auto-scales
+            responsiveLayout.yaxis = {
+                ...responsiveLayout.yaxis,
+                autorange: true,
+                fixedrange: false
+            };
+            
+            // Make sure modebar is always visible for zooming
+            responsiveLayout.modebar = {
+                orientation: 'v',
+                activecolor: '#007bff'
+            };
+        }
+        
+        // Create the chart with responsive config
+        const config = {
+            responsive: true,
+            displayModeBar: true, // Always show the mode bar
+            modeBarButtonsToAdd: ['toImage', 'resetScale2d'],
+            scrollZoom: true, // Enable scroll to zoom
+            displaylogo: false
+        };
+        
+        Plotly.newPlot(containerId, chartData.data, responsiveLayout, config);
+        return true;
+    } catch (error) {
+        console.error(`Error rendering ${containerId}:`, error);
+        const container = document.getElementById(containerId);
+        if (container) {
+            container.innerHTML = `<div class="alert alert-danger">
+                Error rendering chart: ${error.message}
+                <button class="btn btn-sm btn-outline-primary mt-2" onclick="retryChart('${containerId}')">Retry</button>
+            </div>`;
+        }
+        return false;
+    }
+}
+
+// Rebuild Plotly figures from a bundle whose traces reference shared columns by name
+function expandChartBundle(bundle) {
+    const columns = bundle.columns || {};
+    
+    function expand(value) {
+        if (Array.isArray(value)) {
+            return value.map(expand);
+        }
+        if (value && typeof value === 'object') {
+            const keys = Object.keys(value);
+            if (keys.length === 1 && keys[0] === '$col') {
+                return columns[value.$col];
+            }
+            const expanded = {};
+            keys.forEach(key => {
+                expanded[key] = expand(value[key]);
+            });
+            return expanded;
+        }
+        return value;
+    }
+    
+    const figures = {};
+    Object.keys(bundle.figures || {}).forEach(kind => {
+        figures[kind] = expand(bundle.figures[kind]);
+    });
+    return figures;
+}
+
+// Load each chart from its own endpoint when its container scrolls into view
+function setupLazyCharts(chartUrls) {
+    if (chartObserver) {
+        chartObserver.disconnect();
+    }
+    chartDataStore = {};
+    
+    const containers = [];
+    Object.keys(CHART_CONTAINERS).forEach(kind => {
+        const container = document.getElementById(CHART_CONTAINERS[kind]);
+        if (!container) return;
+        
+        if (!chartUrls[kind]) {
+            container.innerHTML = '<div class="alert alert-warning">Chart data not available</div>';
+            return;
+        }
+        
+        container.dataset.chartKind = kind;
+        container.dataset.chartUrl = chartUrls[kind];
+        container.innerHTML = `<div class="loading-spinner">
+            <div class="spinner-border text-primary" role="status">
+                <span class="visually-hidden">Loading chart...</span>
+            </div>
+        </div>`;
+        containers.push(container);
+    });
+    
+    // Older browsers without IntersectionObserver just load everything
+    if (!('IntersectionObserver' in window)) {
+        containers.forEach(loadChart);
+    } else {
+        chartObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    chartObserver.unobserve(entry.target);
+                    loadChart(entry.target);
+                }
+            });
+        });
+        containers.forEach(container => chartObserver.observe(container));
+    }
+    
+    setupResponsiveCharts();
+}
+
+// Fetch and render the chart assigned to a container
+function loadChart(container) {
+    const ticker = currentTicker;
+    const kind = container.dataset.chartKind;
+    
+    fetch(container.dataset.chartUrl)
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(chartJson => {
+        // Ignore charts for a ticker that has since been replaced
+        if (ticker !== currentTicker) return;
+        
+        const chartData = chartJson.figures ? expandChartBundle(chartJson)[kind] : chartJson;
+        chartDataStore[kind] = chartData;
+        renderChart(container.id, chartData);
+    })
+    .catch(error => {
+        console.error(`Error loading ${kind} chart:`, error);
+        container.innerHTML = `<div class="alert alert-warning">
+            Chart could not be loaded: ${error.message}
+            <button class="btn btn-sm btn-outline-primary mt-2" onclick="retryChart('${container.id}')">Retry</button>
+        </div>`;
+    });
+}
+
 // Setup responsive behavior for charts
 function setupResponsiveCharts() {
     // Resize all charts when window is resized
@@ -472,7 +628,7 @@ function showAlert(message, type = 'info', autoHide = false) {
 
 // Retry chart rendering - global function for retry buttons
 window.retryChart = function(chartId) {
-    const chartType = chartId.replace('Chart', '');
+    const chartType = Object.keys(CHART_CONTAINERS).find(kind => CHART_CONTAINERS[kind] === chartId);
     const container = document.getElementById(chartId);
     
     if (!container) {
@@ -480,6 +636,12 @@ window.retryChart = function(chartId) {
         return;
     }
     
+    // Lazily loaded charts that failed to download are fetched again
+    if (!(chartDataStore && chartDataStore[chartType]) && container.dataset.chartUrl) {
+        loadChart(container);
+        return;
+    }
+    
     if (chartDataStore && chartDataStore[chartType]) {
         try {
             console.log(`Retrying ${chartId} chart`);
@@ -0,0 +1,123 @@
+"""The chart cache must stay within its byte budget and let /api/chart answer revalidations with 304.
+
+    python -m pytest tests/test_chart_cache.py
+"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from modules.chart_cache import ChartCache
+
+def _body(seed, size=4000):
+    """Incompressible bytes, so every entry costs about its body size plus two compressed copies"""
+    return np.random.default_rng(seed).bytes(size)
+
+def test_stays_within_byte_budget_and_evicts_least_recently_used():
+    size = ChartCache().put(ChartCache.make_key('A', '2024-01-02', 'price'), _body(0))['size']
+    cache = ChartCache(max_bytes=3 * size)
+    keys = [ChartCache.make_key(symbol, '2024-01-02', 'price') for symbol in 'ABCD']
+    for i, key in enumerate(keys[:3]):
+        cache.put(key, _body(i))
+    cache.get(keys[0])
+    cache.put(keys[3], _body(3))
+
+    assert cache.total_bytes <= cache.max_bytes
+    assert cache.total_bytes == sum(entry['size'] for entry in cache.entries.values())
+    # B was the least recently used once A was read again
+    assert list(cache.entries) == [keys[2], keys[0], keys[3]]
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = ChartCache(max_bytes=10 ** 6)
+    key = ChartCache.make_key('A', '2024-01-02', 'price')
+    cache.put(key, _body(0))
+    entry = cache.put(key, _body(1, 2000))
+    assert cache.total_bytes == entry['size']
+
+def test_oversized_chart_is_served_but_not_cached():
+    cache = ChartCache(max_bytes=1000)
+    entry = cache.put(ChartCache.make_key('A', '2024-01-02', 'price'), _body(0))
+    assert entry['body'] == _body(0)
+    assert not cache.entries and cache.total_bytes == 0
+
+def test_etag_leads_with_the_last_bar_date():
+    body = b'{"data": []}'
+    entry = ChartCache().put(ChartCache.make_key('aapl', '2024-01-02', 'price'), body)
+    assert entry['etag'] == f'2024-01-02.{hashlib.sha1(body).hexdigest()}'
+
+def test_revalidate_finds_fresh_entries_only():
+    cache = ChartCache(max_bytes=10 ** 6)
+    options = (True, 1500)
+    entry = cache.put(ChartCache.make_key('AAPL', '2024-01-02', 'price', options), _body(0))
+
+    assert cache.revalidate('AAPL', 'price', options, ['other', entry['etag']]) is entry
+    assert cache.revalidate('AAPL', 'volume', options, [entry['etag']]) is None
+    assert cache.revalidate('AAPL', 'price', (False, 1500), [entry['etag']]) is None
+    assert cache.revalidate('AAPL', 'price', options, ['2024-01-02.' + '0' * 40]) is None
+
+    # Expired entries are dropped, so the rebuild stores a fresh one
+    entry['created'] -= Config.CACHE_DURATION
+    assert cache.revalidate('AAPL', 'price', options, [entry['etag']]) is None
+    assert not cache.entries and cache.total_bytes == 0
+
+def _dataset():
+    from modules.data_fetcher import DataFetcher
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range(end='2024-06-28', periods=400)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    df = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                       'volume': np.full(len(index), 1e6)}, index=index)
+    DataFetcher.__new__(DataFetcher)._add_technical_indicators(df)
+    return {'time_series': df}
+
+class StubFetcher:
+    """Stands in for the data fetcher, counting dataset compiles"""
+
+    def __init__(self):
+        self.compiles = 0
+
+    def compile_complete_dataset(self, symbol):
+        self.compiles += 1
+        return _dataset(), None
+
+    def fetch_listing_status(self):
+        # The symbol directory starts loading with the first request; symbol checks are stubbed out anyway
+        return None, 'No listing in tests'
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    import app as app_module
+    from modules import services
+    monkeypatch.setattr(Config, 'SECRET_KEY', 'test')
+    monkeypatch.setattr(app_module, '_unknown_symbol_error', lambda symbol: None)
+    fetcher = StubFetcher()
+    monkeypatch.setattr(services, 'data_fetcher', lambda: fetcher)
+    app_module.chart_cache.clear()
+    app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}'})
+    client = app.test_client()
+    client.fetcher = fetcher
+    yield client
+    app_module.chart_cache.clear()
+
+@pytest.mark.parametrize('accept_encoding', ['identity', 'gzip'])
+def test_chart_revalidation_is_answered_without_compiling(client, accept_encoding):
+    first = client.get('/api/chart/AAPL/price', headers={'Accept-Encoding': accept_encoding})
+    assert first.status_code == 200
+    assert client.fetcher.compiles == 1
+
+    repeat = client.get('/api/chart/AAPL/price', headers={'Accept-Encoding': accept_encoding,
+                                                         'If-None-Match': first.headers['ETag']})
+    assert repeat.status_code == 304
+    assert client.fetcher.compiles == 1
+
+def test_unknown_etag_gets_the_full_chart(client):
+    response = client.get('/api/chart/AAPL/price', headers={'If-None-Match': '"2020-01-01.abc"'})
+    assert response.status_code == 200
+    assert response.headers['ETag'].strip('"').startswith('2024-06-28.')
+    assert client.fetcher.compiles == 1
@@ -0,0 +1,92 @@
+"""Cached payloads must be sent in a precompressed variant the client accepts, and other JSON compressed on the way out.
+
+    python -m pytest tests/test_compression.py
+"""
+import gzip
+import json
+import os
+import sys
+
+import pytest
+from flask import Response
+from werkzeug.http import parse_accept_header
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from modules import compression
+
+BODY = json.dumps({'rows': [{'symbol': f'S{i:04d}', 'close': i * 1.5} for i in range(200)]}).encode()
+
+def _accept(header):
+    return parse_accept_header(header)
+
+def test_small_bodies_are_not_precompressed():
+    assert compression.precompress(b'{}') == {}
+
+def test_precompressed_variants_decode_to_the_body():
+    variants = compression.precompress(BODY)
+    assert set(variants) == set(compression.available_encodings())
+    assert gzip.decompress(variants['gzip']) == BODY
+    if 'br' in variants:
+        assert compression.brotli.decompress(variants['br']) == BODY
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('identity', None),
+    ('gzip;q=0', None),
+    ('', None)
+])
+def test_choose_encoding(header, expected):
+    assert compression.choose_encoding(_accept(header)) == expected
+
+@pytest.mark.skipif(compression.brotli is None, reason='brotli is not installed')
+def test_brotli_is_preferred():
+    assert compression.choose_encoding(_accept('gzip, br')) == 'br'
+
+def test_encoded_response_sends_the_accepted_variant():
+    variants = compression.precompress(BODY)
+    response = compression.encoded_response(BODY, variants, _accept('gzip'), etag='2024-01-02.abc')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_data() == variants['gzip']
+    assert 'Accept-Encoding' in response.vary
+    # Weak, since the bytes differ from the identity body with the same ETag
+    assert response.get_etag() == ('2024-01-02.abc', True)
+
+def test_encoded_response_falls_back_to_the_body():
+    variants = compression.precompress(BODY)
+    response = compression.encoded_response(BODY, variants, _accept('identity'), etag='2024-01-02.abc')
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == BODY
+    assert response.get_etag() == ('2024-01-02.abc', False)
+
+def test_encoded_response_without_variants():
+    response = compression.encoded_response(b'{}', {}, _accept('gzip'))
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'{}'
+
+def test_compress_response_compresses_large_json():
+    response = compression.compress_response(Response(BODY, mimetype='application/json'), _accept('gzip'))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == BODY
+
+@pytest.mark.parametrize('response', [
+    lambda: Response(b'{}', mimetype='application/json'),
+    lambda: Response(BODY, mimetype='image/png'),
+    lambda: Response(BODY, status=304, mimetype='application/json')
+], ids=['small', 'not_compressible', 'not_modified'])
+def test_compress_response_leaves_other_responses_alone(response):
+    response = response()
+    body = response.get_data()
+    assert 'Content-Encoding' not in compression.compress_response(response, _accept('gzip')).headers
+    assert response.get_data() == body
+
+def test_compress_response_keeps_precompressed_bodies():
+    variants = compression.precompress(BODY)
+    response = compression.encoded_response(BODY, variants, _accept('gzip'))
+    assert compression.compress_response(response, _accept('gzip')).get_data() == variants['gzip']
+
+def test_threshold_follows_config(monkeypatch):
+    monkeypatch.setattr(Config, 'COMPRESSION_MIN_SIZE', len(BODY) + 1)
+    assert compression.precompress(BODY) == {}
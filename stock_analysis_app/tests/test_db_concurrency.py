@@ -0,0 +1,88 @@
+"""Worker processes writing one SQLite file at once must neither hit "database is locked" nor store duplicates.
+
+    python -m pytest tests/test_db_concurrency.py
+"""
+import contextlib
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+PROCESSES = 4
+SYMBOLS = [f'W{i:03d}' for i in range(40)]
+USER_ID = 'shared-user'
+
+def writer(index, db_path, barrier, queue):
+    """Add every symbol to one shared watchlist, racing the other processes, and report the outcomes"""
+    try:
+        queue.put(_write(index, db_path, barrier))
+    except Exception as e:
+        # Reported rather than raised so the test never waits for a result that will not come
+        queue.put({'failed': f'{type(e).__name__}: {e}'})
+
+def _write(index, db_path, barrier):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        from config import Config
+        instance = os.path.dirname(db_path)
+        Config.SECRET_KEY_PATH = os.path.join(instance, 'secret_key')
+        Config.SYMBOL_DIRECTORY_PATH = os.path.join(instance, f'listing_status_{index}.csv')
+        from benchmarks.fixtures import FixtureUpstream
+        FixtureUpstream(bars=300).install()
+        import app as app_module
+        # Only the database is under test; snapshot rows are not computed after each add
+        app_module.snapshot_refresher.refresh = lambda: None
+        app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = USER_ID
+
+        outcomes = {'added': 0, 'exists': 0, 'locked': 0, 'other': 0}
+        symbols = list(SYMBOLS)
+        random.Random(index).shuffle(symbols)
+        barrier.wait(timeout=60)
+        for i, symbol in enumerate(symbols):
+            try:
+                if i % 10 == 9:
+                    # Bulk imports race the single adds on the same unique index
+                    response = client.post('/api/watchlist/import', json=symbols[i - 9:i + 1])
+                    if response.status_code != 200:
+                        outcomes['other'] += 1
+                        continue
+                    added = response.get_json()['added']
+                    outcomes['added'] += added
+                    outcomes['exists'] += 10 - added
+                    continue
+                response = client.post('/api/watchlist/add', json={'symbol': symbol})
+                status = response.get_json().get('status') if response.status_code == 200 else None
+                outcomes[{'success': 'added', 'exists': 'exists'}.get(status, 'other')] += 1
+            except Exception as e:
+                outcomes['locked' if 'database is locked' in str(e) else 'other'] += 1
+    return outcomes
+
+def test_concurrent_writers(tmp_path):
+    db_path = str(tmp_path / 'concurrency.db')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    barrier = context.Barrier(PROCESSES)
+    processes = [context.Process(target=writer, args=(i, db_path, barrier, queue)) for i in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert [result['failed'] for result in results if 'failed' in result] == []
+    assert sum(result['locked'] for result in results) == 0
+    assert sum(result['other'] for result in results) == 0
+    # Every symbol was added exactly once, however the processes interleaved
+    assert sum(result['added'] for result in results) == len(SYMBOLS)
+
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute('SELECT symbol, COUNT(*) FROM watchlist WHERE user_id = ? GROUP BY symbol',
+                                  (USER_ID,)).fetchall()
+    assert sorted(symbol for symbol, _ in rows) == SYMBOLS
+    assert max(count for _, count in rows) == 1
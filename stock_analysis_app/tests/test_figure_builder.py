@@ -0,0 +1,96 @@
+"""FigureBuilder must serialize to the same chart JSON as the Plotly-built Visualizer figures.
+
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.data_fetcher import DataFetcher
+from modules.downsampler import Downsampler
+from modules.figure_builder import FigureBuilder
+from modules.visualizer import Visualizer
+
+CHARTS = ('summary', 'price', 'technical', 'volume', 'financial')
+
+FINANCIAL_DATA = {'current_ratio': '1.5', 'debt_to_equity': '0.4', 'profit_margin': '20%', 'roe': '30%'}
+
+def price_history(bars=1500, seed=0):
+    """Fixed daily history with the indicator columns the app adds"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2024-06-28', periods=bars)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, bars))
+    df = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, bars))),
+        'low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, bars))),
+        'close': close,
+        'volume': (5e6 * (1 + 0.3 * np.abs(rng.normal(0, 1, bars)))).round()
+    }, index=index)
+    # Only the indicator math is needed, not the API client setup
+    DataFetcher.__new__(DataFetcher)._add_technical_indicators(df)
+    df['stoch_rsi_fastk'] = rng.uniform(0, 100, bars)
+    df['apo'] = rng.normal(0, 1, bars)
+    return df
+
+def _variants():
+    full = price_history()
+    short = full.iloc[-95:].drop(columns=['apo', 'MACD', 'MA20'])
+    with_gap = full.iloc[-100:].copy()
+    with_gap.iloc[5, with_gap.columns.get_loc('close')] = np.nan
+    return {
+        'full': full,
+        'downsampled': Downsampler().downsample(price_history(6500)),
+        'without_macd_rsi': full.drop(columns=['MACD', 'MACD_signal', 'MACD_hist', 'RSI', 'avg_volume']),
+        'short': short,
+        'nan_bar': with_gap
+    }
+
+VARIANTS = _variants()
+
+def _chart_args(kind, df):
+    if kind == 'summary':
+        return (dict(price_data=df.copy(), financial_data=FINANCIAL_DATA),)
+    if kind == 'financial':
+        return (FINANCIAL_DATA,)
+    return (df.copy(),)
+
+def _normalize(value):
+    """Parsed JSON with NaN replaced by None, so missing values compare equal"""
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+@pytest.mark.parametrize('binary_arrays', [False, True], ids=['plain', 'binary'])
+@pytest.mark.parametrize('variant', list(VARIANTS))
+@pytest.mark.parametrize('kind', CHARTS)
+def test_builder_matches_visualizer(kind, variant, binary_arrays):
+    visualizer = Visualizer()
+    visualizer.binary_arrays = binary_arrays
+    builder = FigureBuilder(visualizer)
+    df = VARIANTS[variant]
+
+    expected = getattr(visualizer, f'create_{kind}_chart')(*_chart_args(kind, df))
+    actual = getattr(builder, f'create_{kind}_chart')(*_chart_args(kind, df))
+
+    assert expected is not None
+    assert _normalize(json.loads(visualizer.figure_to_json(actual))) == \
+        _normalize(json.loads(visualizer.figure_to_json(expected)))
+
+def test_builder_matches_visualizer_without_price_data():
+    visualizer = Visualizer()
+    builder = FigureBuilder(visualizer)
+    expected = visualizer.figure_to_json(visualizer.create_summary_chart({'financial_data': FINANCIAL_DATA}))
+    actual = visualizer.figure_to_json(builder.create_summary_chart({'financial_data': FINANCIAL_DATA}))
+    assert _normalize(json.loads(actual)) == _normalize(json.loads(expected))
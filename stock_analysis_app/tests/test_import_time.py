@@ -0,0 +1,35 @@
+"""A fresh worker must start within the import budget without loading the heavy libraries.
+
+    python -m pytest tests/test_import_time.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.import_time import LAZY_MODULES, measure
+
+BUDGET_MS = 700
+
+def _startup():
+    """Total top-level import time in ms and the lazy libraries loaded, from one cold start"""
+    rows = measure()
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    loaded = sorted({name.split('.')[0] for name, _, _, _ in rows} & set(LAZY_MODULES))
+    return total_ms, loaded
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    # Inherited by the measured interpreter, so it does not generate and save a key of its own
+    monkeypatch.setenv('SECRET_KEY', 'test')
+
+def test_startup_skips_lazy_modules():
+    _, loaded = _startup()
+    assert loaded == []
+
+def test_startup_within_budget():
+    # The best of a few starts, so one slow run on a busy machine does not fail the suite
+    best = min(_startup()[0] for _ in range(3))
+    assert best <= BUDGET_MS, f'{best:.0f} ms to import and create the app (budget {BUDGET_MS} ms)'
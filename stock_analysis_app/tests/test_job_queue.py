@@ -0,0 +1,129 @@
+"""JobQueue must refuse work beyond its limit, merge duplicate keys and forget finished jobs after the retention period.
+
+    python -m pytest tests/test_job_queue.py
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from modules.job_queue import JobQueue
+
+@pytest.fixture
+def release():
+    """Event the blocking jobs wait on; set at teardown so no worker thread is left waiting"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+def _blocking(release):
+    def run(progress):
+        progress('Waiting')
+        release.wait(10)
+        return 'done'
+    return run
+
+class MemoryStore:
+    """Job store shared like the database table, recording what was saved"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.saved = []
+        self.pruned = []
+
+    def save(self, job):
+        self.saved.append((job['id'], job['status']))
+        self.jobs[job['id']] = JobQueue._snapshot(job)
+
+    def load(self, job_id):
+        return self.jobs.get(job_id)
+
+    def prune(self, cutoff):
+        self.pruned.append(cutoff)
+
+def test_result_and_progress():
+    queue = JobQueue(max_workers=1)
+    job = queue.submit('a', lambda progress: progress('Halfway') or {'value': 1})
+    assert job['status'] in ('queued', 'running', 'done')
+    assert queue.get(job['id'], wait=5) == {'id': job['id'], 'status': 'done', 'stage': 'Done', 'result': {'value': 1}}
+
+def test_failed_job_reports_its_error():
+    def fail(progress):
+        raise ValueError('no data')
+    queue = JobQueue(max_workers=1)
+    job = queue.submit('a', fail)
+    assert queue.get(job['id'], wait=5) == {'id': job['id'], 'status': 'failed', 'stage': 'Failed', 'error': 'no data'}
+
+def test_duplicate_keys_join_the_running_job(release):
+    queue = JobQueue(max_workers=2)
+    first = queue.submit('AAPL', _blocking(release))
+    assert queue.submit('AAPL', _blocking(release))['id'] == first['id']
+    assert queue.submit('MSFT', _blocking(release))['id'] != first['id']
+
+def test_queue_limit_counts_unfinished_jobs(release):
+    queue = JobQueue(max_workers=1, max_pending=2)
+    first = queue.submit('a', _blocking(release))
+    assert queue.submit('b', _blocking(release)) is not None
+    assert queue.submit('c', _blocking(release)) is None
+
+    release.set()
+    assert queue.get(first['id'], wait=5)['status'] == 'done'
+    queue.executor.shutdown(wait=True)
+    # Finished jobs free their places
+    assert len(queue.active) == 0
+
+def test_finished_jobs_are_forgotten_after_retention():
+    queue = JobQueue(max_workers=1, retention=60)
+    job = queue.submit('a', lambda progress: 1)
+    assert queue.get(job['id'], wait=5)['status'] == 'done'
+
+    queue.jobs[job['id']]['finished'] -= 61
+    queue.submit('b', lambda progress: 2)
+    assert queue.get(job['id']) is None
+
+def test_recent_jobs_are_kept():
+    queue = JobQueue(max_workers=1, retention=60)
+    job = queue.submit('a', lambda progress: 1)
+    queue.get(job['id'], wait=5)
+    queue.submit('b', lambda progress: 2)
+    assert queue.get(job['id'])['result'] == 1
+
+def test_every_state_change_is_saved_in_order():
+    queue = JobQueue(max_workers=1)
+    queue.store = MemoryStore()
+    job = queue.submit('a', lambda progress: 1)
+    queue.get(job['id'], wait=5)
+    statuses = [status for job_id, status in queue.store.saved if job_id == job['id']]
+    assert statuses[0] == 'queued' and statuses[-1] == 'done'
+    assert statuses == sorted(statuses, key=['queued', 'running', 'done'].index)
+
+def test_jobs_of_another_process_are_read_from_the_store(monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_POLL_INTERVAL', 0.01)
+    store = MemoryStore()
+    store.jobs['elsewhere'] = {'id': 'elsewhere', 'status': 'running', 'stage': 'Fetching'}
+    queue = JobQueue(max_workers=1)
+    queue.store = store
+
+    assert queue.get('elsewhere')['status'] == 'running'
+    assert queue.get('missing', wait=1) is None
+
+    # The other process finishes while this one is waiting
+    timer = threading.Timer(0.1, lambda: store.jobs.update(elsewhere={'id': 'elsewhere', 'status': 'done',
+                                                                      'stage': 'Done', 'result': 1}))
+    timer.start()
+    started = time.time()
+    assert queue.get('elsewhere', wait=5)['result'] == 1
+    assert time.time() - started < 1
+
+def test_store_is_pruned_at_most_once_per_interval(monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_PRUNE_INTERVAL', 60)
+    queue = JobQueue(max_workers=1)
+    queue.store = MemoryStore()
+    for key in 'abc':
+        queue.submit(key, lambda progress: 1)
+    assert len(queue.store.pruned) == 1
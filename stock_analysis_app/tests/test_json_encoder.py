@@ -0,0 +1,48 @@
+"""JSON responses must never contain NaN, and NumPy and pandas gaps must not cost a second encoding pass.
+
+    python -m pytest tests/test_json_encoder.py
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import json_encoder
+
+@pytest.fixture
+def sanitized(monkeypatch):
+    """Counts second passes through _sanitize"""
+    calls = []
+    sanitize = json_encoder._sanitize
+    monkeypatch.setattr(json_encoder, '_sanitize', lambda obj: calls.append(obj) or sanitize(obj))
+    return calls
+
+def test_numpy_and_pandas_gaps_encode_in_one_pass(sanitized):
+    frame = pd.DataFrame({'close': [1.5, np.nan, np.inf],
+                          'date': pd.to_datetime(['2024-01-02', None, '2024-01-04']),
+                          'name': ['a', None, 'b']})
+    text = json_encoder.dumps({'frame': frame, 'series': frame['close'], 'array': np.array([-np.inf, 2.0]),
+                               'scalar': np.float32('nan'), 'ints': np.arange(3)})
+    assert json.loads(text) == {
+        'frame': {'close': [1.5, None, None], 'date': ['2024-01-02T00:00:00', None, '2024-01-04T00:00:00'],
+                  'name': ['a', None, 'b']},
+        'series': [1.5, None, None],
+        'array': [None, 2.0],
+        'scalar': None,
+        'ints': [0, 1, 2]
+    }
+    assert sanitized == []
+
+@pytest.mark.parametrize('value', [float('nan'), float('-inf'), np.float64('nan')])
+def test_plain_non_finite_floats_become_null(value):
+    text = json_encoder.dumps({'pe_ratio': value, 'history': [1.0, value], 'name': 'NaN'})
+    assert text == '{"pe_ratio":null,"history":[1.0,null],"name":"NaN"}'
+
+def test_clean_data_is_encoded_once(sanitized):
+    assert json_encoder.dumps({'close': np.float64(1.5), 'volume': np.int64(7)}) == '{"close":1.5,"volume":7}'
+    assert sanitized == []
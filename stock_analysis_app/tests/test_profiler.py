@@ -0,0 +1,39 @@
+"""The profiler's label cache must stay bounded, and /debug/profile must only answer the machine itself.
+
+    python -m pytest tests/test_profiler.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from modules.profiler import SamplingProfiler
+
+def test_label_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILER_MAX_LABELS', 5)
+    profiler = SamplingProfiler()
+    for i in range(20):
+        code = compile(f'def generated_{i}(): pass', f'templates/generated_{i}.py', 'exec').co_consts[0]
+        assert profiler._label(code) == f'generated_{i} (templates/generated_{i}.py:1)'
+        assert len(profiler.labels) <= 5
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    import app as app_module
+    monkeypatch.setattr(Config, 'SECRET_KEY', 'test')
+    monkeypatch.setattr(Config, 'PROFILER_ENABLED', True)
+    app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}'})
+    yield app.test_client()
+    app_module.profiler.stop()
+
+def test_profile_is_served_locally(client):
+    response = client.get('/debug/profile?seconds=0.1')
+    assert response.status_code == 200
+    assert 'X-Profiler-Overhead' in response.headers
+
+def test_profile_is_refused_to_other_machines(client):
+    response = client.get('/debug/profile?seconds=0.1', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    assert response.status_code == 403
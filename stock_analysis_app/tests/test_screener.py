@@ -0,0 +1,143 @@
+"""Screener pages must match filtering and sorting every row the slow way, on every code path.
+
+    python -m pytest tests/test_screener.py
+"""
+import math
+import os
+import random
+import sys
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.fundamentals import NUMERIC_FIELDS
+from modules.screener import LOAD_COLUMNS, FundamentalsStore, Screener, parse_query
+
+SECTORS = ['Technology', 'Energy', 'Healthcare', 'Utilities', None]
+EXCHANGES = ['NASDAQ', 'NYSE', None]
+
+def _rows(count=5000, seed=0):
+    """Rows as load_rows returns them, in symbol order, with ties and missing values on every field"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        row = {'symbol': f'S{i:05d}', 'name': f'Company {i}', 'exchange': rng.choice(EXCHANGES),
+               'sector': rng.choice(SECTORS), 'industry': rng.choice(['Software', 'Oil', None])}
+        for field in NUMERIC_FIELDS:
+            row[field] = None if rng.random() < 0.15 else float(rng.randrange(-20, 40))
+        rows.append(tuple(row[column] for column in LOAD_COLUMNS))
+    return rows
+
+ROWS = _rows()
+
+@pytest.fixture(scope='module')
+def screener():
+    screener = Screener()
+    screener.store = FundamentalsStore(ROWS)
+    return screener
+
+def _naive(query):
+    """Symbols of the requested page and the match count, from a plain filter and sort over dicts"""
+    records = [dict(zip(LOAD_COLUMNS, row)) for row in ROWS]
+    for field, (low, high) in query['ranges'].items():
+        records = [r for r in records if r[field] is not None
+                   and (low is None or r[field] >= low) and (high is None or r[field] <= high)]
+    for field, values in query['categories'].items():
+        records = [r for r in records if (r[field] or '') in values]
+
+    if query['sort'] == 'symbol':
+        records.sort(key=lambda r: r['symbol'], reverse=query['descending'])
+    else:
+        # Missing values last in both directions, ties in symbol order
+        sign = -1 if query['descending'] else 1
+        records.sort(key=lambda r: (r[query['sort']] is None, sign * (r[query['sort']] or 0), r['symbol']))
+    start = (query['page'] - 1) * query['per_page']
+    return [r['symbol'] for r in records[start:start + query['per_page']]], len(records)
+
+def _random_query(rng):
+    ranges = {}
+    for field in rng.sample(NUMERIC_FIELDS, rng.choice([0, 1, 1, 2, 3])):
+        # parse_query only adds a range when it has a bound
+        low, high = rng.choice([(rng.randrange(-20, 40), None), (None, rng.randrange(-20, 40)),
+                                (rng.randrange(-20, 10), rng.randrange(0, 40))])
+        ranges[field] = (low, high)
+    categories = {}
+    if rng.random() < 0.3:
+        categories['sector'] = rng.sample([s for s in SECTORS if s], rng.randrange(1, 3))
+    if rng.random() < 0.1:
+        # Values no symbol has match nothing
+        categories['exchange'] = ['LSE']
+    return {
+        'ranges': ranges,
+        'categories': categories,
+        'sort': rng.choice(NUMERIC_FIELDS + ('symbol',)),
+        'descending': rng.random() < 0.5,
+        'page': rng.choice([1, 1, 2, 3, 10, 40]),
+        'per_page': rng.choice([1, 7, 50, 500])
+    }
+
+def _check(screener, query):
+    result = screener.screen(query)
+    symbols, total = _naive(query)
+    assert [row['symbol'] for row in result['rows']] == symbols
+    assert result['total'] == total
+    assert result['pages'] == math.ceil(total / query['per_page'])
+
+def test_random_queries_match_the_naive_screen(screener):
+    rng = random.Random(1)
+    for _ in range(300):
+        _check(screener, _random_query(rng))
+
+def test_paging_through_a_cached_filter(screener):
+    query = {'ranges': {'pe_ratio': (0, 25)}, 'categories': {'sector': ['Technology']},
+             'sort': 'market_cap', 'descending': True, 'per_page': 50}
+    # Page 1 scans, page 2 caches the matches, later pages and page 1 again are slices of them
+    for page in (1, 2, 3, 2, 1, 30):
+        _check(screener, dict(query, page=page))
+
+def test_sparse_matches_deep_in_the_order(screener):
+    # Only a handful of rows match, so the page 1 scan runs through most of the order
+    query = {'ranges': {'market_cap': (39, None), 'beta': (None, -20)}, 'categories': {},
+             'sort': 'market_cap', 'descending': False, 'page': 1, 'per_page': 5}
+    _check(screener, query)
+
+def test_unfiltered_pages(screener):
+    for sort in ('symbol', 'price'):
+        for descending in (False, True):
+            _check(screener, {'ranges': {}, 'categories': {}, 'sort': sort, 'descending': descending,
+                              'page': 3, 'per_page': 50})
+
+def test_rows_report_missing_values_as_none(screener):
+    result = screener.screen({'ranges': {}, 'categories': {}, 'sort': 'symbol', 'descending': False,
+                              'page': 1, 'per_page': 200})
+    for row, source in zip(result['rows'], ROWS):
+        assert row == dict(zip(LOAD_COLUMNS, source))
+
+def test_empty_store():
+    result = Screener().screen({'ranges': {'price': (1, None)}, 'categories': {}, 'sort': 'price',
+                                'descending': True, 'page': 1, 'per_page': 50})
+    assert (result['total'], result['rows'], result['pages']) == (0, [], 0)
+
+def test_parse_query():
+    query, error = parse_query(MultiDict([('min_price', '10'), ('max_price', '20'), ('sector', 'Energy'),
+                                          ('sector', 'Utilities'), ('sort', 'rsi'), ('page', '2')]))
+    assert error is None
+    assert query['ranges'] == {'price': (10.0, 20.0)}
+    assert query['categories'] == {'sector': ['Energy', 'Utilities']}
+    assert (query['sort'], query['descending'], query['page']) == ('rsi', True, 2)
+
+    assert parse_query(MultiDict())[0]['sort'] == 'market_cap'
+    assert parse_query(MultiDict([('sort', 'symbol')]))[0]['descending'] is False
+
+@pytest.mark.parametrize('args', [
+    [('min_unknown', '1')],
+    [('color', 'red')],
+    [('min_price', 'cheap')],
+    [('sort', 'name')],
+    [('page', 'two')]
+])
+def test_parse_query_rejects_bad_arguments(args):
+    query, error = parse_query(MultiDict(args))
+    assert query is None and error
@@ -0,0 +1,133 @@
+"""Symbol search must rank matches as the autocomplete expects, and validation must never wait for the listing.
+
+    python -m pytest tests/test_symbol_directory.py
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.symbol_directory import SymbolDirectory, SymbolIndex, normalize_symbols, parse_listing
+
+LISTING = '''symbol,name,exchange,assetType,ipoDate,delistingDate,status
+A,Agilent Technologies Inc,NYSE,Stock,1999-11-18,null,Active
+AA,Alcoa Corp,NYSE,Stock,2016-10-18,null,Active
+AAPL,Apple Inc,NASDAQ,Stock,1980-12-12,null,Active
+AAPU,Direxion Daily AAPL Bull 2X Shares,NASDAQ,ETF,2023-08-09,null,Active
+APLE,Apple Hospitality REIT Inc,NYSE,Stock,2015-05-18,null,Active
+MSFT,Microsoft Corporation,NASDAQ,Stock,1986-03-13,null,Active
+BRK-B,Berkshire Hathaway Inc,NYSE,Stock,1996-05-09,null,Active
+'''
+
+@pytest.fixture(scope='module')
+def index():
+    return SymbolIndex(parse_listing(LISTING))
+
+def _symbols(results):
+    return [result['symbol'] for result in results]
+
+def test_parse_listing():
+    rows = parse_listing(LISTING)
+    assert rows[2] == ('AAPL', 'Apple Inc', 'NASDAQ', 'Stock')
+    assert len(rows) == 7
+
+def test_exact_ticker_ranks_first(index):
+    assert _symbols(index.search('aapl'))[0] == 'AAPL'
+
+def test_ticker_prefix_ranks_shortest_first(index):
+    assert _symbols(index.search('A', 3)) == ['A', 'AA', 'AAPL']
+
+def test_name_word_prefix(index):
+    assert _symbols(index.search('micro')) == ['MSFT']
+    assert set(_symbols(index.search('hosp'))) == {'APLE'}
+
+def test_substring_of_ticker_and_name(index):
+    assert 'AAPU' in _symbols(index.search('bull 2x'))
+    assert 'BRK-B' in _symbols(index.search('athaway'))
+
+def test_search_respects_limit_and_ignores_blank_queries(index):
+    assert len(index.search('a', 2)) == 2
+    assert index.search('   ') == []
+
+def test_result_fields(index):
+    assert index.search('MSFT', 1) == [{'symbol': 'MSFT', 'name': 'Microsoft Corporation',
+                                       'exchange': 'NASDAQ', 'type': 'Stock'}]
+
+@pytest.mark.parametrize('typo, expected', [
+    ('APPL', 'AAPL'),  # swapped
+    ('AAPLL', 'AAPL'),  # added
+    ('MSF', 'MSFT'),  # dropped
+    ('MSFY', 'MSFT')  # changed
+])
+def test_similar_finds_one_typo(index, typo, expected):
+    assert expected in _symbols(index.similar(typo))
+
+def test_similar_leaves_out_the_symbol_itself(index):
+    assert 'AAPL' not in _symbols(index.similar('AAPL'))
+
+def test_normalize_symbols():
+    valid, invalid = normalize_symbols([' aapl', 'AAPL', 'brk-b', '', '1BAD', 'TOOLONGSYMBOL'])
+    assert valid == ['AAPL', 'BRK-B']
+    assert invalid == ['1BAD', 'TOOLONGSYMBOL']
+
+class SlowListing:
+    """Listing download that waits until released, counting calls"""
+
+    def __init__(self, text=LISTING, error=None):
+        self.text = text
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(10)
+        return (None, self.error) if self.error else (self.text, None)
+
+def test_lookups_do_not_wait_for_the_download(tmp_path):
+    fetch = SlowListing()
+    directory = SymbolDirectory(fetch, path=str(tmp_path / 'listing.csv'))
+    try:
+        # Unknown, not rejected, while the download is still running
+        assert directory.known('AAPL') is None
+        assert directory.search('app') == []
+        assert not directory.ready
+    finally:
+        fetch.release.set()
+    assert directory.wait(5)
+    assert directory.known('AAPL') is True
+    assert directory.known('ZZZZ') is False
+    assert fetch.calls == 1
+
+def test_foreign_tickers_are_not_judged(tmp_path):
+    fetch = SlowListing()
+    fetch.release.set()
+    directory = SymbolDirectory(fetch, path=str(tmp_path / 'listing.csv'))
+    assert directory.wait(5)
+    assert directory.known('TSCO.LON') is None
+
+def test_saved_listing_is_reused_without_downloading(tmp_path):
+    path = str(tmp_path / 'listing.csv')
+    first = SlowListing()
+    first.release.set()
+    assert SymbolDirectory(first, path=path).wait(5)
+
+    second = SlowListing()
+    directory = SymbolDirectory(second, path=path)
+    assert directory.wait(5)
+    assert second.calls == 0
+    assert directory.symbols() == ['A', 'AA', 'AAPL', 'APLE', 'BRK-B', 'MSFT']
+    assert 'AAPU' in directory.symbols(asset_type=None)
+
+def test_failed_download_leaves_every_symbol_allowed(tmp_path):
+    fetch = SlowListing(error='Network error')
+    fetch.release.set()
+    directory = SymbolDirectory(fetch, path=str(tmp_path / 'listing.csv'), retry=60)
+    assert not directory.wait(5)
+    assert directory.known('AAPL') is None
+    # Not retried on every lookup
+    directory.known('AAPL')
+    assert fetch.calls == 1